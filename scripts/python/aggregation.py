@@ -0,0 +1,131 @@
+# Import the libraries
+import os
+import numpy as np
+import pandas as pd
+
+# Files of the aggregation store (the statistics are pickled, so the group keys keep their types, e.g. the station IDs
+# that are numbers in one source and text in another)
+STATS_FILE = 'monthly_stats.pkl'
+ROWS_FILE = 'monthly_rows.npz'
+
+
+# Define a function for finding the unique hashes with the first position and the number of copies of each
+# (sorting is faster than the hash table of np.unique for random 64-bit hashes)
+def sorted_unique(hashes):
+    order = np.argsort(hashes, kind='stable')
+    sorted_hashes = hashes[order]
+    start = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]][:len(hashes)])
+    return sorted_hashes[start], order[start], np.diff(np.r_[start, len(hashes)])
+
+
+# Define a function for hashing the group keys and the whole rows (group keys and value) of a DF
+def row_hashes(wq_df, group_cols):
+    keys = wq_df[group_cols].copy()
+    # Hash the month with the same type in every run
+    keys['month'] = keys['month'].astype('int64')
+    group_hash = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    row_hash = pd.util.hash_pandas_object(pd.DataFrame({'group': group_hash, 'value': wq_df['value'].to_numpy()}),
+                                          index=False).to_numpy()
+    return group_hash, row_hash
+
+
+# Define a function for calculating the sufficient statistics of the groups: the count, the mean and the sum of
+# squared deviations from the mean (m2), with an optional weight (number of copies) for each row
+def group_stats(df, weight=None):
+    weight = np.ones(len(df)) if weight is None else np.asarray(weight, dtype=float)
+    values = df['value'].to_numpy(dtype=float)
+    sums = pd.DataFrame({'group_hash': df['group_hash'].to_numpy(), 'count': weight, 'sum': weight * values})
+    sums = sums.groupby('group_hash', sort=False).sum()
+    mean = sums['sum'] / sums['count']
+    deviation = values - mean.reindex(df['group_hash']).to_numpy()
+    m2 = pd.Series(weight * deviation ** 2).groupby(df['group_hash'].to_numpy(), sort=False).sum()
+    return pd.DataFrame({'count': sums['count'], 'mean': mean, 'm2': m2.reindex(sums.index)})
+
+
+# Define a function for merging the statistics of the same groups calculated from two sets of rows
+# (the parallel algorithm of Chan et al.)
+def merge_stats(a, b):
+    count = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    mean = a['mean'] + delta * b['count'] / count
+    m2 = a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / count
+    return pd.DataFrame({'count': count, 'mean': mean, 'm2': m2})
+
+
+# Define a function for converting the sufficient statistics into the count, mean and standard deviation of
+# the groups (like groupby().agg(['count', 'mean', 'std']))
+def monthly_frame(stats, group_cols):
+    monthly_df = stats[group_cols].reset_index(drop=True)
+    count = stats['count'].to_numpy()
+    monthly_df['count'] = count.astype('int64')
+    monthly_df['mean'] = stats['mean'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        monthly_df['std'] = np.where(count > 1, np.sqrt(np.maximum(stats['m2'].to_numpy(), 0) / (count - 1)), np.nan)
+    return monthly_df
+
+
+# Define a function for updating the store of monthly statistics with the current observations and returning
+# the monthly DF with the parameters whose groups changed
+# The rows are compared with the ones of the previous run by their hashes: new rows are folded into the stored
+# statistics of their groups and the groups that lost rows are aggregated again from the current rows
+# The store only saves the aggregation of the unchanged groups and the writes of the files of the unchanged
+# parameters, the monthly DF that is returned has all groups (full_monthly_data is still written in full)
+def update_monthly(store_dir, wq_df, group_cols):
+    os.makedirs(store_dir, exist_ok=True)
+    # Drop the rows with a missing group key (e.g. a station without a location) like groupby() does
+    wq_df = wq_df.dropna(subset=group_cols)
+    stats_path = os.path.join(store_dir, STATS_FILE)
+    rows_path = os.path.join(store_dir, ROWS_FILE)
+    # Count the copies of each row in the current observations (sorted by the row hash)
+    group_hash, row_hash = row_hashes(wq_df, group_cols)
+    rows, first, n = sorted_unique(row_hash)
+    # Read the statistics and the rows of the previous run
+    if os.path.exists(stats_path) and os.path.exists(rows_path):
+        old_stats = pd.read_pickle(stats_path).set_index('group_hash')
+        with np.load(rows_path) as old:
+            old_rows, old_groups, old_n = old['row_hash'], old['group_hash'], old['n']
+    else:
+        old_stats = pd.DataFrame(columns=group_cols + ['count', 'mean', 'm2'])
+        old_stats.index.name = 'group_hash'
+        old_rows, old_groups, old_n = [np.empty(0, dtype=dtype) for dtype in [np.uint64, np.uint64, np.int64]]
+    # Find the rows that were added or removed by comparing the sorted hashes
+    all_rows = sorted_unique(np.concatenate([rows, old_rows]))[0]
+    new_pos, old_pos = np.searchsorted(all_rows, rows), np.searchsorted(all_rows, old_rows)
+    change = np.zeros(len(all_rows), dtype=np.int64)
+    change[new_pos] += n
+    change[old_pos] -= old_n
+    all_groups = np.zeros(len(all_rows), dtype=np.uint64)
+    all_groups[old_pos] = old_groups
+    all_groups[new_pos] = group_hash[first]
+    removed_groups = pd.Index(sorted_unique(all_groups[change < 0])[0])
+    added = (change > 0) & ~np.isin(all_groups, removed_groups)
+    # Select the current rows of the groups that lost rows and one copy of each added row
+    values = wq_df['value'].to_numpy()
+    recount_idx = np.flatnonzero(np.isin(group_hash, removed_groups))
+    added_idx = first[np.searchsorted(rows, all_rows[added])]
+    recount = pd.DataFrame({'group_hash': group_hash[recount_idx], 'value': values[recount_idx]})
+    added_rows = pd.DataFrame({'group_hash': group_hash[added_idx], 'value': values[added_idx]})
+    # Aggregate the groups that lost rows again from the current rows
+    recount_stats = group_stats(recount)
+    # Fold the added rows into the statistics of their groups
+    added_stats = group_stats(added_rows, weight=change[added])
+    stats = old_stats.drop(removed_groups.intersection(old_stats.index))
+    both = added_stats.index.intersection(stats.index)
+    stats.loc[both, ['count', 'mean', 'm2']] = merge_stats(stats.loc[both], added_stats.loc[both])
+    # Add the keys of the new groups
+    new_groups = added_stats.index.difference(stats.index).append(recount_stats.index)
+    key_idx = np.concatenate([added_idx, recount_idx])
+    keys = wq_df[group_cols].iloc[key_idx].set_index(group_hash[key_idx])
+    keys = keys[~keys.index.duplicated()]
+    new_stats = keys.loc[new_groups].join(pd.concat([added_stats, recount_stats]))
+    stats = pd.concat([stats, new_stats]) if len(stats) else new_stats
+    stats['count'] = stats['count'].astype(float)
+    stats = stats.sort_values(group_cols)
+    # Save the store
+    stats.reset_index().to_pickle(stats_path)
+    np.savez(rows_path, row_hash=rows, group_hash=group_hash[first], n=n)
+    # Find the parameters of the changed groups
+    changed = removed_groups.append(added_stats.index)
+    changed_params = pd.concat([old_stats.loc[old_stats.index.intersection(changed), 'param_code'],
+                                stats.loc[stats.index.intersection(changed), 'param_code']]).unique()
+    return monthly_frame(stats, group_cols), sorted(changed_params)
@@ -0,0 +1,59 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from power_transform import power_transform
+
+
+# Define a function for the power transformation like the Power-Transformation notebook did before
+# (a boolean mask over the full DF and stats.boxcox() for each parameter)
+def boxcox_loop(monthly_df, params):
+    subsets = []
+    for param in params:
+        subset = monthly_df[monthly_df['param_code'] == param].copy()
+        pt_values, lmbda = stats.boxcox(subset['mean'])
+        subset['pt_value'] = pt_values
+        subset['lambda'] = lmbda
+        subsets.append(subset)
+    pt_df = pd.concat(subsets)
+    pt_df['pt_skew'] = pt_df['pt_value'].groupby(pt_df['param_code']).transform('skew')
+    return pt_df
+
+
+if __name__ == '__main__':
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    rng = np.random.RandomState(0)
+    params = ['P{}'.format(i) for i in range(18)]
+    monthly_df = pd.DataFrame({
+        'station_id': rng.randint(0, 10000, n_rows).astype(str),
+        'param_code': rng.choice(params, n_rows),
+        'month': rng.randint(1, 13, n_rows),
+        'mean': rng.lognormal(0, 1, n_rows)
+    })
+
+    # Time the loop and the engine (fitting, and applying the lambdas from the CSV written by the first run)
+    start = time.perf_counter()
+    old_df = boxcox_loop(monthly_df, params)
+    print('loop over parameters: {:.2f} s'.format(time.perf_counter() - start))
+    with tempfile.TemporaryDirectory() as tmp:
+        lambda_fname = os.path.join(tmp, 'boxcox_lambdas.csv')
+        start = time.perf_counter()
+        pt_df = power_transform(monthly_df, workers=workers, lambda_fname=lambda_fname)
+        print('fitted in a pool of workers: {:.2f} s'.format(time.perf_counter() - start))
+        start = time.perf_counter()
+        frozen_df = power_transform(monthly_df, workers=workers, lambda_fname=lambda_fname)
+        print('lambdas from the cache: {:.2f} s'.format(time.perf_counter() - start))
+
+    # Check that the transformed values, the lambdas and the skewness are the same
+    columns = ['pt_value', 'lambda', 'pt_skew']
+    pd.testing.assert_frame_equal(old_df.sort_index()[columns], pt_df[columns])
+    pd.testing.assert_frame_equal(pt_df, frozen_df, check_exact=False, rtol=1e-12)
+    print('the power transformation is the same')
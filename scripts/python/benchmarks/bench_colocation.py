@@ -0,0 +1,67 @@
+# Import the libraries
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stations import EARTH_RADIUS, close_pairs
+
+
+# Define a function for creating synthetic stations of three sources where a share of the stations of each source
+# are also reported by another source a few hundred metres away
+def make_stations(rng, n_stations, shared=0.2):
+    lat = rng.uniform(-50, 70, n_stations)
+    lon = rng.uniform(-150, 170, n_stations)
+    origin = rng.choice(['GEMStat', 'Waterbase', 'GLORICH'], n_stations)
+    copies = rng.rand(n_stations) < shared
+    n_copies = copies.sum()
+    return pd.DataFrame({
+        'origin': np.r_[origin, rng.choice(['GEMStat', 'Waterbase', 'GLORICH'], n_copies)],
+        'station_id': np.arange(n_stations + n_copies),
+        'lat': np.r_[lat, lat[copies] + rng.normal(0, 0.003, n_copies)],
+        'lon': np.r_[lon, lon[copies] + rng.normal(0, 0.003, n_copies)],
+        'count': 1
+    })
+
+
+# Define a function for finding the close pairs by computing the haversine distance of all pairs (in blocks)
+def all_pairs(station_df, radius_km, block=1000):
+    lat = np.radians(station_df['lat'].to_numpy())
+    lon = np.radians(station_df['lon'].to_numpy())
+    origin = station_df['origin'].to_numpy()
+    pairs = []
+    for start in range(0, len(lat), block):
+        i = np.arange(start, min(start + block, len(lat)))[:, None]
+        h = np.sin((lat[i] - lat) / 2) ** 2 + np.cos(lat[i]) * np.cos(lat) * np.sin((lon[i] - lon) / 2) ** 2
+        close = (2 * EARTH_RADIUS * np.arcsin(np.sqrt(h)) <= radius_km) & (i < np.arange(len(lat)))
+        close &= origin[i] != origin
+        pairs.append(np.column_stack(np.nonzero(close)) + [start, 0])
+    return np.concatenate(pairs)
+
+
+if __name__ == '__main__':
+    # Numbers of stations and the radius in km
+    sizes = [int(float(size)) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10 ** 3, 10 ** 4,
+                                                                                              10 ** 5]
+    radius_km = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    # Largest number of stations compared with all pairs (the time grows with the square of the stations)
+    max_all_pairs = 2 * 10 ** 4
+    rng = np.random.RandomState(0)
+
+    for n_stations in sizes:
+        station_df = make_stations(rng, n_stations)
+        start = time.perf_counter()
+        pairs = close_pairs(station_df, radius_km)
+        print('{:>8} stations, KD-tree:   {:8.3f} s, {} pairs'.format(len(station_df), time.perf_counter() - start,
+                                                                     len(pairs)))
+        if len(station_df) <= max_all_pairs:
+            start = time.perf_counter()
+            expected = all_pairs(station_df, radius_km)
+            print('{:>8} stations, all pairs: {:8.3f} s, {} pairs'.format(len(station_df),
+                                                                         time.perf_counter() - start, len(expected)))
+            # Compare the pairs regardless of their order
+            found = set(map(tuple, np.sort(pairs, axis=1)))
+            assert found == set(map(tuple, np.sort(expected, axis=1)))
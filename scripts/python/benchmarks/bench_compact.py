@@ -0,0 +1,41 @@
+# Import the libraries
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import write_intermediates
+
+# Location of data_cleaning.py
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code that runs data_cleaning.py and prints out the peak resident memory of the process
+RUNNER = '''import resource, runpy, sys
+sys.path.insert(0, {0!r})
+runpy.run_path({1!r}, run_name='__main__')
+print('peak RSS {{:.0f}} MB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+'''.format(SCRIPT_DIR, os.path.join(SCRIPT_DIR, 'data_cleaning.py'))
+
+# Number of observations in the synthetic datasets
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+
+with tempfile.TemporaryDirectory() as tmp:
+    write_intermediates(tmp, n_rows)
+    outputs = []
+    for compact in ['0', '1']:
+        # Run data_cleaning.py in a separate process and measure its time and peak resident memory
+        env = dict(os.environ, WQ_DATA_DIR=tmp, WQ_COMPACT=compact)
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', RUNNER], env=env, stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        elapsed = time.perf_counter() - start
+        memory = [line for line in result.stdout.splitlines() if 'MB of memory' in line or 'peak RSS' in line]
+        print('WQ_COMPACT={}: {:.2f} s'.format(compact, elapsed))
+        for line in memory:
+            print('    ' + line)
+        # Keep the full monthly data for the comparison
+        fname = os.path.join(tmp, 'full_monthly_data_{}.csv'.format(compact))
+        os.replace(os.path.join(tmp, 'full_monthly_data.csv'), fname)
+        outputs.append(fname)
+    print('full_monthly_data.csv identical: {}'.format(filecmp.cmp(outputs[0], outputs[1], shallow=False)))
@@ -0,0 +1,45 @@
+# Import the libraries
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cleaning_utils import check_date, date_month
+
+# Number of rows in the synthetic dataset
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+
+# Create valid dates and mix in malformed ones the way they appear in the source files
+rng = np.random.RandomState(0)
+dates = pd.Series(pd.to_datetime('1970-01-01') + pd.to_timedelta(rng.randint(0, 18000, n_rows), unit='D'))
+dates = dates.dt.strftime('%Y-%m-%d')
+bad_dates = ['2001-02-29', '2000-02-30', '1999-13-01', '1999-00-10', '2005-04-31', '2005-04', '2005',
+             '', '0000-01-01', '2005-04-01-extra', ' 2005- 4-01', '+2005-04-01', '2005/04/01', '2005-4-1x',
+             '2005-04-01 00:00:00', '2000-02-29', '1900-02-29', '2400-02-29', '10000-01-01', '2_005-04-01',
+             '\u0968\u0966\u0966\u096b-04-01', '2005-04-\u00b9']
+bad_idx = rng.choice(n_rows, n_rows // 20, replace=False)
+dates.iloc[bad_idx] = rng.choice(bad_dates, len(bad_idx))
+wq_df = pd.DataFrame({'date': dates})
+
+# Time the row-wise check and the separate month parse
+start = time.perf_counter()
+ok_date = wq_df.apply(check_date, axis=1)
+old_df = wq_df[ok_date == True].copy()
+old_df['month'] = [int(d.split('-')[1]) for d in old_df['date']]
+old_time = time.perf_counter() - start
+
+# Time the vectorized check
+start = time.perf_counter()
+month = date_month(wq_df['date'])
+new_df = wq_df[month.notnull()].copy()
+new_df['month'] = month[month.notnull()].astype(int)
+new_time = time.perf_counter() - start
+
+# Check that the accepted rows and their months are identical
+pd.testing.assert_frame_equal(old_df, new_df)
+print('{} rows, {} accepted'.format(n_rows, len(new_df)))
+print('check_date apply: {:.2f} s'.format(old_time))
+print('date_month:       {:.2f} s ({:.1f}x faster)'.format(new_time, old_time / new_time))
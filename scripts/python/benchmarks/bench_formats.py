@@ -0,0 +1,45 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from output_utils import FORMATS, read_table, table_fname, write_table
+from synthetic import make_dates
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5 * 10 ** 6
+rng = np.random.RandomState(0)
+station_ids = np.array(['GEMS-{:05d}'.format(i) for i in range(5000)])
+station = rng.randint(0, len(station_ids), n_rows)
+param_code = rng.choice(['TP', 'TN', 'NO3', 'pH', 'DOC', 'TEMP'], n_rows)
+
+# Intermediate observations like the output of a prep script (with typed dates)
+out_df = pd.DataFrame({
+    'lat': np.round(rng.uniform(-50, 70, len(station_ids)), 4)[station],
+    'lon': np.round(rng.uniform(-150, 170, len(station_ids)), 4)[station],
+    'date': pd.to_datetime(make_dates(rng, n_rows, bad_share=0), format='%Y-%m-%d'),
+    'station_id': station_ids[station],
+    'param_code': param_code,
+    'param_desc': pd.Series(param_code).str.lower(),
+    'value': np.round(rng.lognormal(0, 1, n_rows), 3),
+    'unit': rng.choice(['mg/l', 'umol/l'], n_rows),
+    'origin': 'GEMStat'
+})
+
+with tempfile.TemporaryDirectory() as tmp:
+    print('{:<10} {:>10} {:>10} {:>10} {:>12}'.format('format', 'write s', 'read s', 'file MB', 'DF MB'))
+    for fmt in FORMATS:
+        fname = os.path.join(tmp, 'gemstat')
+        start = time.perf_counter()
+        write_table(out_df, fname, fmt)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        df = read_table(fname, fmt)
+        read_time = time.perf_counter() - start
+        print('{:<10} {:>10.2f} {:>10.2f} {:>10.1f} {:>12.1f}'.format(
+            fmt, write_time, read_time, os.path.getsize(table_fname(fname, fmt)) / 1e6,
+            df.memory_usage(deep=True).sum() / 1e6))
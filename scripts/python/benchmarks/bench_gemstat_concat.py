@@ -0,0 +1,83 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import zipfile
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gemstat_utils import OBS_COLS, concat_sheets, obs_sheets
+
+
+# Define a function to create a synthetic observation sheet (a share of the rows repeat between sheets)
+def make_sheet(rng, n_rows, n_stations=50):
+    return pd.DataFrame({
+        'GEMS Station Number': rng.randint(0, n_stations, n_rows).astype(str),
+        'Sample Date': pd.Series(pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.randint(0, 365, n_rows), unit='D'))
+        .dt.strftime('%Y-%m-%d'),
+        'Sample Time': '12:00',
+        'Depth': 0.5,
+        'Parameter Code': rng.choice(['NO3N', 'TP', 'pH', 'EC'], n_rows),
+        'Analysis Method Code': 'M1',
+        'Value Flags': np.where(rng.rand(n_rows) < 0.05, '<', None),
+        'Value': np.round(rng.rand(n_rows) * 10, 1),
+        'Unit': 'mg/l',
+        'Data Quality': 'Good'
+    })
+
+
+# Define a function with the original loop that drops duplicates after every sheet
+def concat_loop(sheet_groups, columns):
+    obs_df = pd.DataFrame(columns=columns)
+    for sheets in sheet_groups:
+        for sheet_df in sheets:
+            obs_df = pd.concat([obs_df, sheet_df], ignore_index=False)
+            obs_df.drop_duplicates(inplace=True)
+            obs_df.reset_index(drop=True, inplace=True)
+    return obs_df
+
+
+# Define a function to write the sheets into zipped Excel files like the GEMStat downloads
+def write_zips(sheet_groups, dirname):
+    zipfiles = []
+    for i, sheets in enumerate(sheet_groups):
+        xls_name = os.path.join(dirname, 'gemstat_{}.xlsx'.format(i))
+        with pd.ExcelWriter(xls_name) as writer:
+            for meta in ['Station_Metadata', 'Parameter_Metadata', 'Methods_Metadata']:
+                pd.DataFrame({'a': [1]}).to_excel(writer, sheet_name=meta, index=False)
+            for j, sheet in enumerate(sheets):
+                sheet.to_excel(writer, sheet_name='Sheet{}'.format(j), index=False)
+        zip_name = xls_name + '.zip'
+        with zipfile.ZipFile(zip_name, 'w') as zf:
+            zf.write(xls_name, os.path.basename(xls_name))
+        zipfiles.append(zip_name)
+    return zipfiles
+
+
+rng = np.random.RandomState(0)
+rows_per_sheet = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+sheets_per_zip = 5
+
+# Check the zipped Excel round trip on a small set of files
+groups = [[make_sheet(rng, 200) for _ in range(3)] for _ in range(2)]
+with tempfile.TemporaryDirectory() as tmp:
+    zipfiles = write_zips(groups, tmp)
+    pd.testing.assert_frame_equal(concat_loop(obs_sheets(zipfiles), OBS_COLS),
+                                  concat_sheets(obs_sheets(zipfiles), OBS_COLS))
+
+# Time both versions with a growing number of sheets
+print('{:>7} {:>10} {:>12} {:>12}'.format('sheets', 'rows', 'loop (s)', 'single (s)'))
+for n_sheets in [10, 20, 40, 80, 160]:
+    groups = [[make_sheet(rng, rows_per_sheet) for _ in range(sheets_per_zip)]
+              for _ in range(n_sheets // sheets_per_zip)]
+    start = time.perf_counter()
+    old_df = concat_loop(groups, OBS_COLS)
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new_df = concat_sheets(groups, OBS_COLS)
+    new_time = time.perf_counter() - start
+    pd.testing.assert_frame_equal(old_df, new_df)
+    print('{:>7} {:>10} {:>12.2f} {:>12.2f}'.format(n_sheets, n_sheets * rows_per_sheet, old_time, new_time))
@@ -0,0 +1,74 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import zipfile
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gemstat_utils import OBS_COLS, combine_archives, concat_sheets, obs_sheets, read_archives, sheet_df
+from schemas import GEMSTAT_OBS, GEMSTAT_PARAMETERS, GEMSTAT_STATIONS, apply_schema
+
+
+# Define a function to write a synthetic zipped GEMStat Excel file
+def write_zip(rng, dirname, i, n_sheets, n_rows):
+    xls_name = os.path.join(dirname, 'gemstat_{}.xlsx'.format(i))
+    stations = ['S{}_{}'.format(i, j) for j in range(20)]
+    with pd.ExcelWriter(xls_name) as writer:
+        pd.DataFrame({'GEMS Station Number': stations,
+                      'Water Type': rng.choice(['River station', 'Lake station'], len(stations)),
+                      'Latitude': rng.uniform(-60, 70, len(stations)),
+                      'Longitude': rng.uniform(-180, 180, len(stations))}) \
+            .to_excel(writer, sheet_name='Station_Metadata', index=False)
+        pd.DataFrame({'Parameter Code': ['NO3N', 'TP', 'pH'],
+                      'Parameter Long Name': ['Nitrate', 'Total phosphorus', 'pH']}) \
+            .to_excel(writer, sheet_name='Parameter_Metadata', index=False)
+        pd.DataFrame({'Method': ['M1']}).to_excel(writer, sheet_name='Methods_Metadata', index=False)
+        for j in range(n_sheets):
+            pd.DataFrame({
+                'GEMS Station Number': rng.choice(stations, n_rows),
+                'Sample Date': '2001-01-{:02d}'.format(j + 1),
+                'Sample Time': '12:00',
+                'Depth': 0.5,
+                'Parameter Code': rng.choice(['NO3N', 'TP', 'pH'], n_rows),
+                'Analysis Method Code': 'M1',
+                'Value Flags': None,
+                'Value': np.round(rng.rand(n_rows) * 10, 2),
+                'Unit': 'mg/l',
+                'Data Quality': 'Good'
+            }).to_excel(writer, sheet_name='Obs{}'.format(j), index=False)
+    zip_name = xls_name + '.zip'
+    with zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(xls_name, os.path.basename(xls_name))
+    os.remove(xls_name)
+    return zip_name
+
+
+if __name__ == '__main__':
+    # Number of archives, sheets per archive, rows per sheet and the largest number of workers
+    n_zips = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n_sheets, n_rows = 4, 1000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    rng = np.random.RandomState(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zipfiles = [write_zip(rng, tmp, i, n_sheets, n_rows) for i in range(n_zips)]
+
+        # Time the serial version that opens every archive once per metadata sheet and once for the observations
+        start = time.perf_counter()
+        serial = (apply_schema(sheet_df(zipfiles, 'Station_Metadata'), GEMSTAT_STATIONS),
+                  apply_schema(sheet_df(zipfiles, 'Parameter_Metadata'), GEMSTAT_PARAMETERS),
+                  apply_schema(concat_sheets(obs_sheets(zipfiles), OBS_COLS), GEMSTAT_OBS))
+        print('serial sheet_df + obs_sheets: {:.2f} s'.format(time.perf_counter() - start))
+
+        # Time the single-pass version with a growing number of workers and check that the DFs are the same
+        for workers in range(1, max_workers + 1):
+            start = time.perf_counter()
+            dfs = combine_archives(read_archives(zipfiles, workers=workers))
+            elapsed = time.perf_counter() - start
+            for serial_df, df in zip(serial, dfs):
+                pd.testing.assert_frame_equal(serial_df, df)
+            print('read_archives, {} worker(s): {:.2f} s'.format(workers, elapsed))
@@ -0,0 +1,109 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from glorich_utils import long_observations
+from schemas import GLORICH_PARAMETERS, full_row_schema, glorich_obs_schema, read_csv
+
+
+# Define a function for measuring the time and the peak of allocated memory in a second run, since tracing the
+# allocations slows down the conversion of the value strings much more than the array operations
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    df = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<30} {:>8.2f} s {:>10.1f} MB peak {:>10} rows'.format(label, elapsed, peak / 1e6, len(df)))
+    return df
+
+
+# Define a function for writing a synthetic hydrochemistry.csv with decimal commas, missing values and remarks
+def write_hydrochemistry(rng, fname, n_samples, n_params, n_stations):
+    wide = {'STAT_ID': rng.randint(0, n_stations, n_samples),
+            'RESULT_DATETIME': rng.choice(pd.date_range('1990-01-01', '2010-12-31').strftime('%d.%m.%Y 12:00'),
+                                          n_samples)}
+    for i in range(n_params):
+        values = pd.Series(np.round(rng.lognormal(0, 1, n_samples), 3)).astype(str).str.replace('.', ',',
+                                                                                                 regex=False)
+        wide['P{}'.format(i)] = values.where(rng.rand(n_samples) < 0.4)
+        wide['P{}_vrc'.format(i)] = np.where(rng.rand(n_samples) < 0.05, '<', None)
+    pd.DataFrame(wide).to_csv(fname, sep=';', index=False)
+
+
+# Define a function for reshaping the observations like glorich_prep.py did before (two melts and a string pass)
+def melt_twice(fname, stat_df, param_df):
+    obs_schema = glorich_obs_schema(pd.read_csv(fname, sep=';', nrows=0).columns)
+    value_cols = [col[:-4] for col in obs_schema['categorical']]
+    vrc_cols = obs_schema['categorical']
+    dtype = {col: str for col in value_cols}
+    dtype.update({col: 'category' for col in vrc_cols})
+    dtype['STAT_ID'] = 'int64'
+    obs_df = pd.read_csv(fname, sep=';', usecols=obs_schema['usecols'], dtype=dtype)
+    obs_df.drop_duplicates(inplace=True)
+    obs_df.reset_index(drop=True, inplace=True)
+    obs_df['date'] = pd.to_datetime(obs_df['RESULT_DATETIME'], format='%d.%m.%Y %H:%M').dt.strftime('%Y-%m-%d')
+    value_df = pd.melt(obs_df, id_vars=['STAT_ID', 'date'], value_vars=value_cols, var_name='obs_param',
+                       value_name='obs_value')
+    value_df['obs_value'] = value_df['obs_value'].str.replace(',', '.')
+    value_df['obs_value'] = value_df['obs_value'].astype(float)
+    vrc_df = pd.melt(obs_df, id_vars=['STAT_ID'], value_vars=vrc_cols, var_name='remark_param',
+                     value_name='remark_value')
+    vrc_df.drop(['STAT_ID'], axis=1, inplace=True)
+    obs_df = pd.concat([value_df, vrc_df], axis=1)
+    obs_df = obs_df[pd.isnull(obs_df['remark_value'])]
+    out_df = stat_df.merge(obs_df, on='STAT_ID')
+    out_df = out_df.merge(param_df, left_on='obs_param', right_on='Parameter name')
+    return out_df[pd.notnull(out_df['obs_value'])]
+
+
+# Define a function for reshaping the observations like glorich_prep.py does now
+def pair_columns(fname, stat_df, param_df):
+    obs_cols = pd.read_csv(fname, sep=';', nrows=0).columns
+    obs_schema = glorich_obs_schema(obs_cols)
+    vrc_cols = obs_schema['categorical']
+    value_cols = [col[:-4] for col in vrc_cols]
+    obs_df = read_csv(fname, full_row_schema(obs_schema, obs_cols), sep=';')
+    obs_df.drop_duplicates(inplace=True)
+    obs_df = obs_df[obs_schema['usecols']].reset_index(drop=True)
+    obs_df['date'] = pd.to_datetime(obs_df['RESULT_DATETIME'], format='%d.%m.%Y %H:%M').dt.strftime('%Y-%m-%d')
+    obs_df = long_observations(obs_df, value_cols, vrc_cols)[0]
+    out_df = stat_df.merge(obs_df, on='STAT_ID')
+    return out_df.merge(param_df, left_on='obs_param', right_on='Parameter name')
+
+
+n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+n_params = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+rng = np.random.RandomState(0)
+stat_df = pd.DataFrame({'STAT_ID': np.arange(5000), 'lat': rng.uniform(-60, 70, 5000),
+                        'lon': rng.uniform(-180, 180, 5000)})
+
+with tempfile.TemporaryDirectory() as tmp:
+    fname = os.path.join(tmp, 'hydrochemistry.csv')
+    write_hydrochemistry(rng, fname, n_samples, n_params, len(stat_df))
+    param_fname = os.path.join(tmp, 'parameters.csv')
+    pd.DataFrame({'Parameter name': ['P{}'.format(i) for i in range(n_params)],
+                  'Description': ['Parameter {}'.format(i) for i in range(n_params)],
+                  'Unit': 'mg/l'}).to_csv(param_fname, sep=';', index=False)
+    param_df = read_csv(param_fname, GLORICH_PARAMETERS, sep=';')
+    print('{} samples with {} parameters'.format(n_samples, n_params))
+
+    # Time both reshapes from reading the file to the merged DF
+    old_df = measure('two melts', lambda: melt_twice(fname, stat_df, param_df))
+    new_df = measure('paired columns', lambda: pair_columns(fname, stat_df, param_df))
+
+    # Check that the same rows are kept in the same order
+    columns = ['STAT_ID', 'lat', 'lon', 'date', 'obs_param', 'obs_value', 'Description', 'Unit']
+    new_df['obs_param'] = new_df['obs_param'].astype(str)
+    old_df['obs_param'] = old_df['obs_param'].astype(str)
+    pd.testing.assert_frame_equal(old_df[columns].reset_index(drop=True), new_df[columns].reset_index(drop=True))
+    print('the reshaped observations are the same')
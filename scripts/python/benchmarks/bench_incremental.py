@@ -0,0 +1,53 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aggregation import update_monthly
+
+# Columns used for the grouping in data_cleaning.py
+GROUP_COLS = ['lat', 'lon', 'station_id', 'param_code', 'param_desc', 'unit', 'origin', 'month']
+
+
+# Define a function for creating synthetic cleaned observations
+def make_rows(rng, n_rows, stations):
+    station = rng.choice(stations, n_rows)
+    param_code = rng.choice(['TP', 'TN', 'NO3', 'pH'], n_rows)
+    return pd.DataFrame({
+        'lat': station * 0.01,
+        'lon': station * 0.02,
+        'station_id': np.char.add('S', station.astype(str)),
+        'param_code': param_code,
+        'param_desc': param_code,
+        'unit': 'ppm',
+        'origin': 'GEMStat',
+        'month': rng.randint(1, 13, n_rows),
+        'value': np.round(rng.lognormal(0, 1, n_rows), 3)
+    })
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+rng = np.random.RandomState(0)
+wq_df = make_rows(rng, n_rows, np.arange(10000))
+
+with tempfile.TemporaryDirectory() as store_dir:
+    update_monthly(store_dir, wq_df, GROUP_COLS)
+    # Add a release with observations of 5% of the stations and remove a few old rows
+    wq_df = pd.concat([wq_df.iloc[100:], make_rows(rng, n_rows // 20, np.arange(500))], ignore_index=True)
+
+    # Time the full aggregation and the update of the store
+    start = time.perf_counter()
+    full_df = wq_df.groupby(GROUP_COLS, observed=True)['value'].agg(['count', 'mean', 'std']).reset_index()
+    print('full groupby: {:.2f} s'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    monthly_df, changed_params = update_monthly(store_dir, wq_df, GROUP_COLS)
+    print('store update: {:.2f} s ({} changed parameters)'.format(time.perf_counter() - start, len(changed_params)))
+
+    # Check that the results are the same within floating-point tolerance
+    pd.testing.assert_frame_equal(full_df, monthly_df, check_exact=False, rtol=1e-9)
+    print('monthly statistics match the full aggregation')
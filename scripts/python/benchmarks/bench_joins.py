@@ -0,0 +1,88 @@
+# Import the libraries
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from join_utils import join_dimensions
+
+
+# Define a function for measuring the time and the peak of allocated memory (in a second run, since tracing the
+# allocations slows down the merges much more than the array indexing)
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    df = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<30} {:>8.2f} s {:>10.1f} MB peak {:>10} rows'.format(label, elapsed, peak / 1e6, len(df)))
+    return df
+
+
+# Define a function for creating synthetic GEMStat stations, parameters and observations (with the categorical keys
+# of the schemas)
+def make_tables(rng, n_rows, n_stations=5000, n_params=40):
+    stations = np.array(['S{:05d}'.format(i) for i in range(n_stations)])
+    params = np.array(['P{:02d}'.format(i) for i in range(n_params)])
+    stat_df = pd.DataFrame({'GEMS Station Number': stations,
+                            'Water Type': pd.Categorical(rng.choice(['River station', 'Lake station'], n_stations,
+                                                                    p=[0.8, 0.2])),
+                            'Latitude': np.where(rng.rand(n_stations) < 0.02, np.nan, rng.uniform(-50, 70, n_stations)),
+                            'Longitude': rng.uniform(-150, 170, n_stations)})
+    param_df = pd.DataFrame({'Parameter Code': params, 'Parameter Long Name': ['Parameter ' + p for p in params]})
+    obs_df = pd.DataFrame({
+        'GEMS Station Number': pd.Categorical(rng.choice(stations, n_rows)),
+        'Sample Date': pd.Categorical(rng.choice(pd.date_range('1990-01-01', '2010-12-31').strftime('%Y-%m-%d'),
+                                                 n_rows)),
+        'Parameter Code': pd.Categorical(rng.choice(params, n_rows)),
+        'Value Flags': pd.Categorical(np.where(rng.rand(n_rows) < 0.05, '<', None)),
+        'Value': np.where(rng.rand(n_rows) < 0.02, np.nan, rng.lognormal(0, 1, n_rows)),
+        'Unit': pd.Categorical(rng.choice(['mg/l', 'umol/l'], n_rows))
+    })
+    return stat_df, param_df, obs_df
+
+
+# Define a function for the joins and filters like gemstat_extraction.py did before (merges, then filters)
+def merge_then_filter(stat_df, param_df, obs_df, extract):
+    df = stat_df.merge(obs_df, on='GEMS Station Number').merge(param_df, on='Parameter Code')
+    df = df[(df['Latitude'].notnull()) & (df['Longitude'].notnull())]
+    df = df[df['Water Type'] == 'River station']
+    df = df[df['Parameter Code'].isin(extract)]
+    df = df[df['Value'].notnull()]
+    df = df[df['Value'] > 0]
+    return df[df['Value Flags'].isnull()]
+
+
+# Define a function for the joins and filters like gemstat_extraction.py does now (filters, then array indexing)
+def filter_then_join(stat_df, param_df, obs_df, extract):
+    stat_df = stat_df[(stat_df['Latitude'].notnull()) & (stat_df['Longitude'].notnull())]
+    stat_df = stat_df[stat_df['Water Type'] == 'River station']
+    obs_df = obs_df[obs_df['Parameter Code'].isin(extract)]
+    obs_df = obs_df[obs_df['Value'].notnull()]
+    obs_df = obs_df[obs_df['Value'] > 0]
+    obs_df = obs_df[obs_df['Value Flags'].isnull()]
+    return join_dimensions(obs_df, [(stat_df, 'GEMS Station Number', 'GEMS Station Number'),
+                                    (param_df, 'Parameter Code', 'Parameter Code')])
+
+
+if __name__ == '__main__':
+    # Numbers of observations
+    sizes = [int(float(size)) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10 ** 6, 5 * 10 ** 6]
+    rng = np.random.RandomState(0)
+
+    for n_rows in sizes:
+        stat_df, param_df, obs_df = make_tables(rng, n_rows)
+        extract = param_df['Parameter Code'].iloc[::2].tolist()
+        print('{} observations:'.format(n_rows))
+        before = measure('merge, then filter', lambda: merge_then_filter(stat_df, param_df, obs_df, extract))
+        after = measure('filter, then join by position', lambda: filter_then_join(stat_df, param_df, obs_df,
+                                                                                  extract))
+        # Check that the rows, their order and the columns are the same
+        pd.testing.assert_frame_equal(before.reset_index(drop=True).astype(str), after.astype(str))
+        del before, after
@@ -0,0 +1,73 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cleaning_utils import ParamMap
+from synthetic import write_intermediates
+
+
+# Define a function for measuring the time and the peak of allocated memory
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<30} {:>8.2f} s {:>10.1f} MB peak'.format(label, elapsed, peak / 1e6))
+    return df
+
+
+# Define a function for mapping the parameters like data_cleaning.py did before (a merge for each dataset)
+def merge_maps(sources, map_df):
+    merged = []
+    for source, origin in zip(sources, ['GEMStat', 'Waterbase', 'GLORICH']):
+        source_map = map_df[map_df['origin'] == origin].drop(['origin'], axis=1)
+        merged.append(source.merge(source_map, on='param_code'))
+    wq_df = pd.concat(merged)
+    wq_df = wq_df[pd.notnull(wq_df['new_code'])]
+    wq_df['value'] = wq_df['value'] / wq_df['divisor'] * wq_df['multiplier']
+    wq_df['param_code'] = wq_df['new_code']
+    wq_df['param_desc'] = wq_df['new_desc']
+    wq_df['unit'] = wq_df['new_unit']
+    return wq_df.drop(['divisor', 'multiplier', 'new_code', 'new_desc', 'new_unit'], axis=1)
+
+
+# Define a function for mapping the parameters with the compiled index like data_cleaning.py does now
+def index_map(sources, map_df):
+    param_map = ParamMap(map_df)
+    wq_df = pd.concat(sources, ignore_index=True)
+    pos = param_map.positions(wq_df)
+    keep = pos >= 0
+    keep[keep] = param_map.mapped[pos[keep]]
+    wq_df = wq_df[keep]
+    pos = pos[keep]
+    wq_df['value'] = param_map.convert(wq_df['value'], pos)
+    wq_df['param_code'] = param_map.take('new_code', pos)
+    wq_df['param_desc'] = param_map.take('new_desc', pos)
+    wq_df['unit'] = param_map.take('new_unit', pos)
+    return wq_df
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 3 * 10 ** 6
+
+with tempfile.TemporaryDirectory() as tmp:
+    write_intermediates(tmp, n_rows)
+    sources = [pd.read_csv(os.path.join(tmp, name, name + '.csv'), sep=';')
+               for name in ['gemstat', 'waterbase', 'glorich']]
+    map_df = pd.read_csv(os.path.join(tmp, 'data_map.csv'), sep=';')
+    map_df['new_unit'] = map_df['new_unit'].fillna('')
+
+    # Time both mappings
+    old_df = measure('merge for each dataset', lambda: merge_maps(sources, map_df))
+    new_df = measure('compiled index', lambda: index_map(sources, map_df))
+
+    # Check that the mapped observations are the same
+    pd.testing.assert_frame_equal(old_df.reset_index(drop=True), new_df.reset_index(drop=True), check_dtype=False)
+    print('{} mapped observations are the same'.format(len(new_df)))
@@ -0,0 +1,87 @@
+# Import the libraries
+import json
+import os
+import shutil
+import sys
+import tempfile
+from synthetic import write_sources
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import run_script
+
+# Scripts in the order they run (data_cleaning.py reads the outputs of the prep scripts)
+SCRIPTS = ['gemstat_prep.py', 'waterbase_prep.py', 'glorich_prep.py', 'data_cleaning.py']
+
+
+# Define a function for running the scripts on the raw inputs of a data directory and collecting their wall time,
+# peak memory and slowest step (from the reports of the StepLog)
+def time_scripts(data_dir, n_rows):
+    profile_dir = os.path.join(data_dir, 'profile')
+    env = dict(os.environ, WQ_DATA_DIR=data_dir, WQ_QUIET='1', WQ_PROFILE_DIR=profile_dir, WQ_PROFILE_FORMAT='json')
+    # Parse the Excel files again in every run instead of reading the sheet cache or the shards of an earlier run
+    shutil.rmtree(os.path.join(data_dir, 'gemstat', 'sheet_cache'), ignore_errors=True)
+    shutil.rmtree(os.path.join(data_dir, 'gemstat', 'shards'), ignore_errors=True)
+    results = []
+    for script in SCRIPTS:
+        name = script[:-3]
+        log_fname = os.path.join(data_dir, name + '.log')
+        code, seconds, peak = run_script(script, env, log_fname)
+        slowest, error = '-', None
+        report = os.path.join(profile_dir, name + '_profile.json')
+        if code == 0 and os.path.exists(report):
+            with open(report) as f:
+                step = max(json.load(f)['steps'], key=lambda record: record['seconds'])
+            slowest = '{} ({:.2f} s)'.format(step['step'], step['seconds'])
+        elif code != 0:
+            # Keep the last line of the log (the error) since the data directory may be removed
+            with open(log_fname) as f:
+                lines = f.read().strip().splitlines()
+            error = lines[-1] if lines else 'exit code {}'.format(code)
+        results.append({'rows': n_rows, 'script': name, 'status': 'done' if code == 0 else 'failed',
+                        'seconds': seconds, 'peak': peak, 'slowest': slowest, 'error': error})
+    return results
+
+
+# Define a function for printing out the results with the growth of the time between the sizes (about 10x for a
+# script that scales linearly when the number of rows grows 10x)
+def print_results(results):
+    print('{:>10} {:<16} {:<7} {:>9} {:>8} {:>9} {:>9}  {}'.format('rows', 'script', 'status', 'time (s)', 'growth',
+                                                                   'us/row', 'peak (MB)', 'slowest step'))
+    previous = {}
+    for result in results:
+        last = previous.get(result['script'])
+        growth = '-'
+        if last is not None and last['status'] == 'done' and result['status'] == 'done':
+            growth = '{:.1f}x'.format(result['seconds'] / last['seconds'])
+        peak = '{:.0f}'.format(result['peak'] / 1e6) if result['peak'] else '-'
+        print('{:>10} {:<16} {:<7} {:>9.2f} {:>8} {:>9.2f} {:>9}  {}'.format(
+            result['rows'], result['script'], result['status'], result['seconds'], growth,
+            result['seconds'] / result['rows'] * 1e6, peak, result['slowest']))
+        previous[result['script']] = result
+
+
+if __name__ == '__main__':
+    # Numbers of observations (comma-separated, e.g. 1e4,1e5,1e6,1e7) and an optional directory where the synthetic
+    # inputs are kept and reused between runs (writing the Excel files of 10^7 rows takes a while)
+    sizes = [int(float(size)) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10 ** 4, 10 ** 5,
+                                                                                              10 ** 6]
+    keep_dir = sys.argv[2] if len(sys.argv) > 2 else None
+
+    base_dir = keep_dir if keep_dir is not None else tempfile.mkdtemp()
+    results = []
+    try:
+        for n_rows in sizes:
+            data_dir = os.path.join(base_dir, 'rows_{}'.format(n_rows))
+            if not os.path.exists(os.path.join(data_dir, 'data_map.csv')):
+                print('Writing the synthetic inputs with {} rows'.format(n_rows))
+                write_sources(data_dir, n_rows)
+            print('Running the scripts with {} rows'.format(n_rows))
+            results.extend(time_scripts(data_dir, n_rows))
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(base_dir)
+    print_results(results)
+    for result in results:
+        if result['error'] is not None:
+            print('{} failed with {} rows: {}'.format(result['script'], result['rows'], result['error']))
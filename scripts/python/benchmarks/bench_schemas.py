@@ -0,0 +1,92 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schemas import GEMSTAT_OBS, WATERBASE_OBS, WATERBASE_STATIONS, apply_schema, glorich_obs_schema, read_csv
+
+
+# Define a function for measuring the time, the peak of allocated memory and the memory of the resulting DF
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<40} {:>8.2f} s {:>10.1f} MB peak {:>10.1f} MB DF'.format(
+        label, elapsed, peak / 1e6, df.memory_usage(deep=True).sum() / 1e6))
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+rng = np.random.RandomState(0)
+stations = np.array(['SITE{:06d}'.format(i) for i in range(5000)])
+params = np.array(['CAS_{}'.format(i) for i in range(40)])
+
+with tempfile.TemporaryDirectory() as tmp:
+    # Waterbase stations with unused columns
+    fname = os.path.join(tmp, 'stations.csv')
+    pd.DataFrame({
+        'monitoringSiteIdentifier': stations,
+        'monitoringSiteIdentifierScheme': 'euMonitoringSiteCode',
+        'countryCode': rng.choice(['EE', 'LV', 'FI'], len(stations)),
+        'waterBodyIdentifierScheme': rng.choice(['euSurfaceWaterBodyCode', 'euGroundWaterBodyCode'], len(stations)),
+        'lon': rng.uniform(-10, 30, len(stations)),
+        'lat': rng.uniform(35, 70, len(stations))
+    }).to_csv(fname, index=False)
+    measure('Waterbase stations, inferred', lambda: pd.read_csv(fname))
+    measure('Waterbase stations, schema', lambda: read_csv(fname, WATERBASE_STATIONS))
+
+    # Waterbase observations with unused columns
+    fname = os.path.join(tmp, 'obs.csv')
+    pd.DataFrame({
+        'monitoringSiteIdentifier': rng.choice(stations, n_rows),
+        'monitoringSiteIdentifierScheme': 'euMonitoringSiteCode',
+        'parameterWaterBodyCategory': rng.choice(['RW', 'LW', 'GW'], n_rows),
+        'observedPropertyDeterminandCode': rng.choice(params, n_rows),
+        'procedureAnalysedMatrix': 'W',
+        'resultUom': rng.choice(['mg/L', 'ug/L'], n_rows),
+        'phenomenonTimeSamplingDate': rng.choice(pd.date_range('1990-01-01', '2016-12-31').strftime('%Y-%m-%d'),
+                                                 n_rows),
+        'sampleIdentifier': rng.randint(0, 10 ** 6, n_rows).astype(str),
+        'resultObservedValue': np.round(rng.rand(n_rows) * 10, 3),
+        'resultQualityObservedValueBelowLOQ': rng.choice(['False', 'True'], n_rows)
+    }).to_csv(fname, index=False)
+    measure('Waterbase observations, inferred', lambda: pd.read_csv(fname))
+    measure('Waterbase observations, schema', lambda: read_csv(fname, WATERBASE_OBS))
+
+    # GLORICH hydrochemistry with decimal commas and remark columns
+    fname = os.path.join(tmp, 'hydrochemistry.csv')
+    n_samples = n_rows // 20
+    wide = {'STAT_ID': rng.randint(0, 5000, n_samples), 'RESULT_DATETIME': '01.01.2000 00:00',
+            'SAMPLE_TIME_DESC': 'none', 'SAMPLING_MODE': 'single'}
+    for i in range(20):
+        values = pd.Series(np.round(rng.rand(n_samples) * 10, 2)).astype(str).str.replace('.', ',', regex=False)
+        wide['P{}'.format(i)] = values.where(rng.rand(n_samples) < 0.6)
+        wide['P{}_vrc'.format(i)] = np.where(rng.rand(n_samples) < 0.05, '<', None)
+    pd.DataFrame(wide).to_csv(fname, sep=';', index=False)
+    columns = pd.read_csv(fname, sep=';', nrows=0).columns
+    measure('GLORICH hydrochemistry, inferred', lambda: pd.read_csv(fname, sep=';'))
+    measure('GLORICH hydrochemistry, schema', lambda: read_csv(fname, glorich_obs_schema(columns), sep=';'))
+
+    # GEMStat observation sheet (Excel sheets are parsed whole, so the schema is applied after parsing)
+    sheet = pd.DataFrame({
+        'GEMS Station Number': rng.choice(stations, n_rows),
+        'Sample Date': '2001-01-01',
+        'Sample Time': '12:00',
+        'Depth': 0.5,
+        'Parameter Code': rng.choice(params, n_rows),
+        'Analysis Method Code': 'M1',
+        'Value Flags': np.where(rng.rand(n_rows) < 0.05, '<', None),
+        'Value': np.round(rng.rand(n_rows) * 10, 2),
+        'Unit': 'mg/l',
+        'Data Quality': 'Good'
+    }).astype(object)
+    measure('GEMStat observations, as parsed', lambda: sheet)
+    measure('GEMStat observations, schema', lambda: apply_schema(sheet, GEMSTAT_OBS))
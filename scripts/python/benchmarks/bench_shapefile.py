@@ -0,0 +1,67 @@
+# Import the libraries
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from synthetic import write_point_shapefile
+
+# Make the modules in scripts/python importable
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+from shapefile_utils import read_point_shapefile
+
+
+# Define a function for measuring the time of importing modules in a new Python process (the best of a few runs)
+def import_time(modules, runs=3):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', 'import ' + modules], cwd=SCRIPT_DIR, stderr=subprocess.PIPE)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return None
+    return min(times)
+
+
+if __name__ == '__main__':
+    # Numbers of stations in the synthetic shapefiles
+    sizes = [int(float(size)) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10 ** 4, 10 ** 5,
+                                                                                              10 ** 6]
+    rng = np.random.RandomState(0)
+
+    # Startup time of the Python process with the point reader and with the geo stack
+    for modules in ['sys', 'shapefile_utils', 'geopandas']:
+        elapsed = import_time(modules)
+        print('import {:<16} {}'.format(modules, 'not installed' if elapsed is None else '{:.2f} s'.format(elapsed)))
+
+    try:
+        import geopandas as gpd
+    except ImportError:
+        gpd = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_stations in sizes:
+            fname = os.path.join(tmp, 'stations_{}'.format(n_stations))
+            x = np.round(rng.uniform(-150, 170, n_stations), 4)
+            y = np.round(rng.uniform(-50, 70, n_stations), 4)
+            write_point_shapefile(fname, x, y, pd.DataFrame({'STAT_ID': np.arange(1, n_stations + 1),
+                                                             'STATION_NA': 'Station'}))
+
+            # Time the point reader and check the coordinates and IDs that were written
+            start = time.perf_counter()
+            df = read_point_shapefile(fname + '.shp', ['STAT_ID'])
+            print('{:>8} stations, point reader:    {:.3f} s'.format(n_stations, time.perf_counter() - start))
+            assert (df['lon'].to_numpy() == x).all() and (df['lat'].to_numpy() == y).all()
+            assert (df['STAT_ID'].to_numpy() == np.arange(1, n_stations + 1)).all()
+
+            # Time geopandas like glorich_prep.py used it before (with the coordinates of the geometry)
+            if gpd is not None:
+                start = time.perf_counter()
+                gdf = gpd.read_file(fname + '.shp')
+                gpd_df = pd.DataFrame({'STAT_ID': gdf['STAT_ID'], 'lat': gdf['geometry'].y,
+                                       'lon': gdf['geometry'].x})
+                print('{:>8} stations, geopandas:       {:.3f} s'.format(n_stations, time.perf_counter() - start))
+                pd.testing.assert_frame_equal(df, gpd_df, check_dtype=False)
@@ -0,0 +1,48 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gemstat_utils import combine_archives, read_archives
+from sheet_cache import SheetCache
+from bench_gemstat_workers import write_zip
+
+if __name__ == '__main__':
+    # Number of archives
+    n_zips = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rng = np.random.RandomState(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zipfiles = [write_zip(rng, tmp, i, 4, 2000) for i in range(n_zips)]
+        cache = SheetCache(os.path.join(tmp, 'sheet_cache'))
+
+        # Parse the files without the cache, then fill the cache and read from it
+        results = []
+        for label, run_cache in [('no cache', None), ('cold cache', cache), ('warm cache', cache)]:
+            start = time.perf_counter()
+            results.append(combine_archives(read_archives(zipfiles, workers=1, cache=run_cache)))
+            print('{}: {:.2f} s'.format(label, time.perf_counter() - start))
+        cache.report()
+
+        # Check that the cached DFs are the same as the parsed ones
+        for dfs in results[1:]:
+            for parsed_df, df in zip(results[0], dfs):
+                pd.testing.assert_frame_equal(parsed_df, df)
+
+        # Change one archive and check that only its sheets are parsed again
+        write_zip(rng, tmp, 0, 4, 2000)
+        cache.hits = cache.misses = 0
+        list(read_archives(zipfiles, workers=1, cache=cache))
+        cache.report()
+
+        # Apply a small size cap and check that the cache shrinks below it
+        cache.max_size = 10 ** 5
+        cache.evict()
+        size = sum(os.path.getsize(os.path.join(cache.dirname, f)) for f in os.listdir(cache.dirname)
+                   if f.endswith('.parquet'))
+        print('cache size after eviction: {} bytes'.format(size))
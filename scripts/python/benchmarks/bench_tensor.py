@@ -0,0 +1,92 @@
+# Import the libraries
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from feature_tensor import TENSOR_STATS, build_tensor, file_chunks, load_tensor
+
+
+# Define a function for measuring the time and the peak of allocated memory in a second run, since tracing the
+# allocations slows down the parsing of the CSV file (the pages of the memory-mapped files are not allocated by
+# Python, so they are not counted)
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<30} {:>8.2f} s {:>10.1f} MB peak'.format(label, elapsed, peak / 1e6))
+    return result
+
+
+# Define a function for writing synthetic monthly data where each station has a random share of the parameter x
+# month groups (like full_monthly_data.csv)
+def write_monthly(rng, fname, n_stations, n_params=20, share=0.3):
+    groups = n_params * 12
+    station = np.repeat(np.arange(n_stations), rng.binomial(groups, share, n_stations))
+    group = rng.randint(0, groups, len(station))
+    keys = pd.DataFrame({'station': station, 'group': group}).drop_duplicates()
+    station = keys['station'].to_numpy()
+    group = keys['group'].to_numpy()
+    origin = np.array(['GEMStat', 'GLORICH', 'Waterbase'])[station % 3]
+    df = pd.DataFrame({
+        'origin': origin,
+        'station_id': station.astype(str),
+        'lat': np.round(rng.uniform(-50, 70, n_stations), 5)[station],
+        'lon': np.round(rng.uniform(-150, 170, n_stations), 5)[station],
+        'param_code': np.array(['P{:02d}'.format(i) for i in range(n_params)])[group // 12],
+        'param_desc': 'Parameter',
+        'unit': 'mg/l',
+        'month': group % 12 + 1,
+        'mean': rng.lognormal(0, 1, len(station)),
+        'cv': rng.uniform(0, 1, len(station)),
+        'count': rng.randint(1, 30, len(station))
+    })
+    df.to_csv(fname, sep=';', index=False)
+    return len(df)
+
+
+# Define a function for building the arrays like one would without the chunked passes (reading all of the monthly
+# data and pivoting each statistic)
+def pivot_tensor(fname):
+    df = pd.read_csv(fname, sep=';', dtype={'origin': str, 'station_id': str})
+    df = df.set_index(['origin', 'station_id', 'lat', 'lon', 'param_code', 'month'])
+    columns = pd.MultiIndex.from_product([sorted(df.index.levels[4]), range(1, 13)])
+    arrays = {}
+    for stat in TENSOR_STATS:
+        pivot = df[stat].unstack(['param_code', 'month']).reindex(columns=columns)
+        arrays[stat] = pivot.to_numpy().reshape(len(pivot), -1, 12)
+    return arrays
+
+
+if __name__ == '__main__':
+    # Numbers of stations
+    sizes = [int(float(size)) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10 ** 4, 10 ** 5]
+    rng = np.random.RandomState(0)
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        for n_stations in sizes:
+            fname = os.path.join(tmp_dir, 'full_monthly_data.csv')
+            n_rows = write_monthly(rng, fname, n_stations)
+            out_dir = os.path.join(tmp_dir, 'tensor')
+            print('{} stations x 20 parameters x 12 months ({} monthly rows):'.format(n_stations, n_rows))
+            pivot = measure('read all, pivot', lambda: pivot_tensor(fname))
+            measure('two passes, memory maps', lambda: build_tensor(file_chunks(fname[:-4], chunk_size=10 ** 5),
+                                                                    out_dir))
+            # Check that the arrays are the same (the pivot is sorted by the same keys)
+            arrays = load_tensor(out_dir)[0]
+            assert np.allclose(arrays['mean'], pivot['mean'], rtol=1e-6, equal_nan=True)
+            assert np.array_equal(arrays['count'], np.nan_to_num(pivot['count']).astype('int32'))
+            del pivot, arrays
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,67 @@
+# Import the libraries
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cleaning_utils import read_trimming_criteria, trim_mask
+
+
+# Define a function for trimming like the Power-Transformation notebook did before (a subset of each parameter,
+# dropping the rows above the limit and concatenating the subsets)
+def trim_loop(wq_df, trim_df):
+    trim_dict = dict(zip(trim_df['param_code'], trim_df['upper_limit']))
+    subsets = []
+    for param in wq_df['param_code'].unique():
+        subset = wq_df[wq_df['param_code'] == param].copy()
+        limit = trim_dict.get(param)
+        subset.drop(subset[subset['value'] > limit].index, inplace=True)
+        subsets.append(subset)
+    return pd.concat(subsets)
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2 * 10 ** 7
+rng = np.random.RandomState(0)
+params = np.array(['P{}'.format(i) for i in range(18)])
+wq_df = pd.DataFrame({
+    'param_code': pd.Categorical.from_codes(rng.randint(0, len(params), n_rows), params),
+    'origin': pd.Categorical.from_codes(rng.randint(0, 3, n_rows), ['GEMStat', 'GLORICH', 'Waterbase']),
+    'value': rng.lognormal(0, 1, n_rows)
+})
+
+with tempfile.TemporaryDirectory() as tmp:
+    # Upper limits of all parameters (the format of trimming_criteria.csv)
+    fname = os.path.join(tmp, 'trimming_criteria.csv')
+    pd.DataFrame({'param_code': params, 'upper_limit': np.round(rng.uniform(3, 10, len(params)), 1)}).to_csv(
+        fname, sep=';', index=False)
+    trim_df = read_trimming_criteria(fname)
+
+    # Time the loop and the single mask
+    start = time.perf_counter()
+    old_df = trim_loop(wq_df, trim_df)
+    print('loop over parameters: {:.2f} s'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    new_df = wq_df[trim_mask(wq_df, trim_df)]
+    print('single mask: {:.2f} s'.format(time.perf_counter() - start))
+
+    # Check that the same rows are retained
+    pd.testing.assert_frame_equal(old_df.sort_index(), new_df)
+    print('{} of {} rows are retained by both'.format(len(new_df), n_rows))
+
+    # Check the lower limits and the limits of single origins against a row by row lookup on a sample
+    trim_df = pd.concat([trim_df, pd.DataFrame({'param_code': ['P0', 'P1'], 'origin': ['GLORICH', 'Waterbase'],
+                                                'lower_limit': [0.5, np.nan], 'upper_limit': [2.0, 1.5]})],
+                        ignore_index=True, sort=False)
+    sample = wq_df.sample(10 ** 4, random_state=0)
+    limits = {(row.param_code, row.origin if isinstance(row.origin, str) else ''): (row.lower_limit, row.upper_limit)
+              for row in trim_df.itertuples()}
+    expected = []
+    for row in sample.itertuples():
+        lower, upper = limits.get((row.param_code, row.origin), limits[(row.param_code, '')])
+        expected.append(not (row.value > upper or row.value < lower))
+    assert (trim_mask(sample, trim_df) == np.array(expected)).all()
+    print('lower limits and limits of single origins are applied')
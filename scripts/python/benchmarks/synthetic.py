@@ -0,0 +1,269 @@
+# Import the libraries
+import datetime
+import os
+import shutil
+import struct
+import sys
+import zipfile
+import numpy as np
+import pandas as pd
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from output_utils import write_table
+
+# Location of the repository data (data_map.csv)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data')
+
+
+# Define a function for creating synthetic dates with a share of malformed ones
+def make_dates(rng, n_rows, bad_share=0.01):
+    dates = pd.Series(pd.to_datetime('1980-01-01') + pd.to_timedelta(rng.randint(0, 13000, n_rows), unit='D'))
+    dates = dates.dt.strftime('%Y-%m-%d')
+    bad = rng.rand(n_rows) < bad_share
+    dates[bad] = rng.choice(['2001-02-29', '2005-04-31', '1999-13-01', '2005-04'], bad.sum())
+    return dates
+
+
+# Define a function for writing synthetic gemstat.csv, waterbase.csv and glorich.csv files (the outputs of the
+# prep scripts) with data_map.csv into a data directory laid out like the one used by data_cleaning.py
+# In the Parquet and Arrow formats the dates are typed like in the prep scripts (the malformed ones are missing)
+def write_intermediates(dirname, n_rows, n_stations=2000, seed=0, fmt='csv'):
+    rng = np.random.RandomState(seed)
+    map_df = pd.read_csv(os.path.join(DATA_DIR, 'data_map.csv'), sep=';')
+    for origin, subdir in [('GEMStat', 'gemstat'), ('Waterbase', 'waterbase'), ('GLORICH', 'glorich')]:
+        n = n_rows // 3
+        codes = map_df.loc[map_df['origin'] == origin, 'param_code'].tolist() + ['UNMAPPED']
+        station_ids = np.array(['{}-{:05d}'.format(subdir, i) for i in range(n_stations)])
+        station = rng.randint(0, n_stations, n)
+        lat = np.round(rng.uniform(-50, 70, n_stations), 4)
+        lon = np.round(rng.uniform(-150, 170, n_stations), 4)
+        param_code = rng.choice(codes, n)
+        os.makedirs(os.path.join(dirname, subdir), exist_ok=True)
+        out_df = pd.DataFrame({
+            'lat': lat[station],
+            'lon': lon[station],
+            'date': make_dates(rng, n),
+            'station_id': station_ids[station],
+            'param_code': param_code,
+            'param_desc': pd.Series(param_code).str.lower(),
+            'value': np.round(rng.lognormal(0, 1, n) - 0.05, 3),
+            'unit': rng.choice(['mg/l', 'umol/l'], n),
+            'origin': origin
+        })
+        if fmt != 'csv':
+            out_df['date'] = pd.to_datetime(out_df['date'], format='%Y-%m-%d', errors='coerce')
+        write_table(out_df, os.path.join(dirname, subdir, subdir), fmt)
+    shutil.copy(os.path.join(DATA_DIR, 'data_map.csv'), dirname)
+    os.makedirs(os.path.join(dirname, 'monthly-water-quality'), exist_ok=True)
+
+
+# Define a function for getting the parameter codes of a source in data_map.csv with a code that is not mapped
+def source_params(origin):
+    map_df = pd.read_csv(os.path.join(DATA_DIR, 'data_map.csv'), sep=';')
+    return pd.unique(map_df.loc[map_df['origin'] == origin, 'param_code']).tolist() + ['UNMAPPED']
+
+
+# Define a function for creating synthetic valid sampling dates
+def valid_dates(rng, n_rows):
+    dates = pd.to_datetime('1980-01-01') + pd.to_timedelta(rng.randint(0, 13000, n_rows), unit='D')
+    return pd.Series(dates.strftime('%Y-%m-%d'))
+
+
+# Define a function for writing the rows of a DF into a sheet of a write-only openpyxl workbook (the missing
+# values are left empty)
+def append_sheet(workbook, sheet_name, df):
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(df.columns))
+    for row in df.astype(object).where(df.notnull(), None).itertuples(index=False, name=None):
+        sheet.append(row)
+
+
+# Define a function for writing synthetic zipped GEMStat Excel files (Station_Metadata, Parameter_Metadata and
+# Methods_Metadata followed by the observation sheets) into the gemstat directory
+# The observations are split into n_files archives and sheets of at most sheet_rows rows (Excel holds about a
+# million rows per sheet)
+def write_gemstat(dirname, n_rows, n_stations=500, n_files=4, sheet_rows=250000, seed=0):
+    from openpyxl import Workbook
+    rng = np.random.RandomState(seed)
+    path = os.path.join(dirname, 'gemstat')
+    os.makedirs(path, exist_ok=True)
+    codes = source_params('GEMStat')
+    param_df = pd.DataFrame({'Parameter Code': codes,
+                             'Parameter Long Name': ['{} long name'.format(code) for code in codes]})
+    zipfiles = []
+    for i in range(n_files):
+        # Stations of the archive (every archive has its own stations like the downloads of the countries)
+        stations = np.array(['GEMS{:02d}-{:05d}'.format(i, j) for j in range(max(n_stations // n_files, 1))])
+        stat_df = pd.DataFrame({'GEMS Station Number': stations,
+                                'Water Type': rng.choice(['River station', 'Lake station'], len(stations),
+                                                         p=[0.8, 0.2]),
+                                'Latitude': np.round(rng.uniform(-50, 70, len(stations)), 4),
+                                'Longitude': np.round(rng.uniform(-150, 170, len(stations)), 4)})
+        workbook = Workbook(write_only=True)
+        append_sheet(workbook, 'Station_Metadata', stat_df)
+        append_sheet(workbook, 'Parameter_Metadata', param_df)
+        append_sheet(workbook, 'Methods_Metadata', pd.DataFrame({'Analysis Method Code': ['M1', 'M2'],
+                                                                 'Method Name': ['Method 1', 'Method 2']}))
+        n = n_rows // n_files + (1 if i < n_rows % n_files else 0)
+        for j, start in enumerate(range(0, n, sheet_rows)):
+            rows = min(sheet_rows, n - start)
+            obs_df = pd.DataFrame({
+                'GEMS Station Number': rng.choice(stations, rows),
+                'Sample Date': valid_dates(rng, rows),
+                'Sample Time': '12:00',
+                'Depth': 0.5,
+                'Parameter Code': rng.choice(codes, rows),
+                'Analysis Method Code': rng.choice(['M1', 'M2'], rows),
+                'Value Flags': np.where(rng.rand(rows) < 0.05, '<', None),
+                'Value': np.where(rng.rand(rows) < 0.02, np.nan, np.round(rng.lognormal(0, 1, rows), 3)),
+                'Unit': rng.choice(['mg/l', 'umol/l'], rows),
+                'Data Quality': 'Good'
+            })
+            append_sheet(workbook, 'Obs{}'.format(j), obs_df)
+        xls_name = os.path.join(path, 'gemstat_{}.xlsx'.format(i))
+        workbook.save(xls_name)
+        zip_name = xls_name + '.zip'
+        with zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.write(xls_name, os.path.basename(xls_name))
+        os.remove(xls_name)
+        zipfiles.append(zip_name)
+    return zipfiles
+
+
+# Define a function for writing synthetic Waterbase files (MonitoringSite, ObservedProperty and the
+# DisaggregatedData written in chunks) into the waterbase directory
+# A share of the stations are duplicated or have no location and a share of the observations are duplicated,
+# not in rivers or have no value, so every filter of waterbase_prep.py removes some rows
+def write_waterbase(dirname, n_rows, n_stations=2000, chunk_size=10 ** 6, seed=0):
+    rng = np.random.RandomState(seed)
+    path = os.path.join(dirname, 'waterbase')
+    os.makedirs(path, exist_ok=True)
+    codes = source_params('Waterbase')
+    stations = np.array(['EU{:06d}'.format(i) for i in range(n_stations)])
+    lat = np.round(rng.uniform(35, 70, n_stations), 4)
+    lon = np.round(rng.uniform(-10, 30, n_stations), 4)
+    no_location = rng.rand(n_stations) < 0.02
+    stat_df = pd.DataFrame({
+        'monitoringSiteIdentifier': stations,
+        'monitoringSiteIdentifierScheme': 'euMonitoringSiteCode',
+        'countryCode': rng.choice(['AT', 'DE', 'FR', 'SE'], n_stations),
+        'lat': np.where(no_location, np.nan, lat),
+        'lon': np.where(no_location, np.nan, lon),
+        'waterBodyIdentifierScheme': rng.choice(['euSurfaceWaterBodyCode', 'euGroundWaterBodyCode'], n_stations,
+                                                p=[0.9, 0.1])
+    })
+    stat_df = pd.concat([stat_df, stat_df.sample(frac=0.01, random_state=seed)], ignore_index=True)
+    stat_df.to_csv(os.path.join(path, 'Waterbase_v2016_1_WISE4_MonitoringSite_DerivedData.csv'), index=False)
+    pd.DataFrame({'Notation': codes, 'Label': ['{} label'.format(code) for code in codes],
+                  'Definition': ''}).to_csv(os.path.join(path, 'ObservedProperty.csv'), index=False)
+    fname = os.path.join(path, 'Waterbase_v2016_1_T_WISE4_DisaggregatedData.csv')
+    for start in range(0, n_rows, chunk_size):
+        rows = min(chunk_size, n_rows - start)
+        obs_df = pd.DataFrame({
+            'monitoringSiteIdentifier': rng.choice(stations, rows),
+            'monitoringSiteIdentifierScheme': 'euMonitoringSiteCode',
+            'parameterWaterBodyCategory': rng.choice(['RW', 'LW', 'GW'], rows, p=[0.8, 0.1, 0.1]),
+            'observedPropertyDeterminandCode': rng.choice(codes, rows),
+            'procedureAnalysedMatrix': 'W',
+            'resultUom': rng.choice(['mg/L', 'ug/L'], rows),
+            'phenomenonTimeSamplingDate': valid_dates(rng, rows),
+            'resultObservedValue': np.where(rng.rand(rows) < 0.02, np.nan, np.round(rng.lognormal(0, 1, rows), 3)),
+            'resultQualityObservedValueBelowLOQ': rng.rand(rows) < 0.05,
+            'parameterSampleDepth': np.nan,
+            'resultObservationStatus': 'A',
+            'remarks': ''
+        })
+        # Repeat a share of the rows like the duplicates of the download
+        obs_df = pd.concat([obs_df, obs_df.iloc[:rows // 100]], ignore_index=True)
+        obs_df.to_csv(fname, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+    return fname
+
+
+# Define a function for writing a point shapefile (.shp, .shx, .dbf and .prj in WGS84) with the attributes of
+# a DF with integer and string columns
+def write_point_shapefile(fname, x, y, attr_df):
+    n = len(x)
+    bbox = [np.min(x), np.min(y), np.max(x), np.max(y)] if n else [0.0] * 4
+    # Define a function for creating the header of the .shp and .shx files (the length is in 16-bit words)
+    def header(length):
+        return struct.pack('>7i', 9994, 0, 0, 0, 0, 0, length // 2) + struct.pack('<2i4d4d', 1000, 1, *bbox,
+                                                                                  0, 0, 0, 0)
+    # Point records: record number and content length (big-endian) and shape type, x and y (little-endian)
+    records = np.zeros(n, dtype=[('number', '>i4'), ('length', '>i4'), ('type', '<i4'), ('x', '<f8'), ('y', '<f8')])
+    records['number'] = np.arange(1, n + 1)
+    records['length'] = 10
+    records['type'] = 1
+    records['x'] = x
+    records['y'] = y
+    with open(fname + '.shp', 'wb') as f:
+        f.write(header(100 + 28 * n))
+        f.write(records.tobytes())
+    index = np.zeros(n, dtype=[('offset', '>i4'), ('length', '>i4')])
+    index['offset'] = (100 + 28 * np.arange(n)) // 2
+    index['length'] = 10
+    with open(fname + '.shx', 'wb') as f:
+        f.write(header(100 + 8 * n))
+        f.write(index.tobytes())
+    # Attributes as fixed-width fields: numbers (N) right-aligned and strings (C) left-aligned
+    fields, columns = [], []
+    for col in attr_df.columns:
+        is_number = pd.api.types.is_integer_dtype(attr_df[col])
+        values = attr_df[col].astype(str)
+        width = max(int(values.str.len().max()) if n else 1, 1)
+        fields.append(struct.pack('<11sc4xBB14x', col.encode('ascii')[:10], b'N' if is_number else b'C', width, 0))
+        columns.append(values.str.pad(width, side='left' if is_number else 'right'))
+    rows = pd.Series(' ', index=attr_df.index).str.cat(columns) if n else pd.Series([], dtype=str)
+    today = datetime.date.today()
+    record_length = 1 + sum(struct.unpack('<B', field[16:17])[0] for field in fields)
+    with open(fname + '.dbf', 'wb') as f:
+        f.write(struct.pack('<4BIHH20x', 3, today.year - 1900, today.month, today.day, n, 33 + 32 * len(fields),
+                            record_length))
+        f.write(b''.join(fields) + b'\r')
+        f.write(''.join(rows).encode('latin-1') + b'\x1a')
+    with open(fname + '.prj', 'w') as f:
+        f.write('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+                'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+
+
+# Define a function for writing synthetic GLORICH files (the sampling locations as a point shapefile,
+# parameters.csv and the wide hydrochemistry.csv with a value and a remark (_vrc) column per parameter) into the
+# glorich directory
+# The number of samples is chosen so that about n_rows values without remarks are in the file, the values have
+# decimal commas like the download
+def write_glorich(dirname, n_rows, n_stations=2000, fill=0.4, chunk_size=10 ** 5, seed=0):
+    rng = np.random.RandomState(seed)
+    path = os.path.join(dirname, 'glorich')
+    os.makedirs(path, exist_ok=True)
+    codes = source_params('GLORICH')
+    stat_ids = np.arange(1, n_stations + 1)
+    write_point_shapefile(os.path.join(path, 'Sampling_Locations_v1'), np.round(rng.uniform(-150, 170, n_stations), 4),
+                          np.round(rng.uniform(-50, 70, n_stations), 4),
+                          pd.DataFrame({'STAT_ID': stat_ids,
+                                        'STATION_NA': ['Station {}'.format(i) for i in stat_ids]}))
+    pd.DataFrame({'Parameter name': codes, 'Description': ['{} description'.format(code) for code in codes],
+                  'Unit': 'umol/l'}).to_csv(os.path.join(path, 'parameters.csv'), sep=';', index=False)
+    fname = os.path.join(path, 'hydrochemistry.csv')
+    n_samples = int(np.ceil(n_rows / (len(codes) * fill * 0.95)))
+    for start in range(0, n_samples, chunk_size):
+        rows = min(chunk_size, n_samples - start)
+        wide = {'STAT_ID': rng.choice(stat_ids, rows),
+                'RESULT_DATETIME': valid_dates(rng, rows) + ' 12:00:00',
+                'SAMPLE_TIME_DESC': 'single'}
+        for code in codes:
+            values = pd.Series(np.round(rng.lognormal(0, 1, rows), 3)).astype(str).str.replace('.', ',', regex=False)
+            wide[code] = values.where(rng.rand(rows) < fill)
+            wide[code + '_vrc'] = np.where(rng.rand(rows) < 0.05, '<', None)
+        pd.DataFrame(wide).to_csv(fname, sep=';', index=False, encoding='ISO-8859-1', mode='w' if start == 0 else 'a',
+                                  header=start == 0)
+    return fname
+
+
+# Define a function for writing the raw inputs of the three prep scripts with data_map.csv into a data directory
+# laid out like the one used by the scripts (about n_rows observations split between the sources)
+def write_sources(dirname, n_rows, n_stations=2000, seed=0):
+    write_gemstat(dirname, n_rows // 3, n_stations=n_stations // 4, seed=seed)
+    write_waterbase(dirname, n_rows // 3, n_stations=n_stations, seed=seed)
+    write_glorich(dirname, n_rows // 3, n_stations=n_stations, seed=seed)
+    shutil.copy(os.path.join(DATA_DIR, 'data_map.csv'), dirname)
+    os.makedirs(os.path.join(dirname, 'monthly-water-quality'), exist_ok=True)
@@ -0,0 +1,169 @@
+# Import the libraries
+import datetime
+import numpy as np
+import pandas as pd
+
+# Number of days in each month of a common year
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# Pattern of a date in the plain YYYY-MM-DD format written by the prep scripts (year 0000 is not valid)
+ISO_DATE = r'(?!0000)[0-9]{4}-[0-9]{2}-[0-9]{2}\Z'
+
+
+# Define a function to check if the date is valid
+def check_date(row):
+    correct_date = None
+    # Split the date into strings
+    strings = row['date'].split('-')
+    # Test the date
+    try:
+        # If the date is not in the correct format this will throw an IndexError
+        year, month, day = int(strings[0]), int(strings[1]), int(strings[2])
+        # If the date is not valid this will throw a ValueError
+        datetime.datetime(year, month, day)
+        correct_date = True
+    # If the previous block throws an error
+    except (IndexError, ValueError):
+        correct_date = False
+    return correct_date
+
+
+# Define a function for converting a date part into a number with int() like check_date (NaN if int() does not
+# accept it)
+def _part_number(string):
+    try:
+        return float(int(string))
+    except (ValueError, OverflowError):
+        return np.nan
+
+
+# Define a function to validate dates that are not in the plain YYYY-MM-DD format and extract the month
+def _loose_date_month(dates):
+    # Split the dates into the year, month and day (anything after the day is ignored like in check_date)
+    parts = dates.str.split('-', n=3, expand=True)
+    # Dates with less than three parts are not in the correct format
+    if parts.shape[1] < 3:
+        return np.full(len(dates), np.nan)
+    # Convert each part into a number with int() once per distinct string, so exactly the parts that int() accepts
+    # are numbers (also with a sign, whitespace, underscores between the digits or non-ASCII digits)
+    numbers = []
+    for i in range(3):
+        codes, uniques = pd.factorize(parts[i])
+        values = np.append(np.array([_part_number(string) for string in uniques], dtype=float), np.nan)
+        numbers.append(values[codes])
+    year, month, day = numbers
+    ok_date = ~(np.isnan(year) | np.isnan(month) | np.isnan(day))
+    # Check that the year and the month are within the calendar
+    ok_date &= (year >= datetime.MINYEAR) & (year <= datetime.MAXYEAR) & (month >= 1) & (month <= 12)
+    # Check that the day exists in the month (February has 29 days in leap years)
+    month_idx = np.where(ok_date, month, 1).astype(int) - 1
+    year_int = np.where(ok_date, year, 1).astype(int)
+    leap = (year_int % 4 == 0) & ((year_int % 100 != 0) | (year_int % 400 == 0))
+    max_day = MONTH_DAYS[month_idx] + ((month_idx == 1) & leap)
+    ok_date &= (day >= 1) & (day <= max_day)
+    # Return the month of the valid dates
+    return np.where(ok_date, month, np.nan)
+
+
+# Define a function to validate the dates and extract the month in a single vectorized pass
+# (accepts the same dates as check_date and returns NaN as the month of invalid dates)
+def date_month(dates):
+    # Dates read with their type from Parquet or Arrow files are only missing or valid
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.month.astype(float)
+    month = np.full(len(dates), np.nan)
+    # Parse the dates in the plain YYYY-MM-DD format at once (impossible calendar dates become NaT)
+    iso = dates.str.match(ISO_DATE).fillna(False).to_numpy(dtype=bool)
+    month[iso] = pd.to_datetime(dates[iso], format='%Y-%m-%d', errors='coerce').dt.month.to_numpy(dtype=float)
+    # Check the remaining dates and the ones outside of the range of pandas timestamps part by part
+    loose = np.isnan(month) & dates.notnull().to_numpy()
+    if loose.any():
+        month[loose] = _loose_date_month(dates[loose])
+    return pd.Series(month, index=dates.index)
+
+
+# Define a function for converting string columns of several DFs into categoricals with the same categories
+# The categories are sorted like groupby() sorts the strings, so the groups come out in the same order
+def unify_categoricals(dfs, columns):
+    for col in columns:
+        values = pd.concat([pd.Series(df[col].dropna().unique()) for df in dfs])
+        categories = pd.factorize(values.unique(), sort=True)[1]
+        dtype = pd.api.types.CategoricalDtype(categories)
+        for df in dfs:
+            df[col] = df[col].astype(dtype)
+    return dfs
+
+
+# Define a function for reading the trimming criteria (param_code;upper_limit, optionally with a lower_limit column
+# and an origin column for limits that apply only to the observations of one dataset)
+def read_trimming_criteria(fname):
+    criteria = pd.read_csv(fname, sep=';')
+    for col in ['lower_limit', 'upper_limit']:
+        if col not in criteria:
+            criteria[col] = np.nan
+    if 'origin' not in criteria:
+        criteria['origin'] = np.nan
+    return criteria
+
+
+# Define a function for looking up a limit of each row by its parameter code (and origin if the criteria have limits
+# for single datasets, which take precedence over the limits of the parameter)
+def _row_limits(df, criteria, col):
+    criteria = criteria[criteria[col].notnull()]
+    general = criteria[criteria['origin'].isnull()].drop_duplicates('param_code', keep='last')
+    limits = df['param_code'].map(general.set_index('param_code')[col]).to_numpy(dtype=float)
+    by_origin = criteria[criteria['origin'].notnull()].drop_duplicates(['param_code', 'origin'], keep='last')
+    if len(by_origin):
+        keys = pd.MultiIndex.from_frame(by_origin[['param_code', 'origin']])
+        pos = keys.get_indexer(pd.MultiIndex.from_arrays([df['param_code'], df['origin']]))
+        limits = np.where(pos >= 0, by_origin[col].to_numpy(dtype=float)[pos], limits)
+    return limits
+
+
+# Define a function for marking the rows with values within the limits of their parameter in a single vectorized pass
+# (rows without a limit are kept, like values equal to a limit)
+def trim_mask(df, criteria):
+    values = df['value'].to_numpy(dtype=float)
+    keep = ~(values > _row_limits(df, criteria, 'upper_limit'))
+    keep &= ~(values < _row_limits(df, criteria, 'lower_limit'))
+    return keep
+
+
+# Compiled index of the parameter mapping (data_map.csv) keyed by the origin and the parameter code of the sources
+# The factors are kept as arrays and the new codes, descriptions and units as integer codes of sorted categories, so
+# the observations are mapped by indexing the arrays with the position of their key instead of merging
+class ParamMap(object):
+
+    def __init__(self, map_df):
+        map_df = map_df.drop_duplicates(['origin', 'param_code'], keep='last').reset_index(drop=True)
+        self.index = pd.MultiIndex.from_arrays([map_df['origin'], map_df['param_code']])
+        self.divisor = map_df['divisor'].to_numpy(dtype=float)
+        self.multiplier = map_df['multiplier'].to_numpy(dtype=float)
+        # Entries without a new code are mapped on purpose to nothing
+        self.mapped = map_df['new_code'].notnull().to_numpy()
+        self.codes, self.categories, self.values = {}, {}, {}
+        for col in ['new_code', 'new_desc', 'new_unit']:
+            self.codes[col], self.categories[col] = pd.factorize(map_df[col], sort=True)
+            # Array of the categories with a missing value at the end, which the code -1 takes
+            self.values[col] = np.append(self.categories[col].to_numpy(dtype=object), np.nan)
+
+    # Define a function for finding the position of the mapping entry of each row (-1 if there is no entry)
+    def positions(self, df):
+        return self.index.get_indexer(pd.MultiIndex.from_arrays([df['origin'], df['param_code']]))
+
+    # Define a function for listing the keys of the rows that have no mapping entry with the number of rows
+    def unmapped(self, df, pos):
+        missing = df.loc[pos < 0, ['origin', 'param_code']].astype(str)
+        return missing.groupby(['origin', 'param_code']).size()
+
+    # Define a function for getting a new column (new_code, new_desc or new_unit) of the rows at the positions
+    # (entries with a missing value in the column give missing values, also without categoricals)
+    def take(self, col, pos, categorical=False):
+        codes = self.codes[col][pos]
+        if categorical:
+            return pd.Categorical.from_codes(codes, self.categories[col])
+        return self.values[col][codes]
+
+    # Define a function for converting the values into the new units (value / divisor * multiplier)
+    def convert(self, values, pos):
+        return np.asarray(values, dtype=float) / self.divisor[pos] * self.multiplier[pos]
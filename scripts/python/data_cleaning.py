@@ -1,94 +1,144 @@
 # Import the libraries
-import datetime
 import pandas as pd
 import os
-import numpy as np
-
-# Define a function to check if the date is valid
-def check_date(row):
-    correct_date = None
-    # Split the date into strings
-    strings = row['date'].split('-')
-    # Test the date
-    try:
-        # If the date is not in the correct format this will throw an IndexError
-        year, month, day = int(strings[0]), int(strings[1]), int(strings[2])
-        # If the date is not valid this will throw a ValueError
-        datetime.datetime(year, month, day)
-        correct_date = True
-    # If the previous block throws an error
-    except (IndexError, ValueError):
-        correct_date = False
-    return correct_date
+from aggregation import update_monthly
+from feature_tensor import build_tensor, frame_chunks
+from cleaning_utils import ParamMap, date_month, read_trimming_criteria, trim_mask, unify_categoricals
+from output_utils import read_table, write_param_files, write_table
+from profiling import StepLog
+from stations import colocate_stations
 
-# Import the water quality datasets
-dirname = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data'
-gemstat = pd.read_csv(os.path.join(dirname, 'gemstat/gemstat.csv'), sep=';')
-waterbase = pd.read_csv(os.path.join(dirname, 'waterbase/waterbase.csv'), sep=';')
-glorich = pd.read_csv(os.path.join(dirname, 'glorich/glorich.csv'), sep=';')
+# Location of the data (can be changed with the WQ_DATA_DIR environment variable)
+dirname = os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data')
 
-# Import the file with the mapped parameters
-map_df = pd.read_csv(os.path.join(dirname, 'data_map.csv'), sep=';')
+# Store the repeated strings as categoricals and the month as a small integer to reduce memory (turned on with
+# WQ_COMPACT=1, the results are the same)
+compact = os.environ.get('WQ_COMPACT', '0') == '1'
 
-# Extract the rows for each dataset
-gemstat_map = map_df[map_df['origin'] == 'GEMStat']
-waterbase_map = map_df[map_df['origin'] == 'Waterbase']
-glorich_map = map_df[map_df['origin'] == 'GLORICH']
+# Remove the outliers with the limits in trimming_criteria.csv before the aggregation (turned on with WQ_TRIM=1)
+trim = os.environ.get('WQ_TRIM', '0') == '1'
 
-# Drop the column with origin
-gemstat_map.drop(['origin'], axis=1, inplace=True)
-waterbase_map.drop(['origin'], axis=1, inplace=True)
-glorich_map.drop(['origin'], axis=1, inplace=True)
+# Radius in km within which stations of different sources are taken as the same station (set with the
+# WQ_COLOCATE_KM environment variable, otherwise the stations of the sources are kept apart)
+colocate_km = os.environ.get('WQ_COLOCATE_KM')
 
-# Merge the maps with the water quality data
-gemstat = gemstat.merge(gemstat_map, on='param_code')
-waterbase = waterbase.merge(waterbase_map, on='param_code')
-glorich = glorich.merge(glorich_map, on='param_code')
+# Format of the files of the prep scripts and of full_monthly_data ('csv', or 'parquet' and 'arrow' which are read
+# memory-mapped with the types of the columns, set with the WQ_FORMAT environment variable)
+data_format = os.environ.get('WQ_FORMAT', 'csv')
 
-# Concat the three datasets
-wq_df = pd.concat([gemstat, waterbase, glorich])
-print(wq_df.head())
-print(wq_df.dtypes)
+# Number of threads for writing the output files of the parameters
+writer_threads = 4
 
-# Only extract the parameters that have been mapped and have values in the 'new_code' column
-wq_df = wq_df[pd.notnull(wq_df['new_code'])]
+# Directory of the Parquet dataset of the monthly data partitioned by the parameter (set with the WQ_PARQUET_DIR
+# environment variable, otherwise it is skipped)
+parquet_dir = os.environ.get('WQ_PARQUET_DIR')
 
-# Print out the number of stations
-print(str(len(wq_df['station_id'].unique())) + ' stations are in the dataset.')
+# Directory of the station x parameter x month arrays of the mean, cv and count for modeling (set with the
+# WQ_TENSOR_DIR environment variable, otherwise they are skipped)
+tensor_dir = os.environ.get('WQ_TENSOR_DIR')
+
+# Directory of the store of monthly statistics for updating only the groups with new or removed observations
+# (set with the WQ_STORE_DIR environment variable, otherwise all observations are aggregated in every run)
+store_dir = os.environ.get('WQ_STORE_DIR')
 
-# Calculate new values for parameters with units other than mg/l (umol/l and ug/l)
-wq_df['value'] = wq_df['value'] / wq_df['divisor'] * wq_df['multiplier']
+# Log of the steps with their time, rows and memory (WQ_QUIET=1 turns off the debug prints and WQ_PROFILE_DIR writes
+# a report of the steps)
+log = StepLog('data_cleaning')
 
-# Change the codes, descriptions and units based on the mapping
-wq_df['param_code'] = wq_df['new_code']
-wq_df['param_desc'] = wq_df['new_desc']
-wq_df['unit'] = wq_df['new_unit']
-print(wq_df.head())
-print(wq_df['unit'].unique())
+# Import the water quality datasets
+with log.step('read gemstat', 'read') as step:
+    gemstat = step.out(read_table(os.path.join(dirname, 'gemstat/gemstat'), data_format))
+with log.step('read waterbase', 'read') as step:
+    waterbase = step.out(read_table(os.path.join(dirname, 'waterbase/waterbase'), data_format))
+with log.step('read glorich', 'read') as step:
+    glorich = step.out(read_table(os.path.join(dirname, 'glorich/glorich'), data_format))
+
+# Import the file with the mapped parameters
+map_df = pd.read_csv(os.path.join(dirname, 'data_map.csv'), sep=';')
 
 # Replace the missing units of pH with empty strings (necessary for the grouping)
-wq_df['unit'].replace(np.nan, '', inplace=True, regex=True)
-print(wq_df['unit'].unique())
+map_df['new_unit'] = map_df['new_unit'].fillna('')
 
-# Number of rows with negative values
-print(str(len(wq_df[wq_df['value'] < 0])) + ' negative values are in the dataset.')
+# Convert the repeated strings into categoricals with the same categories in all datasets
+if compact:
+    unify_categoricals([gemstat, waterbase, glorich], ['station_id', 'param_code', 'param_desc', 'unit', 'origin'])
 
-# Keep only rows with positive values
-wq_df = wq_df[wq_df['value'] > 0]
+# Compile the mapping into an index of the origins and the parameter codes
+param_map = ParamMap(map_df)
 
-# Add a column about the validity of the date
-wq_df['ok_date'] = wq_df.apply(check_date, axis=1)
-print(wq_df['ok_date'].value_counts())
+# Concat the three datasets
+with log.step('concat datasets', 'merge', [gemstat, waterbase, glorich]) as step:
+    wq_df = step.out(pd.concat([gemstat, waterbase, glorich], ignore_index=True))
+log.show(wq_df.head())
+log.show(wq_df.dtypes)
+
+# Find the mapping entry of each observation and print out the parameters that are not in the mapping
+with log.step('look up mapping', 'merge', wq_df) as step:
+    pos = step.out(param_map.positions(wq_df))
+# (the debug values are only computed if they are printed)
+if not log.quiet:
+    log.show(str((pos < 0).sum()) + ' observations have parameters without a mapping entry:')
+    log.show(param_map.unmapped(wq_df, pos))
 
-# Extract only the rows with valid dates
-wq_df = wq_df[wq_df['ok_date'] == True]
-print(wq_df['ok_date'].value_counts())
+# Only extract the parameters that have been mapped and have values in the 'new_code' column
+with log.step('keep mapped parameters', 'filter', wq_df) as step:
+    keep = pos >= 0
+    keep[keep] = param_map.mapped[pos[keep]]
+    wq_df = step.out(wq_df[keep])
+    pos = pos[keep]
 
-# Add the month of the observation as a column
-wq_df['month'] = pd.to_datetime(wq_df['date']).dt.month
+# Print out the number of stations
+if not log.quiet:
+    log.show(str(len(wq_df['station_id'].unique())) + ' stations are in the dataset.')
+
+# Calculate new values for parameters with units other than mg/l (umol/l and ug/l) and change the codes,
+# descriptions and units based on the mapping
+with log.step('map parameters', 'merge', wq_df) as step:
+    wq_df['value'] = param_map.convert(wq_df['value'], pos)
+    wq_df['param_code'] = param_map.take('new_code', pos, categorical=compact)
+    wq_df['param_desc'] = param_map.take('new_desc', pos, categorical=compact)
+    wq_df['unit'] = param_map.take('new_unit', pos, categorical=compact)
+    step.out(wq_df)
+if not log.quiet:
+    log.show(wq_df.head())
+    log.show(wq_df['unit'].unique())
+
+    # Number of rows with negative values
+    log.show(str(len(wq_df[wq_df['value'] < 0])) + ' negative values are in the dataset.')
 
-# Drop unnecessary columns
-wq_df.drop(['date', 'divisor', 'multiplier', 'new_code', 'new_desc', 'new_unit', 'ok_date'], axis=1, inplace=True)
+# Keep only rows with positive values
+with log.step('keep positive values', 'filter', wq_df) as step:
+    wq_df = step.out(wq_df[wq_df['value'] > 0])
+
+# Remove the values outside of the limits of their parameter (and origin)
+if trim:
+    with log.step('trim outliers', 'filter', wq_df) as step:
+        trim_df = read_trimming_criteria(os.path.join(dirname, 'trimming_criteria.csv'))
+        keep = trim_mask(wq_df, trim_df)
+        wq_df = step.out(wq_df[keep])
+    log.show(str(len(keep) - keep.sum()) + ' values are outside of the trimming limits.')
+
+# Replace the origin, station ID and location of the stations that are reported by several sources with the ones of
+# a canonical station and write the canonical station of each station into a CSV
+if colocate_km is not None:
+    with log.step('co-locate stations', 'merge', wq_df) as step:
+        wq_df, station_df = colocate_stations(wq_df, float(colocate_km))
+        step.out(wq_df)
+    station_df.to_csv(os.path.join(dirname, 'station_map.csv'), sep=';', index=False)
+    log.show(str(station_df['co_located'].sum()) + ' stations are co-located with a station of another source.')
+
+# Add the month of the observation and extract only the rows with valid dates (parsed once for both)
+with log.step('keep valid dates', 'filter', wq_df) as step:
+    wq_df['month'] = date_month(wq_df['date'])
+    wq_df['ok_date'] = wq_df['month'].notnull()
+    if not log.quiet:
+        log.show(wq_df['ok_date'].value_counts())
+    wq_df = wq_df[wq_df['ok_date'] == True]
+    wq_df['month'] = wq_df['month'].astype('int8' if compact else int)
+
+    # Drop unnecessary columns
+    wq_df.drop(['date', 'ok_date'], axis=1, inplace=True)
+    step.out(wq_df)
 
 # Create a new DF with monthly values of each parameter in each station
 
@@ -96,26 +146,48 @@ wq_df.drop(['date', 'divisor', 'multiplier', 'new_code', 'new_desc', 'new_unit',
 group_cols = list(wq_df)
 group_cols.remove('value')
 
-# Create the DF and calculate the count, mean and standard deviation for each group
-monthly_df = wq_df.groupby(group_cols)['value'].agg(['count', 'mean', 'std']).reset_index()
-print(monthly_df.head())
-
-# Calculate the coefficient of variation (CV) for the observation values of the groups
-monthly_df['cv'] = monthly_df['std'] / monthly_df['mean']
-print(monthly_df.head())
+# Create the DF and calculate the count, mean and standard deviation for each group (only the combinations of
+# categories that are in the data), either from all rows or by updating the store of monthly statistics with the
+# rows that were added or removed since the previous run
+with log.step('monthly statistics', 'groupby', wq_df) as step:
+    if store_dir is None:
+        monthly_df = wq_df.groupby(group_cols, observed=True)['value'].agg(['count', 'mean', 'std']).reset_index()
+        changed_params = None
+    else:
+        monthly_df, changed_params = update_monthly(store_dir, wq_df, group_cols)
+        log.show(str(len(changed_params)) + ' parameters have changed groups.')
+
+    # Calculate the coefficient of variation (CV) for the observation values of the groups
+    monthly_df['cv'] = monthly_df['std'] / monthly_df['mean']
+    step.out(monthly_df)
+log.show(monthly_df.head())
 
 # Print out the final number of stations
-print(str(len(monthly_df['station_id'].unique())) + ' stations remain in the dataset.')
-
-# Write the DF into a CSV
-monthly_df.to_csv(os.path.join(dirname, 'full_monthly_data.csv'), sep=';', index=False)
-
-# List of parameters
-params = monthly_df['param_code'].unique()
-print(params)
-
-# Create a separate output file for each parameter
-for param in params:
-    param_df = monthly_df[monthly_df['param_code'] == param]
-    fname = param + '_monthly_data.csv'
-    param_df.to_csv(os.path.join(dirname, 'monthly-water-quality', fname), sep=';', index=False)
+if not log.quiet:
+    log.show(str(len(monthly_df['station_id'].unique())) + ' stations remain in the dataset.')
+
+# Write the DF into a file (in full, also if the store is used)
+with log.step('write full_monthly_data', 'write', monthly_df) as step:
+    step.out(monthly_df)
+    write_table(monthly_df, os.path.join(dirname, 'full_monthly_data'), data_format)
+
+# Print out the list of parameters
+if not log.quiet:
+    log.show(monthly_df['param_code'].unique())
+
+# Create a separate output file for each parameter (the DF is split in one pass and the files are written on a
+# pool of threads) and optionally a Parquet dataset partitioned by the parameter
+# (only the files of the parameters with changed groups are written if the store is used)
+with log.step('write parameter files', 'write', monthly_df) as step:
+    step.out(monthly_df)
+    write_param_files(monthly_df, os.path.join(dirname, 'monthly-water-quality'), workers=writer_threads,
+                      parquet_dir=parquet_dir, params=changed_params)
+
+# Build the station x parameter x month arrays from the monthly data (in chunks of rows, written into memory-mapped
+# .npy files with the axes in stations.csv and params.csv)
+if tensor_dir is not None:
+    with log.step('build tensor', 'write', monthly_df):
+        build_tensor(frame_chunks(monthly_df), tensor_dir)
+
+# Write the report of the steps
+log.write()
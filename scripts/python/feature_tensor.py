@@ -0,0 +1,145 @@
+# Import the libraries
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from output_utils import FORMATS, read_chunks
+from stations import STATION_COLS
+
+# Statistics of the monthly groups stored in the arrays
+TENSOR_STATS = ['mean', 'cv', 'count']
+
+# Columns of the monthly data read for the arrays (the parameter descriptions and units go into the sidecar)
+TENSOR_COLS = STATION_COLS + ['param_code', 'param_desc', 'unit', 'month'] + TENSOR_STATS
+
+# Types of the key columns (the station IDs are strings in all sources and the locations floats, so they hash the
+# same in every chunk)
+KEY_DTYPES = {'origin': str, 'station_id': str, 'lat': float, 'lon': float, 'param_code': str, 'param_desc': str,
+              'unit': str}
+
+# Names of the sidecar files with the stations and the parameters of the axes of the arrays
+STATION_FILE = 'stations.csv'
+PARAM_FILE = 'params.csv'
+
+
+# Define a function for hashing the origin, station ID and location of the rows (the key of the station axis)
+def station_hashes(df):
+    keys = df[STATION_COLS].copy()
+    for col in STATION_COLS:
+        keys[col] = keys[col].astype(float if col in ['lat', 'lon'] else str)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+# Define a function for collecting the stations and the parameters of the monthly data in a first pass over the
+# chunks (the stations are sorted by origin, station ID and location and the parameters by their code)
+def tensor_axes(read):
+    station_list, param_list = [], []
+    for chunk in read():
+        hashes = station_hashes(chunk)
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        stations = chunk.loc[first, STATION_COLS].reset_index(drop=True)
+        stations['hash'] = hashes[first]
+        station_list.append(stations)
+        param_list.append(chunk[['param_code', 'param_desc', 'unit']].drop_duplicates('param_code'))
+    station_df = pd.concat(station_list, ignore_index=True).drop_duplicates('hash')
+    for col in STATION_COLS:
+        station_df[col] = station_df[col].astype(float if col in ['lat', 'lon'] else str)
+    station_df = station_df.sort_values(STATION_COLS, kind='mergesort').reset_index(drop=True)
+    # The columns can be categoricals (Parquet and Arrow IPC files), which can not be filled with new values
+    param_df = pd.concat(param_list, ignore_index=True).astype(object).fillna('').astype(str)
+    param_df = param_df.drop_duplicates('param_code')
+    param_df = param_df.sort_values('param_code').reset_index(drop=True)
+    return station_df, param_df
+
+
+# Define a function for creating the arrays of the statistics as .npy files that are filled through memory maps
+# (missing groups are NaN in the float arrays and 0 in the counts)
+def create_arrays(out_dir, shape, dtype='float32'):
+    arrays = {}
+    for stat in TENSOR_STATS:
+        array_dtype = 'int32' if stat == 'count' else dtype
+        arrays[stat] = np.lib.format.open_memmap(os.path.join(out_dir, stat + '.npy'), mode='w+', dtype=array_dtype,
+                                                 shape=shape)
+        arrays[stat][:] = 0 if stat == 'count' else np.nan
+    return arrays
+
+
+# Define a function for building the station x parameter x month arrays of the mean, cv and count of the monthly
+# groups in two passes over the chunks of the monthly data (read() returns an iterator of chunks), so the memory
+# used is the chunk, the axes and the pages of the memory-mapped files (if a group is in the data more than once,
+# e.g. with two descriptions of a parameter, the last row is kept)
+# The arrays are written into out_dir as .npy files (loaded zero-copy with load_tensor()) or packed into a
+# compressed tensor.npz (fmt='npz', loaded into memory) with the axes in stations.csv and params.csv
+def build_tensor(read, out_dir, fmt='npy', dtype='float32'):
+    os.makedirs(out_dir, exist_ok=True)
+    station_df, param_df = tensor_axes(read)
+    shape = (len(station_df), len(param_df), 12)
+    arrays = create_arrays(out_dir, shape, dtype)
+    # Order of the station hashes for looking up the position of the station of each row
+    order = np.argsort(station_df['hash'].to_numpy(), kind='stable')
+    sorted_hashes = station_df['hash'].to_numpy()[order]
+    param_index = pd.Index(param_df['param_code'])
+    for chunk in read():
+        station_pos = order[np.searchsorted(sorted_hashes, station_hashes(chunk))]
+        param_pos = param_index.get_indexer(chunk['param_code'].astype(str))
+        month_pos = chunk['month'].to_numpy().astype(np.int64) - 1
+        for stat in TENSOR_STATS:
+            arrays[stat][station_pos, param_pos, month_pos] = chunk[stat].to_numpy()
+    for array in arrays.values():
+        array.flush()
+    # Write the axes into the sidecar files (the position in the file is the index of the axis)
+    station_df.drop('hash', axis=1).to_csv(os.path.join(out_dir, STATION_FILE), sep=';', index_label='position')
+    param_df.to_csv(os.path.join(out_dir, PARAM_FILE), sep=';', index_label='position')
+    # Pack the arrays into a compressed file one at a time
+    if fmt == 'npz':
+        np.savez_compressed(os.path.join(out_dir, 'tensor.npz'), **arrays)
+        del arrays
+        for stat in TENSOR_STATS:
+            os.remove(os.path.join(out_dir, stat + '.npy'))
+    return station_df.drop('hash', axis=1), param_df
+
+
+# Define a function for reading a DF in chunks of rows (for building the arrays from a DF in memory)
+def frame_chunks(df, chunk_size=10 ** 6):
+    return lambda: (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+
+# Define a function for reading a file of monthly data (full_monthly_data) in chunks of rows
+def file_chunks(fname, fmt='csv', chunk_size=10 ** 6):
+    return lambda: read_chunks(fname, fmt, chunk_size, columns=TENSOR_COLS,
+                               dtype=KEY_DTYPES if fmt == 'csv' else None)
+
+
+# Define a function for loading the arrays and their axes, the .npy files are memory-mapped (mmap_mode='r'), so
+# slices of the stations are read from the files only when they are used
+def load_tensor(out_dir, mmap_mode='r'):
+    npz_fname = os.path.join(out_dir, 'tensor.npz')
+    if os.path.exists(npz_fname):
+        with np.load(npz_fname) as npz:
+            arrays = {stat: npz[stat] for stat in TENSOR_STATS}
+    else:
+        arrays = {stat: np.load(os.path.join(out_dir, stat + '.npy'), mmap_mode=mmap_mode) for stat in TENSOR_STATS}
+    station_df = pd.read_csv(os.path.join(out_dir, STATION_FILE), sep=';', index_col='position',
+                             dtype={'origin': str, 'station_id': str})
+    param_df = pd.read_csv(os.path.join(out_dir, PARAM_FILE), sep=';', index_col='position', dtype=str,
+                           keep_default_na=False)
+    return arrays, station_df, param_df
+
+
+# The guard keeps the arrays from being built when the module is imported
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the station x parameter x month arrays of the monthly data.')
+    parser.add_argument('--data-dir', default=os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/'
+                                                                            'water-quality-modeling/data'),
+                        help='data directory with full_monthly_data')
+    parser.add_argument('--format', default=os.environ.get('WQ_FORMAT', 'csv'), choices=list(FORMATS),
+                        help='format of full_monthly_data')
+    parser.add_argument('--out-dir', default=None, help='directory of the arrays (data directory/tensor by default)')
+    parser.add_argument('--chunk-size', type=int, default=10 ** 6, help='number of rows read at a time')
+    parser.add_argument('--npz', action='store_true', help='pack the arrays into a compressed tensor.npz')
+    args = parser.parse_args()
+    out_dir = args.out_dir if args.out_dir is not None else os.path.join(args.data_dir, 'tensor')
+    stations, params = build_tensor(file_chunks(os.path.join(args.data_dir, 'full_monthly_data'), args.format,
+                                                args.chunk_size), out_dir, 'npz' if args.npz else 'npy')
+    print('Arrays of {} stations x {} parameters x 12 months written into {}'.format(len(stations), len(params),
+                                                                                     out_dir))
@@ -1,101 +1,144 @@
 # Import the libraries
 import pandas as pd
 import os
-
-# Define a function to create a DF from a list of DFs and print out basic information
-def create_df(df_list):
-    df = pd.concat(df_list)
+from sheet_cache import SheetCache
+from gemstat_utils import parameter_units, read_workbooks
+from join_utils import join_dimensions
+from output_utils import write_table
+from profiling import StepLog
+from schemas import GEMSTAT_OBS, GEMSTAT_PARAMETERS, GEMSTAT_STATIONS, apply_schema
+
+# Define a function to create a DF with the columns and types of a schema from a list of DFs and print out basic
+# information with the log of the script
+def create_df(df_list, schema, log):
+    df = apply_schema(pd.concat(df_list), schema)
     df.drop_duplicates(inplace=True)
     df.reset_index(drop=True, inplace=True)
-    print('\n')
-    print(df.head())
-    print('\n')
-    print(df.dtypes)
-    print('\n')
+    log.show('\n')
+    log.show(df.head())
+    log.show('\n')
+    log.show(df.dtypes)
+    log.show('\n')
     return df
 
-# Location of the Excel files
-path = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data/gemstat'
-
-# Create a list of the Excel file names
-xls_list = []
-for file_name in os.listdir(path):
-    if file_name.endswith('.xls'):
-        xls_list.append(os.path.join(path, file_name))
-
-# Lists for the station, parameter and observation DFs
-station_df_list = []
-param_df_list = []
-obs_df_list = []
-
-# Loop over the Excel files, convert worksheets into DFs and append them to the corresponding lists
-for xls_name in xls_list:
-    xls_dict = pd.read_excel(xls_name, sheet_name=None)
-    for key in xls_dict.keys():
-        sheet_name = key
-        if sheet_name == 'Station_Metadata':
-            station_df_list.append(xls_dict[sheet_name])
-        elif sheet_name == 'Parameter_Metadata':
-            param_df_list.append(xls_dict[sheet_name])
-        else:
-            if sheet_name != 'Methods_Metadata':
-                obs_df_list.append(xls_dict[sheet_name])
-
-# Create DFs of water quality stations, parameters and observations
-print('DF of water quality stations:')
-station_df = create_df(station_df_list)
-print('DF of water quality parameters:')
-param_df = create_df(param_df_list)
-print('DF of water quality observations:')
-obs_df = create_df(obs_df_list)
-
-# Merge the DFs
-gemstat_df = station_df.merge(obs_df, on='GEMS Station Number').merge(param_df, on='Parameter Code')
-print('Merged DF:' + '\n')
-print(gemstat_df.dtypes)
-
-# Extract stations with location information
-gemstat_df = gemstat_df[(gemstat_df['Latitude'].notnull()) & (gemstat_df['Longitude'].notnull())]
-
-# Extract river stations
-gemstat_df = gemstat_df[gemstat_df['Water Type'] == 'River station']
-
-# Create a dictionary of parameters to be extracted from the DF
-file_path = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data/params_to_extract.csv'
-param_dict = pd.read_csv(file_path, sep=';').reset_index().to_dict(orient='list')
-
-# Extract GEMStat parameters used in the study
-gemstat_df = gemstat_df[gemstat_df['Parameter Code'].isin(param_dict['GEMStat'])]
-
-# Exclude missing observation values
-gemstat_df = gemstat_df[gemstat_df['Value'].notnull()]
-
-# Keep only rows with positive values
-gemstat_df = gemstat_df[gemstat_df['Value'] > 0]
-
-# Exclude observation values that are estimated (~) and below (<) or above (>) detection limit
-gemstat_df = gemstat_df[gemstat_df['Value Flags'].isnull()]
-
-# Convert the sampling date into DateTime
-gemstat_df['date'] = pd.to_datetime(gemstat_df['Sample Date'], format='%Y-%m-%d')
-
-# Create a new DF with proper column names and write into a CSV
-out_df = pd.DataFrame(
-    {
-        'lat': gemstat_df['Latitude'],
-        'lon': gemstat_df['Longitude'],
-        'date': gemstat_df['date'],
-        'station_id': gemstat_df['GEMS Station Number'],
-        'param_code': gemstat_df['Parameter Code'],
-        'param_name': gemstat_df['Parameter Long Name'],
-        'value': gemstat_df['Value'],
-        'unit': gemstat_df['Unit'],
-        'origin': 'GEMStat'
-    }
-)
-out_df.to_csv(os.path.join(path, 'gemstat.csv'), sep=';', index=False)
-
-# Extract the units of parameters and write into a CSV
-unit_df = out_df.groupby(['param_code', 'param_name'])['unit'].unique().reset_index()
-unit_df['origin'] = 'GEMStat'
-unit_df.to_csv(os.path.join(path, 'gemstat_units.csv'), sep=';', index=False)
+# The guard keeps the worker processes from running the script again when they import it
+if __name__ == '__main__':
+    # Location of the Excel files (the data directory can be changed with the WQ_DATA_DIR environment variable)
+    data_dir = os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data')
+    path = os.path.join(data_dir, 'gemstat')
+
+    # Format of the output file of the observations ('csv', 'parquet' or 'arrow', the last two need the pyarrow
+    # library, can be changed with the WQ_FORMAT environment variable)
+    out_format = os.environ.get('WQ_FORMAT', 'csv')
+
+    # Number of worker processes for parsing the Excel files (1 parses them one after another in this process)
+    workers = os.cpu_count()
+
+    # Log of the steps with their time, rows and memory (WQ_QUIET=1 turns off the debug prints and WQ_PROFILE_DIR
+    # writes a report of the steps)
+    log = StepLog('gemstat_extraction')
+
+    # Cache of the parsed Excel sheets (set cache_dir to None to parse the files again in every run)
+    cache_dir = os.path.join(path, 'sheet_cache')
+    cache_size = 2 * 1024 ** 3
+    cache = SheetCache(cache_dir, cache_size, log.quiet) if cache_dir is not None else None
+
+    # Create a list of the Excel file names
+    xls_list = []
+    for file_name in os.listdir(path):
+        if file_name.endswith('.xls'):
+            xls_list.append(os.path.join(path, file_name))
+
+    # Lists for the station, parameter and observation DFs
+    station_df_list = []
+    param_df_list = []
+    obs_df_list = []
+
+    # Convert the worksheets of the Excel files into DFs in a pool of worker processes and append them to the
+    # corresponding lists
+    with log.step('read workbooks', 'read') as step:
+        for xls_dict in read_workbooks(xls_list, workers=workers, cache=cache):
+            for key in xls_dict.keys():
+                sheet_name = key
+                if sheet_name == 'Station_Metadata':
+                    station_df_list.append(xls_dict[sheet_name])
+                elif sheet_name == 'Parameter_Metadata':
+                    param_df_list.append(xls_dict[sheet_name])
+                else:
+                    if sheet_name != 'Methods_Metadata':
+                        obs_df_list.append(xls_dict[sheet_name])
+        step.out(obs_df_list)
+
+    # Create DFs of water quality stations, parameters and observations
+    with log.step('concat sheets', 'merge', obs_df_list) as step:
+        log.show('DF of water quality stations:')
+        station_df = create_df(station_df_list, GEMSTAT_STATIONS, log)
+        log.show('DF of water quality parameters:')
+        param_df = create_df(param_df_list, GEMSTAT_PARAMETERS, log)
+        log.show('DF of water quality observations:')
+        obs_df = step.out(create_df(obs_df_list, GEMSTAT_OBS, log))
+
+    # Create a dictionary of parameters to be extracted from the DF
+    file_path = os.path.join(data_dir, 'params_to_extract.csv')
+    param_dict = pd.read_csv(file_path, sep=';').reset_index().to_dict(orient='list')
+
+    # Filter the stations and the observations before joining them, so only the rows that are kept are joined
+    with log.step('filter stations', 'filter', station_df) as step:
+        # Extract stations with location information
+        station_df = station_df[(station_df['Latitude'].notnull()) & (station_df['Longitude'].notnull())]
+
+        # Extract river stations
+        station_df = step.out(station_df[station_df['Water Type'] == 'River station'])
+
+    with log.step('filter observations', 'filter', obs_df) as step:
+        # Extract GEMStat parameters used in the study
+        obs_df = obs_df[obs_df['Parameter Code'].isin(param_dict['GEMStat'])]
+
+        # Exclude missing observation values
+        obs_df = obs_df[obs_df['Value'].notnull()]
+
+        # Keep only rows with positive values
+        obs_df = obs_df[obs_df['Value'] > 0]
+
+        # Exclude observation values that are estimated (~) and below (<) or above (>) detection limit
+        obs_df = step.out(obs_df[obs_df['Value Flags'].isnull()])
+
+    # Join the stations and parameters to the observations (attached by the positions of their keys)
+    with log.step('join stations and parameters', 'merge', obs_df) as step:
+        gemstat_df = step.out(join_dimensions(obs_df, [(station_df, 'GEMS Station Number', 'GEMS Station Number'),
+                                                       (param_df, 'Parameter Code', 'Parameter Code')]))
+    log.show('Merged DF:' + '\n')
+    log.show(gemstat_df.dtypes)
+
+    # Convert the sampling date into DateTime
+    gemstat_df['date'] = pd.to_datetime(gemstat_df['Sample Date'], format='%Y-%m-%d')
+
+    # Create a new DF with proper column names and write into a file
+    out_df = pd.DataFrame(
+        {
+            'lat': gemstat_df['Latitude'],
+            'lon': gemstat_df['Longitude'],
+            'date': gemstat_df['date'],
+            'station_id': gemstat_df['GEMS Station Number'],
+            'param_code': gemstat_df['Parameter Code'],
+            'param_name': gemstat_df['Parameter Long Name'],
+            'value': gemstat_df['Value'],
+            'unit': gemstat_df['Unit'],
+            'origin': 'GEMStat'
+        }
+    )
+    with log.step('write observations', 'write', out_df):
+        write_table(out_df, os.path.join(path, 'gemstat'), out_format)
+
+    # Extract the units of parameters and write into a CSV
+    with log.step('units of parameters', 'groupby', out_df) as step:
+        unit_df = step.out(parameter_units(out_df, ['param_code', 'param_name']))
+    unit_df['origin'] = 'GEMStat'
+    unit_df.to_csv(os.path.join(path, 'gemstat_units.csv'), sep=';', index=False)
+
+    # Print out the hits and misses of the sheet cache
+    if cache is not None:
+        cache.report()
+
+    # Write the report of the steps
+    log.write()
@@ -1,126 +1,150 @@
 # Import the libraries
-import zipfile
 import pandas as pd
 import os
-
-# Define a function for creating a DF from the sheet of an Excel file
-def sheet_df(zipfiles, sheet_name):
-    # Create a list of the sheets
-    sheet_list = []
-    for fname in zipfiles:
-        zf = zipfile.ZipFile(fname, 'r')
-        xls = zf.open(zf.namelist()[0])
-        # Need to install the xlrd (pip install xlrd) library for the environment to use the read_excel() function
-        df = pd.read_excel(xls, sheet_name=sheet_name, header=0)
-        sheet_list.append(df)
-    # Concatenate the files, drop duplicates and reset the index
-    sheet_df = pd.concat(sheet_list)
-    sheet_df.drop_duplicates(inplace=True)
-    sheet_df.reset_index(drop=True, inplace=True)
-    # Return the DF
-    return sheet_df
-
-# Location of the zipped Excel files
-dirname = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data/gemstat'
-
-# Create a list of the zipped Excel files
-zipfiles = []
-for f in os.listdir(dirname):
-    if f.endswith('.zip'):
-        zipfiles.append(os.path.join(dirname, f))
-
-# Create a DF of the sheets with the stations
-stat_df = sheet_df(zipfiles, 'Station_Metadata')
-print(stat_df.head())
-print(stat_df.columns)
-print(str(len(stat_df)) + ' stations are in the dataset.')
-
-# Print out the different station types
-print(stat_df['Water Type'].unique())
-
-# Extract only river stations and the columns necessary for merging with the DF of observations
-stat_df = stat_df[stat_df['Water Type'] == 'River station']
-stat_df = stat_df[['GEMS Station Number', 'Latitude', 'Longitude']]
-print(str(len(stat_df)) + ' stations are in the dataset.')
-
-# Create a DF of the sheets with the parameters
-param_df = sheet_df(zipfiles, 'Parameter_Metadata')
-print(param_df.head())
-print(param_df.columns)
-
-# Extract only the necessary columns
-param_df = param_df[['Parameter Code', 'Parameter Long Name']]
-
-# Create a DF of observation data
-obs_df = pd.DataFrame(
-    columns=['GEMS Station Number',
-             'Sample Date',
-             'Sample Time',
-             'Depth',
-             'Parameter Code',
-             'Analysis Method Code',
-             'Value Flags',
-             'Value',
-             'Unit',
-             'Data Quality']
-)
-
-# Fill the DF with data
-for fname in zipfiles:
-    zf = zipfile.ZipFile(fname, 'r')
-    xls_name = zf.namelist()[0]
-    xls = pd.ExcelFile(zf.open(xls_name))
-    obs_names = xls.sheet_names[3:]
-    print('Filling the DF with data')
-    print('Starting with {}'.format(xls_name))
-    # Iterate over the sheets in the list
-    for obs_sheet in obs_names:
-        print('Loading table {}'.format(obs_sheet))
-        # Convert the sheet into a DF
-        sheet_df = pd.read_excel(xls, sheet_name=obs_sheet, header=0)
-        # Concatenate the DFs
-        obs_df = pd.concat([obs_df, sheet_df], ignore_index=False)
-        obs_df.drop_duplicates(inplace=True)
-        obs_df.reset_index(drop=True, inplace=True)
-print(obs_df.head())
-print(obs_df.columns)
-print(obs_df.dtypes)
-
-# Convert the sampling date into DateTime
-obs_df['date'] = pd.to_datetime(obs_df['Sample Date'], format='%Y-%m-%d')
-
-# Merge the other DFs with stat_df
-stat_df = stat_df.merge(obs_df, on='GEMS Station Number')
-stat_df = stat_df.merge(param_df, on='Parameter Code')
-
-# Print out the final number of stations
-print(str(len(stat_df['GEMS Station Number'].unique())) + ' stations remain in the dataset.')
-
-# Check if there are missing observation values
-print(str(stat_df['Value'].isnull().sum()) + ' missing observation values are in the dataset.')
-
-# Extract only rows that have observation values
-stat_df = stat_df[pd.notnull(stat_df['Value'])]
-print(str(stat_df['Value'].isnull().sum()) + ' missing observation values remain in the dataset.')
-
-# Create a new DF with proper column names and write into a CSV
-out_df = pd.DataFrame(
-    {
-        'lat': stat_df['Latitude'],
-        'lon': stat_df['Longitude'],
-        'date': stat_df['date'],
-        'station_id': stat_df['GEMS Station Number'],
-        'param_code': stat_df['Parameter Code'],
-        'param_desc': stat_df['Parameter Long Name'],
-        'value': stat_df['Value'],
-        'unit': stat_df['Unit'],
-        'origin': 'GEMStat'
-    }
-)
-out_df.to_csv(os.path.join(dirname, 'gemstat.csv'), sep=';', index=False)
-
-# Extract the units of parameters and write into a CSV
-unit_df = out_df.groupby('param_code')['unit'].unique().reset_index()
-unit_df = unit_df.merge(param_df, left_on='param_code', right_on='Parameter Code')
-unit_df.drop(['Parameter Code'], axis=1, inplace=True)
-unit_df.to_csv(os.path.join(dirname, 'gemstat_units.csv'), sep=';', index=False)
+import sys
+from sheet_cache import SheetCache
+from gemstat_utils import MANIFEST_FILE, combine_archives, ingest_archives, parameter_units, read_archives
+from join_utils import join_dimensions, join_mask
+from output_utils import write_table
+from profiling import StepLog
+
+# The guard keeps the worker processes from running the script again when they import it
+if __name__ == '__main__':
+    # Location of the zipped Excel files (the data directory can be changed with the WQ_DATA_DIR environment
+    # variable)
+    data_dir = os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data')
+    dirname = os.path.join(data_dir, 'gemstat')
+
+    # Format of the output file of the observations ('csv', 'parquet' or 'arrow', the last two need the pyarrow
+    # library, can be changed with the WQ_FORMAT environment variable)
+    out_format = os.environ.get('WQ_FORMAT', 'csv')
+
+    # Number of worker processes for parsing the Excel files (1 parses them one after another in this process)
+    workers = os.cpu_count()
+
+    # Log of the steps with their time, rows and memory (WQ_QUIET=1 turns off the debug prints and WQ_PROFILE_DIR
+    # writes a report of the steps)
+    log = StepLog('gemstat_prep')
+
+    # Directory of the shards of the parsed archives with a manifest, so that a run that stops is resumed from the
+    # archives that were done and sheets that cannot be parsed are quarantined (set shard_dir to None to parse all
+    # archives in every run and stop at the first error)
+    shard_dir = os.path.join(dirname, 'shards')
+
+    # Cache of the parsed Excel sheets, only used without the shards since they already keep the parsed archives
+    # (set cache_dir to None to parse the files again in every run)
+    cache_dir = os.path.join(dirname, 'sheet_cache')
+    cache_size = 2 * 1024 ** 3
+    cache = SheetCache(cache_dir, cache_size, log.quiet) if cache_dir is not None and shard_dir is None else None
+
+    # Create a list of the zipped Excel files
+    zipfiles = []
+    for f in os.listdir(dirname):
+        if f.endswith('.zip'):
+            zipfiles.append(os.path.join(dirname, f))
+
+    # Parse every zipped Excel file once in a pool of worker processes and create DFs of the stations, parameters
+    # and observations
+    with log.step('read archives', 'read') as step:
+        if shard_dir is not None:
+            archives, manifest = ingest_archives(zipfiles, shard_dir, workers=workers, quiet=log.quiet)
+            # Stop without writing the observations if some archives could not be parsed, so that the run fails and
+            # they are tried again in the next run (the other archives are resumed from their shards)
+            if manifest['failed']:
+                sys.exit('{} archives could not be parsed: {}'.format(len(manifest['failed']),
+                                                                     ', '.join(sorted(manifest['failed']))))
+        else:
+            archives = read_archives(zipfiles, workers=workers, cache=cache, quiet=log.quiet)
+        stat_df, param_df, obs_df = combine_archives(archives)
+        del archives
+        step.out(obs_df)
+
+    # Print out the number of quarantined sheets (their observations are missing from the output) and the sheets
+    # with their errors unless the log is quiet (they are listed in the manifest)
+    if shard_dir is not None:
+        quarantine = [(name, sheet) for name, entry in sorted(manifest['archives'].items())
+                      for sheet in entry['quarantine']]
+        if quarantine:
+            print('{} sheets are quarantined, see {}'.format(len(quarantine), os.path.join(shard_dir, MANIFEST_FILE)))
+        for name, sheet in quarantine:
+            log.show('Quarantined sheet {} of {}: {}'.format(sheet['sheet'], name, sheet['error']))
+    log.show(stat_df.head())
+    log.show(stat_df.columns)
+    log.show(str(len(stat_df)) + ' stations are in the dataset.')
+
+    # Print out the different station types
+    log.show(stat_df['Water Type'].unique())
+
+    # Extract only river stations and the columns necessary for merging with the DF of observations
+    with log.step('keep river stations', 'filter', stat_df) as step:
+        stat_df = stat_df[stat_df['Water Type'] == 'River station']
+        stat_df = step.out(stat_df[['GEMS Station Number', 'Latitude', 'Longitude']])
+    log.show(str(len(stat_df)) + ' stations are in the dataset.')
+
+    # Print out the parameters
+    log.show(param_df.head())
+    log.show(param_df.columns)
+
+    # Extract only the necessary columns
+    param_df = param_df[['Parameter Code', 'Parameter Long Name']]
+
+    # Print out the observation data
+    log.show(obs_df.head())
+    log.show(obs_df.columns)
+    log.show(obs_df.dtypes)
+
+    # Convert the sampling date into DateTime
+    obs_df['date'] = pd.to_datetime(obs_df['Sample Date'], format='%Y-%m-%d')
+
+    # Stations and parameters joined to the observations by their keys
+    dims = [(stat_df, 'GEMS Station Number', 'GEMS Station Number'), (param_df, 'Parameter Code', 'Parameter Code')]
+
+    # Check if there are missing observation values (of the observations with a station and a parameter)
+    missing = obs_df['Value'].isnull().to_numpy()
+    if not log.quiet:
+        log.show(str((missing & join_mask(obs_df, dims)).sum()) + ' missing observation values are in the dataset.')
+
+    # Extract only rows that have observation values before joining the stations and parameters
+    with log.step('keep observed values', 'filter', obs_df) as step:
+        obs_df = step.out(obs_df[~missing])
+
+    # Join the stations and parameters to the observations (attached by the positions of their keys)
+    with log.step('join stations and parameters', 'merge', obs_df) as step:
+        stat_df = step.out(join_dimensions(obs_df, dims))
+
+    # Print out the final number of stations
+    if not log.quiet:
+        log.show(str(len(stat_df['GEMS Station Number'].unique())) + ' stations remain in the dataset.')
+        log.show(str(stat_df['Value'].isnull().sum()) + ' missing observation values remain in the dataset.')
+
+    # Create a new DF with proper column names and write into a file
+    out_df = pd.DataFrame(
+        {
+            'lat': stat_df['Latitude'],
+            'lon': stat_df['Longitude'],
+            'date': stat_df['date'],
+            'station_id': stat_df['GEMS Station Number'],
+            'param_code': stat_df['Parameter Code'],
+            'param_desc': stat_df['Parameter Long Name'],
+            'value': stat_df['Value'],
+            'unit': stat_df['Unit'],
+            'origin': 'GEMStat'
+        }
+    )
+    with log.step('write observations', 'write', out_df):
+        write_table(out_df, os.path.join(dirname, 'gemstat'), out_format)
+
+    # Extract the units of parameters and write into a CSV
+    with log.step('units of parameters', 'groupby', out_df) as step:
+        unit_df = parameter_units(out_df, ['param_code'])
+        unit_df = unit_df.merge(param_df, left_on='param_code', right_on='Parameter Code')
+        unit_df.drop(['Parameter Code'], axis=1, inplace=True)
+        step.out(unit_df)
+    unit_df.to_csv(os.path.join(dirname, 'gemstat_units.csv'), sep=';', index=False)
+
+    # Print out the hits and misses of the sheet cache
+    if cache is not None:
+        cache.report()
+
+    # Write the report of the steps
+    log.write()
@@ -0,0 +1,305 @@
+# Import the libraries
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import pandas as pd
+from schemas import GEMSTAT_OBS, GEMSTAT_PARAMETERS, GEMSTAT_STATIONS, apply_schema
+from sheet_cache import file_hash, open_excel, read_sheets
+
+# Columns of the observation sheets
+OBS_COLS = GEMSTAT_OBS['usecols']
+
+# Names of the metadata sheets (the first three sheets of every file)
+META_SHEETS = ['Station_Metadata', 'Parameter_Metadata', 'Methods_Metadata']
+
+# File of the manifest of the archives that have been parsed into shards (in the shard directory)
+MANIFEST_FILE = 'manifest.json'
+
+
+# Define a function for creating a DF from the sheet of an Excel file
+def sheet_df(zipfiles, sheet_name, cache=None):
+    # Create a list of the sheets
+    sheet_list = []
+    for fname in zipfiles:
+        df = read_sheets(fname, [sheet_name], cache)[sheet_name]
+        sheet_list.append(df)
+    # Concatenate the files, drop duplicates and reset the index
+    sheet_df = pd.concat(sheet_list)
+    sheet_df.drop_duplicates(inplace=True)
+    sheet_df.reset_index(drop=True, inplace=True)
+    # Return the DF
+    return sheet_df
+
+
+# Define a generator that yields the list of observation sheets of each zipped Excel file (quiet turns off the
+# progress prints)
+def obs_sheets(zipfiles, cache=None, quiet=False):
+    for fname in zipfiles:
+        if not quiet:
+            print('Starting with {}'.format(fname))
+        sheets = read_sheets(fname, cache=cache)
+        # The first three sheets contain the metadata
+        yield list(sheets.values())[3:]
+
+
+# Define a function for concatenating groups of sheets into a DF
+# Duplicates are dropped once per group and once at the end instead of after every sheet, so the work grows
+# linearly with the number of sheets and only one group of raw sheets is held in memory at a time
+def concat_sheets(sheet_groups, columns):
+    # Start with an empty DF to keep the column order and types of the original loop
+    group_list = [pd.DataFrame(columns=columns)]
+    for sheets in sheet_groups:
+        if not sheets:
+            continue
+        group_df = pd.concat(sheets, ignore_index=True)
+        group_df.drop_duplicates(inplace=True)
+        group_list.append(group_df)
+    # Concatenate the groups, drop duplicates and reset the index
+    df = pd.concat(group_list, ignore_index=True)
+    df.drop_duplicates(inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    # Return the DF
+    return df
+
+
+# Define a function for parsing all sheets of a zipped Excel file after opening it once
+# (runs in the worker processes of read_archives, quiet turns off the progress prints)
+def read_archive(fname, cache=None, quiet=False):
+    if not quiet:
+        print('Loading {}'.format(fname))
+    # Count the hits and misses of this file separately so they can be added to the cache of the main process
+    if cache is not None:
+        cache = cache.copy()
+    sheets = read_sheets(fname, cache=cache)
+    stat_df = sheets['Station_Metadata']
+    param_df = sheets['Parameter_Metadata']
+    # Convert the observation sheets (the ones after the three metadata sheets) into a DF and drop the duplicates
+    # within the file
+    obs_df = concat_sheets([list(sheets.values())[3:]], OBS_COLS)
+    # Return the DFs and the cache counts
+    cache_counts = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    return {'stations': stat_df, 'parameters': param_df, 'observations': obs_df, 'cache_counts': cache_counts}
+
+
+# Define a function for parsing all sheets of an Excel file into a dictionary of DFs
+# (runs in the worker processes of read_workbooks)
+def read_workbook(xls_name, cache=None):
+    if cache is not None:
+        cache = cache.copy()
+    xls_dict = read_sheets(xls_name, cache=cache)
+    cache_counts = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    return xls_dict, cache_counts
+
+
+# Define a generator that applies a parsing function to a list of files in a pool of worker processes
+# The results are yielded in the order of the list, so they are the same as parsing the files one after another, and
+# at most as many files as there are workers are parsed ahead of the one that is yielded, so only a few parsed files
+# are held in memory at a time
+def pool_imap(func, fnames, workers=None):
+    # Parse the files in this process if only one worker is requested
+    if workers == 1:
+        for fname in fnames:
+            yield func(fname)
+        return
+    in_flight = workers if workers is not None else os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = deque()
+        for fname in fnames:
+            futures.append(pool.submit(func, fname))
+            if len(futures) > in_flight:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+# Define a generator that parses the zipped Excel files in a pool of worker processes and yields them one at a time
+def read_archives(zipfiles, workers=None, cache=None, quiet=False):
+    for archive in pool_imap(partial(read_archive, cache=cache, quiet=quiet), zipfiles, workers):
+        # Add the hits and misses of the worker to the cache
+        if cache is not None:
+            cache.add_counts(*archive['cache_counts'])
+        yield archive
+    # Apply the size cap of the cache
+    if cache is not None:
+        cache.evict()
+
+
+# Define a generator that parses the Excel files in a pool of worker processes and yields them one at a time
+def read_workbooks(xls_list, workers=None, cache=None):
+    for xls_dict, cache_counts in pool_imap(partial(read_workbook, cache=cache), xls_list, workers):
+        # Add the hits and misses of the worker to the cache
+        if cache is not None:
+            cache.add_counts(*cache_counts)
+        yield xls_dict
+    # Apply the size cap of the cache
+    if cache is not None:
+        cache.evict()
+
+
+# Define a function for combining the parsed archives into DFs of stations, parameters and observations with
+# the columns and types of the schemas
+# The archives are reduced as they arrive (from a list or a generator like read_archives), so only the metadata and
+# the observations of each archive without duplicates are kept instead of all parsed archives
+def combine_archives(archives):
+    stat_list, param_list, obs_list = [], [], []
+    for archive in archives:
+        stat_list.append(archive['stations'])
+        param_list.append(archive['parameters'])
+        obs_list.append(archive['observations'])
+    # Concatenate the metadata sheets, drop duplicates and reset the index (like sheet_df)
+    meta_dfs = []
+    for meta_list, schema in [(stat_list, GEMSTAT_STATIONS), (param_list, GEMSTAT_PARAMETERS)]:
+        df = apply_schema(pd.concat(meta_list), schema)
+        df.drop_duplicates(inplace=True)
+        df.reset_index(drop=True, inplace=True)
+        meta_dfs.append(df)
+    # Concatenate the observations of the archives
+    obs_df = apply_schema(concat_sheets([[df] for df in obs_list], OBS_COLS), GEMSTAT_OBS)
+    # Return the DFs
+    return meta_dfs[0], meta_dfs[1], obs_df
+
+
+# Define a function for listing the units of the parameters in the order in which they appear in the observations
+# (arrays of strings like groupby().unique() of columns of strings, also if the columns are categoricals, so the units
+# CSV is written the same way)
+def parameter_units(out_df, group_cols):
+    units = out_df[group_cols + ['unit']].drop_duplicates()
+    units = units.astype({col: object for col in group_cols + ['unit']})
+    return units.groupby(group_cols)['unit'].unique().reset_index()
+
+
+# Define a function for getting the type and the first line of the message of an error (for the manifest)
+def error_text(e):
+    lines = str(e).splitlines()
+    return '{}: {}'.format(type(e).__name__, lines[0] if lines else '')
+
+
+# Define a function for parsing the sheets of a zipped Excel file and setting aside (quarantining) the observation
+# sheets that cannot be parsed or have malformed sampling dates together with their errors
+# All sheets are parsed at once and only if that fails they are parsed one by one to find the failing ones, a file
+# whose metadata sheets cannot be parsed raises the error
+def read_archive_checked(fname):
+    quarantine = []
+    try:
+        sheets = read_sheets(fname)
+    except Exception:
+        sheets = {}
+        for sheet_name in open_excel(fname).sheet_names:
+            try:
+                sheets[sheet_name] = read_sheets(fname, [sheet_name])[sheet_name]
+            except Exception as e:
+                if sheet_name in META_SHEETS:
+                    raise
+                quarantine.append({'sheet': sheet_name, 'error': error_text(e)})
+    names = list(sheets)
+    # Check the columns and the sampling dates of the observation sheets (the ones after the metadata sheets)
+    obs_list = []
+    for sheet_name in names[3:]:
+        try:
+            missing = [col for col in OBS_COLS if col not in sheets[sheet_name].columns]
+            if missing:
+                raise KeyError('missing columns {}'.format(missing))
+            pd.to_datetime(sheets[sheet_name]['Sample Date'], format='%Y-%m-%d')
+            obs_list.append(sheets[sheet_name])
+        except (KeyError, TypeError, ValueError) as e:
+            quarantine.append({'sheet': sheet_name, 'error': error_text(e)})
+    return {'stations': sheets[names[0]], 'parameters': sheets[names[1]],
+            'observations': concat_sheets([obs_list], OBS_COLS), 'quarantine': quarantine}
+
+
+# Define a function for parsing an archive into a shard: the parsed DFs are written into a pickle named by the hash
+# of the file (into a temporary file first, so a crash never leaves a broken shard) and an entry for the manifest is
+# returned, a file that cannot be parsed returns its error instead (runs in the worker processes of ingest_archives)
+# Pickles keep the types of the raw metadata sheets exactly, so the shards give the same DFs as parsing the files
+# (the shards replace the sheet cache, so the sheets are parsed without it, quiet turns off the progress prints)
+def ingest_archive(fname, shard_dir, quiet=False):
+    if not quiet:
+        print('Loading {}'.format(fname))
+    fhash = file_hash(fname)
+    try:
+        archive = read_archive_checked(fname)
+    except Exception as e:
+        return {'hash': fhash, 'error': error_text(e)}
+    shard = fhash + '.pkl'
+    tmp_path = os.path.join(shard_dir, '{}.{}.tmp'.format(shard, os.getpid()))
+    pd.to_pickle({key: archive[key] for key in ['stations', 'parameters', 'observations']}, tmp_path)
+    os.replace(tmp_path, os.path.join(shard_dir, shard))
+    return {'hash': fhash, 'shard': shard, 'rows': len(archive['observations']), 'quarantine': archive['quarantine']}
+
+
+# Define a function for reading the manifest of the shards
+def read_manifest(shard_dir):
+    fname = os.path.join(shard_dir, MANIFEST_FILE)
+    if os.path.exists(fname):
+        with open(fname) as f:
+            return json.load(f)
+    return {'archives': {}, 'failed': {}}
+
+
+# Define a function for writing the manifest (into a temporary file first, so it is never left half-written)
+def write_manifest(shard_dir, manifest):
+    fname = os.path.join(shard_dir, MANIFEST_FILE)
+    with open(fname + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(fname + '.tmp', fname)
+
+
+# Define a function for parsing the zipped Excel files into shards in a pool of worker processes with a manifest of
+# the archives that are done, which is written after every archive so that a run that stops is resumed from the
+# archives that were parsed (an archive is parsed again if its hash has changed or its shard is missing)
+# Quarantined sheets are listed in the entries of their archives and archives that cannot be parsed are listed in
+# 'failed' (they are tried again in the next run), the parsed archives are read from their shards one at a time in
+# the order of the files (like read_archives), quiet turns off the progress prints but not the failures
+def ingest_archives(zipfiles, shard_dir, workers=None, quiet=False):
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest = read_manifest(shard_dir)
+    # Forget the failures of files that were removed
+    names = [os.path.basename(fname) for fname in zipfiles]
+    manifest['failed'] = {name: entry for name, entry in manifest['failed'].items() if name in names}
+    todo = []
+    for fname in zipfiles:
+        name = os.path.basename(fname)
+        entry = manifest['archives'].get(name)
+        if entry is not None and entry['hash'] == file_hash(fname) and \
+                os.path.exists(os.path.join(shard_dir, entry['shard'])):
+            continue
+        # Remove the shard of an older version of the file
+        if entry is not None and os.path.exists(os.path.join(shard_dir, entry['shard'])):
+            os.remove(os.path.join(shard_dir, entry['shard']))
+        manifest['archives'].pop(name, None)
+        todo.append(fname)
+    if not quiet:
+        print('{} of {} archives are resumed from their shards'.format(len(zipfiles) - len(todo), len(zipfiles)))
+
+    # Define a function for adding the result of an archive to the manifest and writing it
+    def checkpoint(fname, entry):
+        name = os.path.basename(fname)
+        if 'error' in entry:
+            print('Could not parse {}: {}'.format(fname, entry['error']))
+            manifest['failed'][name] = entry
+            write_manifest(shard_dir, manifest)
+            return
+        manifest['failed'].pop(name, None)
+        manifest['archives'][name] = entry
+        write_manifest(shard_dir, manifest)
+
+    # Parse the files in this process if only one worker is requested
+    if workers == 1:
+        for fname in todo:
+            checkpoint(fname, ingest_archive(fname, shard_dir, quiet))
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest_archive, fname, shard_dir, quiet): fname for fname in todo}
+            for future in as_completed(futures):
+                checkpoint(futures[future], future.result())
+    return read_shards(zipfiles, shard_dir, manifest), manifest
+
+
+# Define a generator that reads the shards of the archives that were parsed in the order of the files
+def read_shards(zipfiles, shard_dir, manifest):
+    for fname in zipfiles:
+        entry = manifest['archives'].get(os.path.basename(fname))
+        if entry is not None:
+            yield pd.read_pickle(os.path.join(shard_dir, entry['shard']))
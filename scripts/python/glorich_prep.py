@@ -1,101 +1,101 @@
 # Import the libraries
-import geopandas as gpd
 import os
 import pandas as pd
-
-# Location of the files
-dirname = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data/glorich'
-
-# Create a DF with the water quality stations
-stat_df = gpd.read_file(os.path.join(dirname, 'Sampling_Locations_v1.shp'))
-print(stat_df.head())
-print(stat_df.columns)
-print(str(len(stat_df)) + ' stations are in the dataset.')
-
-# Add new columns with the latitude and longitude
-stat_df['lat'] = stat_df['geometry'].y
-stat_df['lon'] = stat_df['geometry'].x
-
-# Extract only the columns necessary for merging with the DF of observations
-stat_df = stat_df[['STAT_ID', 'lat', 'lon']]
-print(stat_df.head())
+from glorich_utils import long_observations
+from join_utils import join_dimensions, join_mask
+from output_utils import write_table
+from profiling import StepLog
+from schemas import GLORICH_PARAMETERS, full_row_schema, glorich_obs_schema, read_csv
+from shapefile_utils import read_point_shapefile
+
+# Location of the files (the data directory can be changed with the WQ_DATA_DIR environment variable)
+data_dir = os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data')
+dirname = os.path.join(data_dir, 'glorich')
+
+# Format of the output file of the observations ('csv', 'parquet' or 'arrow', the last two need the pyarrow library,
+# can be changed with the WQ_FORMAT environment variable)
+out_format = os.environ.get('WQ_FORMAT', 'csv')
+
+# Log of the steps with their time, rows and memory (WQ_QUIET=1 turns off the debug prints and WQ_PROFILE_DIR writes
+# a report of the steps)
+log = StepLog('glorich_prep')
+
+# Create a DF with the water quality stations and only the columns necessary for merging with the DF of observations
+# (the STAT_ID and the latitude and longitude of the points are read from the shapefile without geopandas)
+with log.step('read stations', 'read') as step:
+    stat_df = step.out(read_point_shapefile(os.path.join(dirname, 'Sampling_Locations_v1.shp'), ['STAT_ID']))
+log.show(stat_df.head())
+log.show(stat_df.columns)
+log.show(str(len(stat_df)) + ' stations are in the dataset.')
 
 # Create a DF with the parameters of the water quality observations
-param_df = pd.read_csv(os.path.join(dirname, 'parameters.csv'), sep=';')
-print(param_df.head())
-print(param_df.columns)
-
-# Create a DF of observation data
-obs_df = pd.read_csv(os.path.join(dirname, 'hydrochemistry.csv'), sep=';', encoding='ISO-8859-1')
-obs_df.drop_duplicates(inplace=True)
-obs_df.reset_index(drop=True, inplace=True)
-print(obs_df.head())
-print(obs_df.columns)
-print(obs_df.dtypes)
+with log.step('read parameters', 'read') as step:
+    param_df = step.out(read_csv(os.path.join(dirname, 'parameters.csv'), GLORICH_PARAMETERS, sep=';'))
+log.show(param_df.head())
+log.show(param_df.columns)
+
+# Create a DF of observation data, all columns are read so that duplicates are found on full rows (the columns that
+# are not used are read as categoricals)
+obs_fname = os.path.join(dirname, 'hydrochemistry.csv')
+obs_cols = pd.read_csv(obs_fname, sep=';', encoding='ISO-8859-1', nrows=0).columns
+obs_schema = glorich_obs_schema(obs_cols)
+with log.step('read observations', 'read') as step:
+    obs_df = step.out(read_csv(obs_fname, full_row_schema(obs_schema, obs_cols), sep=';', encoding='ISO-8859-1'))
+
+# Drop the duplicates and keep only the columns of the sampling, the values and the remarks
+with log.step('drop duplicate observations', 'filter', obs_df) as step:
+    obs_df.drop_duplicates(inplace=True)
+    obs_df = obs_df[obs_schema['usecols']].reset_index(drop=True)
+    step.out(obs_df)
+log.show(obs_df.head())
+log.show(obs_df.columns)
+log.show(obs_df.dtypes)
 
 # Convert the sampling date into DateTime
-obs_df['date'] = pd.to_datetime(obs_df['RESULT_DATETIME']).dt.strftime('%Y-%m-%d')
-print(obs_df.dtypes)
+obs_df['date'] = pd.to_datetime(obs_df['RESULT_DATETIME']).dt.normalize()
+log.show(obs_df.dtypes)
 
 # Create a list of columns with remarks about the observations
 vrc_cols = []
 for col in obs_df.columns:
     if 'vrc' in col:
         vrc_cols.append(col)
-print(vrc_cols)
+log.show(vrc_cols)
 
 # Create a list of columns with values of the observations
 value_cols = []
 for col in vrc_cols:
     value_cols.append(col[:-4])
-print(value_cols)
+log.show(value_cols)
 
-# Melt the parameters and the values of the observations into two columns
-value_df = pd.melt(
-    obs_df, id_vars=['STAT_ID', 'date'], value_vars=value_cols,
-    var_name='obs_param', value_name='obs_value'
-)
-print(value_df.head())
+# Mark the rows with a station and the value columns with a parameter, so that the missing values are counted like
+# after joining the stations and parameters
+joined_rows = join_mask(obs_df, [(stat_df, 'STAT_ID', 'STAT_ID')])
+joined_cols = pd.Index(value_cols).isin(param_df['Parameter name'])
 
-# Convert values into the correct type
-value_df['obs_value'] = value_df['obs_value'].str.replace(',', '.')
-value_df['obs_value'] = value_df['obs_value'].astype(float)
+# Reshape the values into one row per station, date and parameter, keeping only the values without remarks
+with log.step('reshape observations', 'melt', obs_df) as step:
+    obs_df, summary = long_observations(obs_df, value_cols, vrc_cols, joined_rows, joined_cols)
+    step.out(obs_df)
+log.show(obs_df.head())
+log.show(obs_df.columns)
 
-# Melt the names and the values of the remarks into two columns
-vrc_df = pd.melt(
-    obs_df, id_vars=['STAT_ID'], value_vars=vrc_cols,
-    var_name='remark_param', value_name='remark_value'
-)
-vrc_df.drop(['STAT_ID'], axis=1, inplace=True)
-print(vrc_df.head())
+# Print out the number of remarks that were left out
+log.show(str(summary['remarks']) + ' remarks are in the dataset.')
 
-# Concat the DFs
-obs_df = pd.concat([value_df, vrc_df], axis=1)
-print(obs_df.head())
-print(obs_df.columns)
-
-# Check if there are any remarks about the observations
-print(str(obs_df['remark_value'].notnull().sum()) + ' remarks are in the dataset.')
-
-# Extract only rows that do not have remarks
-obs_df = obs_df[pd.isnull(obs_df['remark_value'])]
-print(str(obs_df['remark_value'].notnull().sum()) + ' remarks remain in the dataset.')
-
-# Merge the other DFs with stat_df
-stat_df = stat_df.merge(obs_df, on='STAT_ID')
-stat_df = stat_df.merge(param_df, left_on='obs_param', right_on='Parameter name')
+# Join the stations and parameters to the observations (attached by the positions of their keys)
+with log.step('join stations and parameters', 'merge', obs_df) as step:
+    stat_df = step.out(join_dimensions(obs_df, [(stat_df, 'STAT_ID', 'STAT_ID'),
+                                                (param_df, 'obs_param', 'Parameter name')]))
 
 # Print out the final number of stations
-print(str(len(stat_df['STAT_ID'].unique())) + ' stations remain in the dataset.')
+if not log.quiet:
+    log.show(str(len(stat_df['STAT_ID'].unique())) + ' stations remain in the dataset.')
 
-# Check if there are missing observation values
-print(str(stat_df['obs_value'].isnull().sum()) + ' missing observation values are in the dataset.')
+# Print out the number of missing observation values that were left out
+log.show(str(summary['missing']) + ' missing observation values are in the dataset.')
 
-# Extract only rows that have observation values
-stat_df = stat_df[pd.notnull(stat_df['obs_value'])]
-print(str(stat_df['obs_value'].isnull().sum()) + ' missing observation values remain in the dataset.')
-
-# Create a new DF with proper column names and write into a CSV
+# Create a new DF with proper column names and write into a file
 out_df = pd.DataFrame(
     {
         'lat': stat_df['lat'],
@@ -109,10 +109,16 @@ out_df = pd.DataFrame(
         'origin': 'GLORICH'
     }
 )
-out_df.to_csv(os.path.join(dirname, 'glorich.csv'), sep=';', index=False)
+with log.step('write observations', 'write', out_df) as step:
+    step.out(out_df)
+    write_table(out_df, os.path.join(dirname, 'glorich'), out_format)
 
 # Extract the units of parameters and write into a CSV
-unit_df = out_df.groupby('param_code')['unit'].unique().reset_index()
+with log.step('units of parameters', 'groupby', out_df) as step:
+    unit_df = step.out(out_df.groupby('param_code', observed=True)['unit'].unique().reset_index())
 unit_df = unit_df.merge(param_df, left_on='param_code', right_on='Parameter name')
 unit_df.drop(['Parameter name', 'Unit'], axis=1, inplace=True)
 unit_df.to_csv(os.path.join(dirname, 'glorich_units.csv'), sep=';', index=False)
+
+# Write the report of the steps
+log.write()
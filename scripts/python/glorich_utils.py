@@ -0,0 +1,44 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+
+
+# Define a function for reshaping the wide observations into one row per station, date and parameter
+# Each value column is paired with its remark column and only the cells that have a value and no remark are
+# copied into the long DF, so the full long DFs of the values and the remarks are never built
+# The rows come out in the same order as from melting the value columns (parameter by parameter)
+# The values are converted into numbers with their decimal commas replaced (values that are not numbers become
+# missing) and the missing values are counted only in the rows and columns marked by joined_rows and joined_cols
+# (the rows with a station and the columns with a parameter)
+def long_observations(obs_df, value_cols, vrc_cols, joined_rows=None, joined_cols=None):
+    summary = {'remarks': 0, 'missing': 0}
+    if joined_rows is None:
+        joined_rows = np.ones(len(obs_df), dtype=bool)
+    if joined_cols is None:
+        joined_cols = np.ones(len(value_cols), dtype=bool)
+    rows, codes, values = [], [], []
+    for i, (value_col, vrc_col) in enumerate(zip(value_cols, vrc_cols)):
+        # Mark the cells with remarks and the cells without values
+        remark = obs_df[vrc_col].notnull().to_numpy()
+        strings = obs_df[value_col]
+        present = strings.notnull().to_numpy()
+        value = np.full(len(obs_df), np.nan)
+        value[present] = pd.to_numeric(strings[present].str.replace(',', '.', regex=False), errors='coerce')
+        missing = np.isnan(value)
+        summary['remarks'] += int(remark.sum())
+        if joined_cols[i]:
+            summary['missing'] += int((missing & ~remark & joined_rows).sum())
+        # Keep the positions and the values of the cells that have values and no remarks
+        idx = np.flatnonzero(~(remark | missing))
+        rows.append(idx)
+        codes.append(np.full(len(idx), i, dtype=np.int32))
+        values.append(value[idx])
+    rows = np.concatenate(rows)
+    # Create the long DF with the parameter names stored as codes of the value columns
+    long_df = pd.DataFrame({
+        'STAT_ID': obs_df['STAT_ID'].to_numpy()[rows],
+        'date': obs_df['date'].to_numpy()[rows],
+        'obs_param': pd.Categorical.from_codes(np.concatenate(codes), categories=value_cols),
+        'obs_value': np.concatenate(values)
+    })
+    return long_df, summary
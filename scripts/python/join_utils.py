@@ -0,0 +1,68 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+
+
+# Define a function for finding the row of a dimension table (stations or parameters) for each key of the
+# observations, -1 if the key is not in the table
+# Categorical keys are looked up once per category and the positions are taken with the codes of the rows
+def key_positions(keys, dim_keys):
+    index = pd.Index(dim_keys.to_numpy())
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        cat_pos = np.r_[index.get_indexer(keys.cat.categories), index.get_indexer([np.nan])]
+        # The code of missing keys (-1) takes the position of a missing key in the table (like merge())
+        return cat_pos[keys.cat.codes.to_numpy()]
+    return index.get_indexer(keys)
+
+
+# Define a function for checking whether the dimension tables can be joined by array indexing: their keys have to
+# be unique and their columns must not overlap with the other columns (merge() would add suffixes)
+def indexable(df, dims):
+    columns = set(df.columns)
+    for dim_df, key, dim_key in dims:
+        if not dim_df[dim_key].is_unique or columns & (set(dim_df.columns) - {key}):
+            return False
+        columns |= set(dim_df.columns)
+    return True
+
+
+# Define a function for marking the observations that have a row in every dimension table
+# dims is a list of (dimension DF, key column of the observations, key column of the dimension DF)
+def join_mask(df, dims):
+    mask = np.ones(len(df), dtype=bool)
+    for dim_df, key, dim_key in dims:
+        mask &= key_positions(df[key], dim_df[dim_key]) >= 0
+    return mask
+
+
+# Define a function for joining small dimension tables to the observations like merging the first table with the
+# observations and the result with the other tables (inner joins with the same rows, row order and columns)
+# The keys are looked up once and the columns of the dimension tables are attached by array indexing instead of
+# hash merges that copy the observations for every table, the merges are used if the keys of a table are not unique
+# dims is a list of (dimension DF, key column of the observations, key column of the dimension DF)
+def join_dimensions(df, dims):
+    if not indexable(df, dims):
+        dim_df, key, dim_key = dims[0]
+        joined = dim_df.merge(df, left_on=dim_key, right_on=key)
+        for dim_df, key, dim_key in dims[1:]:
+            joined = joined.merge(dim_df, left_on=key, right_on=dim_key)
+        return joined
+    positions = [key_positions(df[key], dim_df[dim_key]) for dim_df, key, dim_key in dims]
+    rows = np.flatnonzero(np.logical_and.reduce([pos >= 0 for pos in positions]))
+    # The rows come in the order of the first table (and in the order of the observations within each of its rows)
+    rows = rows[np.argsort(positions[0][rows], kind='stable')]
+    columns = {}
+    for col in dims[0][0].columns:
+        columns[col] = dims[0][0][col].array.take(positions[0][rows])
+    for col in df.columns:
+        if col not in columns:
+            columns[col] = df[col].array.take(rows)
+    for (dim_df, key, dim_key), pos in zip(dims[1:], positions[1:]):
+        for col in dim_df.columns:
+            if col not in columns:
+                columns[col] = dim_df[col].array.take(pos[rows])
+    # Categorical keys joined with keys of another type become plain values like in merge()
+    for dim_df, key, dim_key in dims:
+        if hasattr(df[key], 'cat') and df[key].dtype != dim_df[dim_key].dtype:
+            columns[key] = columns[key].astype(dim_df[dim_key].dtype)
+    return pd.DataFrame(columns)
@@ -0,0 +1,214 @@
+# Import the libraries
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+
+# Define a function for splitting a DF into a dictionary of DFs by the values of a column in one pass
+# (the rows keep their order within each DF)
+def split_by(df, col='param_code'):
+    return {key: group for key, group in df.groupby(col, sort=False, observed=True)}
+
+
+# File name of the partition of a parameter in the Parquet dataset (param_code=<param>/part-0.parquet)
+PARTITION_FILE = 'part-0.parquet'
+
+
+# Define a function for writing a separate CSV for each parameter (<param>_monthly_data.csv) on a pool of
+# threads and optionally a Parquet dataset partitioned by the parameter (param_code=<param>/ directories)
+# If a list of parameters is given, only their files and the missing files are written again (and removed if they
+# have no rows)
+def write_param_files(monthly_df, dirname, workers=4, parquet_dir=None, params=None):
+    param_dfs = split_by(monthly_df, 'param_code')
+    if params is not None:
+        missing = [param for param in param_dfs if param_files_missing(param, dirname, parquet_dir)]
+        params = sorted(set(params) | set(missing))
+        for param in params:
+            if param not in param_dfs:
+                remove_param_files(param, dirname, parquet_dir)
+        param_dfs = {param: param_dfs[param] for param in params if param in param_dfs}
+
+    # Define a function for writing the CSV of a parameter
+    def write_csv(param):
+        fname = param + '_monthly_data.csv'
+        param_dfs[param].to_csv(os.path.join(dirname, fname), sep=';', index=False)
+        return fname
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fnames = list(pool.map(write_csv, param_dfs))
+        # Write the partitions of the Parquet dataset again from scratch (needs the pyarrow library)
+        if parquet_dir is not None:
+            write_partitions(monthly_df, list(param_dfs), parquet_dir, pool, clear=params is None)
+    return fnames
+
+
+# Define a function for writing the partitions of the parameters of the Parquet dataset on a pool of threads
+# All partitions are written with the schema of the whole DF, so they have the same types (columns of mixed types,
+# e.g. numeric and text station IDs, are stored as strings), and the old dataset is removed first if clear is set
+def write_partitions(monthly_df, params, parquet_dir, pool, clear=False):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if clear and os.path.exists(parquet_dir):
+        shutil.rmtree(parquet_dir)
+    for param in params:
+        partition = os.path.join(parquet_dir, 'param_code={}'.format(param))
+        if os.path.exists(partition):
+            shutil.rmtree(partition)
+    parquet_df = arrow_frame(monthly_df, categorical=False)
+    schema = pa.Schema.from_pandas(parquet_df, preserve_index=False)
+    schema = schema.remove(schema.get_field_index('param_code'))
+    parquet_dfs = split_by(parquet_df, 'param_code')
+
+    # Define a function for writing the partition of a parameter
+    def write_partition(param):
+        partition = os.path.join(parquet_dir, 'param_code={}'.format(param))
+        os.makedirs(partition)
+        table = pa.Table.from_pandas(parquet_dfs[param].drop('param_code', axis=1), schema=schema,
+                                     preserve_index=False)
+        pq.write_table(table, os.path.join(partition, PARTITION_FILE))
+
+    list(pool.map(write_partition, params))
+
+
+# Define a function for checking whether an output file of a parameter is missing
+def param_files_missing(param, dirname, parquet_dir=None):
+    if not os.path.exists(os.path.join(dirname, param + '_monthly_data.csv')):
+        return True
+    return parquet_dir is not None and not os.path.exists(os.path.join(parquet_dir, 'param_code={}'.format(param)))
+
+
+# Define a function for removing the output files of a parameter
+def remove_param_files(param, dirname, parquet_dir=None):
+    fname = os.path.join(dirname, param + '_monthly_data.csv')
+    if os.path.exists(fname):
+        os.remove(fname)
+    if parquet_dir is not None:
+        partition = os.path.join(parquet_dir, 'param_code={}'.format(param))
+        if os.path.exists(partition):
+            shutil.rmtree(partition)
+
+
+# Extensions of the formats of the intermediate files (Parquet and Arrow IPC need the pyarrow library)
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+# Maximum number of rows of the row groups of a Parquet file and of the record batches of an Arrow IPC file (the
+# chunks in which read_chunks() reads them)
+CHUNK_ROWS = 10 ** 6
+
+
+# Define a function for getting the file name of an intermediate file in a format from its name without extension
+def table_fname(fname, fmt='csv'):
+    if fmt not in FORMATS:
+        raise ValueError('Unknown format {}, use one of {}'.format(fmt, ', '.join(FORMATS)))
+    return fname + FORMATS[fmt]
+
+
+# Define a function for preparing a DF for Arrow: columns of strings are stored as categoricals (dictionaries) or
+# the categoricals as plain values, and columns of mixed types (e.g. numeric and text station IDs) as strings,
+# the same way as they are read back from a CSV
+def arrow_frame(df, categorical=True):
+    df = df.copy()
+    for col in df.columns:
+        values = df[col].cat.categories if hasattr(df[col], 'cat') else df[col]
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ['string', 'empty']:
+            values = values.where(values.isnull(), values.astype(str))
+            if hasattr(df[col], 'cat'):
+                df[col] = df[col].cat.rename_categories(values)
+            else:
+                df[col] = values
+        if categorical and pd.api.types.is_string_dtype(df[col].dtype) and not hasattr(df[col], 'cat'):
+            df[col] = df[col].astype('category')
+        elif not categorical and hasattr(df[col], 'cat'):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+# Writer of an intermediate file in chunks (CSV with semicolons, a Parquet file or an Arrow IPC file)
+# All chunks have to have the same columns and types, so the categoricals of the chunks are written as plain values
+# unless the DF is written at once with write_table()
+class TableWriter(object):
+
+    def __init__(self, fname, fmt='csv', categorical=False):
+        self.fname = table_fname(fname, fmt)
+        self.fmt = fmt
+        self.categorical = categorical
+        self.writer = None
+        self.schema = None
+        self.rows = 0
+
+    # Define a function for appending a chunk to the file
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.fname, sep=';', index=False, mode='a' if self.rows else 'w', header=not self.rows)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            df = arrow_frame(df, self.categorical)
+            if self.writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self.schema = table.schema
+                if self.fmt == 'parquet':
+                    self.writer = pq.ParquetWriter(self.fname, self.schema)
+                else:
+                    self.writer = pa.RecordBatchFileWriter(self.fname, self.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            self.writer.write_table(table, CHUNK_ROWS)
+        self.rows += len(df)
+
+    # Define a function for finishing the file
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        return self.fname
+
+
+# Define a function for writing a DF into an intermediate file at once (the columns of strings are stored as
+# categoricals in Parquet and Arrow IPC files)
+def write_table(df, fname, fmt='csv'):
+    writer = TableWriter(fname, fmt, categorical=True)
+    writer.write(df)
+    return writer.close()
+
+
+# Define a function for reading an intermediate file (Parquet and Arrow IPC files are memory-mapped, so the dates,
+# numbers and categoricals are read with their types and without parsing text)
+def read_table(fname, fmt='csv', **kwargs):
+    fname = table_fname(fname, fmt)
+    if fmt == 'csv':
+        return pd.read_csv(fname, sep=';', **kwargs)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if fmt == 'parquet':
+        return pq.read_table(fname, memory_map=True).to_pandas()
+    with pa.memory_map(fname) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+# Define a function for reading an intermediate file in chunks of rows (by the row groups for Parquet and by the
+# record batches for Arrow IPC files, which are the chunks they were written in), so that only one chunk is in
+# memory at a time
+def read_chunks(fname, fmt='csv', chunk_size=10 ** 6, columns=None, dtype=None):
+    fname = table_fname(fname, fmt)
+    if fmt == 'csv':
+        for chunk in pd.read_csv(fname, sep=';', usecols=columns, dtype=dtype, chunksize=chunk_size):
+            yield chunk
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if fmt == 'parquet':
+        parquet_file = pq.ParquetFile(fname, memory_map=True)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i, columns=columns).to_pandas()
+        return
+    with pa.memory_map(fname) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            # Select the columns without copying them
+            if columns is not None:
+                batch = pa.RecordBatch.from_arrays([batch.column(batch.schema.get_field_index(col)) for col in columns],
+                                                   columns)
+            yield batch.to_pandas()
@@ -0,0 +1,265 @@
+# Import the libraries
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from output_utils import FORMATS
+from sheet_cache import file_hash
+
+# Directory of the scripts
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# File of the hashes of the stages that have run (in the data directory)
+STATE_FILE = '.pipeline_state.json'
+
+# Environment variables passed to the scripts that change their results (part of the configuration of the stages)
+CONFIG_VARS = ['WQ_FORMAT', 'WQ_COMPACT', 'WQ_TRIM', 'WQ_STORE_DIR', 'WQ_COLOCATE_KM', 'WQ_PARQUET_DIR',
+               'WQ_TENSOR_DIR']
+
+# Files of the station x parameter x month arrays written by data_cleaning.py
+TENSOR_FILES = ['mean.npy', 'cv.npy', 'count.npy', 'stations.csv', 'params.csv']
+
+
+# Define a function for declaring the stages with their scripts, inputs and outputs (relative to the data directory,
+# the outputs can be patterns) and the stages they depend on
+# The {fmt} in the names is replaced by the extension of the format of the intermediate files and the optional outputs
+# of data_cleaning.py are declared if their directories are set in the environment (env, os.environ by default)
+def pipeline_stages(gemstat_script='gemstat_prep.py', env=None):
+    env = os.environ if env is None else env
+    cleaning_outputs = ['full_monthly_data{fmt}', 'monthly-water-quality/*_monthly_data.csv']
+    # The directories are relative to the directory of the scripts (the working directory of the scripts)
+    if env.get('WQ_PARQUET_DIR'):
+        cleaning_outputs.append(os.path.join(SCRIPT_DIR, env['WQ_PARQUET_DIR'], 'param_code=*'))
+    if env.get('WQ_TENSOR_DIR'):
+        cleaning_outputs.extend(os.path.join(SCRIPT_DIR, env['WQ_TENSOR_DIR'], fname) for fname in TENSOR_FILES)
+    gemstat_inputs = ['gemstat/*.zip'] if gemstat_script == 'gemstat_prep.py' else ['gemstat/*.xls',
+                                                                                      'params_to_extract.csv']
+    return {
+        'gemstat': {
+            'script': gemstat_script,
+            'inputs': gemstat_inputs,
+            'outputs': ['gemstat/gemstat{fmt}', 'gemstat/gemstat_units.csv'],
+            'deps': []
+        },
+        'waterbase': {
+            'script': 'waterbase_prep.py',
+            'inputs': ['waterbase/Waterbase_v2016_1_WISE4_MonitoringSite_DerivedData.csv',
+                       'waterbase/ObservedProperty.csv',
+                       'waterbase/Waterbase_v2016_1_T_WISE4_DisaggregatedData.csv'],
+            'outputs': ['waterbase/waterbase{fmt}', 'waterbase/waterbase_units.csv'],
+            'deps': []
+        },
+        'glorich': {
+            'script': 'glorich_prep.py',
+            'inputs': ['glorich/Sampling_Locations_v1.*', 'glorich/parameters.csv', 'glorich/hydrochemistry.csv'],
+            'outputs': ['glorich/glorich{fmt}', 'glorich/glorich_units.csv'],
+            'deps': []
+        },
+        'data_cleaning': {
+            'script': 'data_cleaning.py',
+            'inputs': ['gemstat/gemstat{fmt}', 'waterbase/waterbase{fmt}', 'glorich/glorich{fmt}', 'data_map.csv',
+                       'trimming_criteria.csv'],
+            'outputs': cleaning_outputs,
+            'deps': ['gemstat', 'waterbase', 'glorich']
+        }
+    }
+
+
+# Define a function for finding the modules of this directory that a script imports (also indirectly)
+def local_modules(script):
+    modules, queue = set(), [script]
+    while queue:
+        fname = queue.pop()
+        if fname in modules:
+            continue
+        modules.add(fname)
+        with open(os.path.join(SCRIPT_DIR, fname), encoding='utf-8') as f:
+            for name in re.findall(r'^\s*(?:from|import)\s+(\w+)', f.read(), flags=re.MULTILINE):
+                if os.path.exists(os.path.join(SCRIPT_DIR, name + '.py')):
+                    queue.append(name + '.py')
+    return sorted(modules)
+
+
+# Define a function for expanding the names of the inputs into the existing files
+def input_files(data_dir, patterns, fmt):
+    fnames = []
+    for pattern in patterns:
+        fnames.extend(sorted(glob.glob(os.path.join(data_dir, pattern.format(fmt=FORMATS[fmt])))))
+    return fnames
+
+
+# Define a function for checking whether the outputs of a stage exist: every declared output has to match a file and
+# the files that the last successful run wrote must still be there (e.g. all files of the parameters)
+def outputs_exist(data_dir, patterns, fmt, recorded):
+    for pattern in patterns:
+        if not glob.glob(os.path.join(data_dir, pattern.format(fmt=FORMATS[fmt]))):
+            return False
+    return all(os.path.exists(os.path.join(data_dir, fname)) for fname in recorded)
+
+
+# Define a function for hashing a file again only if its size or modification time has changed since the last run
+def cached_hash(fname, hashes):
+    stat = os.stat(fname)
+    key = '{}:{}'.format(stat.st_size, stat.st_mtime_ns)
+    if hashes.get(fname, {}).get('key') != key:
+        hashes[fname] = {'key': key, 'sha1': file_hash(fname)}
+    return hashes[fname]['sha1']
+
+
+# Define a function for hashing the inputs, the code and the configuration of a stage
+def stage_hash(stage, data_dir, fmt, env, hashes):
+    sha = hashlib.sha1()
+    for fname in input_files(data_dir, stage['inputs'], fmt):
+        sha.update('input {} {}\n'.format(os.path.relpath(fname, data_dir), cached_hash(fname, hashes)).encode())
+    for module in local_modules(stage['script']):
+        sha.update('code {} {}\n'.format(module, cached_hash(os.path.join(SCRIPT_DIR, module), hashes)).encode())
+    for var in CONFIG_VARS:
+        sha.update('config {}={}\n'.format(var, env.get(var, '')).encode())
+    return sha.hexdigest()
+
+
+# Define a function for running the script of a stage in a new Python process with its output written into a log
+# The peak memory is only available on Unix: it is the largest maximum resident set size of the process and the
+# worker processes it waited for (wait4() reports the maximum of the process tree, not the sum of the workers that
+# ran at the same time, e.g. the Excel parsers of gemstat_prep.py)
+def run_script(script, env, log_fname):
+    start = time.perf_counter()
+    with open(log_fname, 'w') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, script)], cwd=SCRIPT_DIR, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, 'wait4'):
+            status, usage = os.wait4(process.pid, 0)[1:]
+            process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            # The maximum resident set size (of the largest process of the tree) is in kilobytes on Linux and in bytes
+            # on macOS
+            peak = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        else:
+            process.wait()
+            peak = None
+    return process.returncode, time.perf_counter() - start, peak
+
+
+# Define a function for reading the state of the previous runs
+def read_state(data_dir):
+    fname = os.path.join(data_dir, STATE_FILE)
+    if os.path.exists(fname):
+        with open(fname) as f:
+            return json.load(f)
+    return {'stages': {}, 'hashes': {}, 'outputs': {}}
+
+
+# Define a function for writing the state (into a temporary file first, so it is never left half-written)
+def write_state(data_dir, state):
+    fname = os.path.join(data_dir, STATE_FILE)
+    with open(fname + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(fname + '.tmp', fname)
+
+
+# Define a function for running the stages in the order of their dependencies
+# Stages whose dependencies are done run concurrently (up to workers at a time) and a stage is skipped if the
+# hash of its inputs, code and configuration is the same as in its last successful run and its outputs exist
+# Stages whose dependencies failed (or were blocked) are not run and get the status 'blocked'
+def run_pipeline(data_dir, fmt='csv', stages=None, gemstat_script='gemstat_prep.py', workers=3, force=False,
+                 dry_run=False):
+    env = dict(os.environ, WQ_DATA_DIR=data_dir, WQ_FORMAT=fmt)
+    all_stages = pipeline_stages(gemstat_script, env)
+    selected = list(all_stages) if not stages else stages
+    state = read_state(data_dir)
+    state.setdefault('outputs', {})
+    log_dir = os.path.join(data_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    results = {}
+    pending = list(selected)
+    running = {}
+
+    # Define a function for checking whether a stage can be skipped and running it otherwise
+    def start_stage(name, pool):
+        stage = all_stages[name]
+        digest = stage_hash(stage, data_dir, fmt, env, state['hashes'])
+        done = state['stages'].get(name) == digest and outputs_exist(data_dir, stage['outputs'], fmt,
+                                                                     state['outputs'].get(name, []))
+        if done and not force:
+            results[name] = {'status': 'skipped'}
+            return None
+        if dry_run:
+            results[name] = {'status': 'would run'}
+            return None
+        print('Running {} ({})'.format(name, stage['script']))
+        future = pool.submit(run_script, stage['script'], env, os.path.join(log_dir, name + '.log'))
+        running[future] = (name, digest)
+        return future
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Start the stages whose selected dependencies have finished
+            for name in list(pending):
+                deps = [dep for dep in all_stages[name]['deps'] if dep in selected]
+                if any(results.get(dep, {}).get('status') in ['failed', 'blocked'] for dep in deps):
+                    results[name] = {'status': 'blocked', 'error': 'not run because a dependency failed'}
+                    pending.remove(name)
+                elif all(dep in results for dep in deps):
+                    pending.remove(name)
+                    start_stage(name, pool)
+            if not running:
+                continue
+            # Wait for a running stage to finish and save its hash if it succeeded
+            finished = wait(list(running), return_when=FIRST_COMPLETED)[0]
+            for future in finished:
+                name, digest = running.pop(future)
+                code, seconds, peak = future.result()
+                results[name] = {'status': 'done' if code == 0 else 'failed', 'seconds': seconds, 'peak': peak}
+                # Record the files that the stage wrote, so that a missing one makes it run again
+                if code == 0:
+                    state['stages'][name] = digest
+                    state['outputs'][name] = [os.path.relpath(fname, data_dir) for fname in
+                                              input_files(data_dir, all_stages[name]['outputs'], fmt)]
+                else:
+                    results[name]['error'] = 'exit code {}, see {}'.format(code, os.path.join(log_dir, name + '.log'))
+                    state['stages'].pop(name, None)
+                    state['outputs'].pop(name, None)
+                write_state(data_dir, state)
+    write_state(data_dir, state)
+    return {name: results[name] for name in selected}
+
+
+# Define a function for printing out the status, wall time and peak memory of the stages (of the largest process of
+# each stage, see run_script)
+def print_results(results):
+    print('{:<15} {:<10} {:>10} {:>16}'.format('stage', 'status', 'time (s)', 'max process (MB)'))
+    for name, result in results.items():
+        seconds = '{:.1f}'.format(result['seconds']) if 'seconds' in result else '-'
+        peak = '{:.0f}'.format(result['peak'] / 1e6) if result.get('peak') else '-'
+        print('{:<15} {:<10} {:>10} {:>16}'.format(name, result['status'], seconds, peak))
+        if 'error' in result:
+            print('    ' + result['error'])
+
+
+# The guard keeps the stages from running when the module is imported
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the preparation of the water quality data.')
+    parser.add_argument('stages', nargs='*', help='stages to run (all by default): ' +
+                                                  ', '.join(pipeline_stages()))
+    parser.add_argument('--data-dir', default=os.environ.get('WQ_DATA_DIR', os.path.join(SCRIPT_DIR, '..', '..',
+                                                                                          'data')),
+                        help='data directory with the gemstat, waterbase and glorich directories')
+    parser.add_argument('--format', default='csv', choices=list(FORMATS), help='format of the intermediate files')
+    parser.add_argument('--gemstat', default='prep', choices=['prep', 'extraction'],
+                        help='read the zipped GEMStat files (prep) or the Excel files (extraction)')
+    parser.add_argument('--workers', type=int, default=3, help='number of stages that can run at the same time')
+    parser.add_argument('--force', action='store_true', help='run the stages even if nothing has changed')
+    parser.add_argument('--dry-run', action='store_true', help='only print out which stages would run')
+    args = parser.parse_args()
+    for name in args.stages:
+        if name not in pipeline_stages():
+            parser.error('unknown stage {}'.format(name))
+    results = run_pipeline(os.path.abspath(args.data_dir), args.format, args.stages,
+                           'gemstat_{}.py'.format(args.gemstat), args.workers, args.force, args.dry_run)
+    print_results(results)
+    sys.exit(1 if any(result['status'] in ['failed', 'blocked'] for result in results.values()) else 0)
@@ -0,0 +1,65 @@
+# Import the libraries
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from scipy import special, stats
+from output_utils import split_by
+
+
+# Define a function for fitting the Box-Cox lambda of one parameter (the same maximum likelihood estimate that
+# stats.boxcox() uses, without transforming the values)
+def fit_lambda(values):
+    return stats.boxcox_normmax(values, method='mle')
+
+
+# Define a function for fitting the lambdas of all parameters in a pool of worker processes
+# The DF is split by the parameter in one pass and the values of each parameter are sent to a worker
+def fit_lambdas(df, value_col='mean', by='param_code', workers=None):
+    param_dfs = split_by(df, by)
+    params = list(param_dfs)
+    values = [param_dfs[param][value_col].to_numpy(dtype=float) for param in params]
+    # Fit the lambdas in this process if only one worker is requested
+    if workers == 1:
+        lambdas = [fit_lambda(array) for array in values]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lambdas = list(pool.map(fit_lambda, values))
+    return pd.Series(lambdas, index=pd.Index(params, name=by), name='lambda')
+
+
+# Define a function for reading the lambdas from a CSV (param_code;lambda)
+def read_lambdas(fname, by='param_code'):
+    return pd.read_csv(fname, sep=';', index_col=by)['lambda']
+
+
+# Define a function for writing the lambdas into a CSV
+def write_lambdas(lambdas, fname):
+    lambdas.to_csv(fname, sep=';', header=True)
+
+
+# Define a function for transforming the values with the lambdas of their parameters at once and adding the
+# columns pt_value, lambda and pt_skew (skewness of the transformed values of the parameter)
+def apply_lambdas(df, lambdas, value_col='mean', by='param_code'):
+    df = df.copy()
+    row_lambdas = df[by].map(lambdas).astype(float).to_numpy()
+    df['pt_value'] = special.boxcox(df[value_col].to_numpy(dtype=float), row_lambdas)
+    df['lambda'] = row_lambdas
+    df['pt_skew'] = df['pt_value'].groupby(df[by]).transform('skew')
+    return df
+
+
+# Define a function for the Box-Cox power transformation of the values of each parameter
+# If a CSV of lambdas is given, the lambdas in it are used without fitting again (a frozen transformation) and
+# only the parameters that are missing from it are fitted and added to the file
+def power_transform(df, value_col='mean', by='param_code', workers=None, lambda_fname=None):
+    if lambda_fname is not None and os.path.exists(lambda_fname):
+        lambdas = read_lambdas(lambda_fname, by)
+    else:
+        lambdas = pd.Series([], index=pd.Index([], name=by), name='lambda', dtype=float)
+    # Fit the lambdas of the parameters that do not have one yet
+    missing = ~df[by].isin(lambdas.index)
+    if missing.any():
+        lambdas = pd.concat([lambdas, fit_lambdas(df[missing], value_col, by, workers)])
+        if lambda_fname is not None:
+            write_lambdas(lambdas, lambda_fname)
+    return apply_lambdas(df, lambdas, value_col, by)
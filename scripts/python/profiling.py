@@ -0,0 +1,124 @@
+# Import the libraries
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+# Columns of the report of the steps
+REPORT_COLS = ['script', 'step', 'kind', 'seconds', 'rows_in', 'rows_out', 'frame_mb', 'peak_rss_mb']
+
+
+# Define a function for getting the number of rows of a DF (or the total of a list of DFs)
+def frame_rows(df):
+    if df is None:
+        return None
+    if isinstance(df, (list, tuple)):
+        return sum(len(part) for part in df)
+    return len(df)
+
+
+# Define a function for getting the memory of a DF in MB (the strings are counted if deep is True, which takes a
+# pass over the object columns)
+def frame_mb(df, deep=True):
+    if isinstance(df, pd.Series):
+        return df.memory_usage(deep=deep, index=False) / 1e6
+    if isinstance(df, pd.DataFrame):
+        return df.memory_usage(deep=deep, index=False).sum() / 1e6
+    return None
+
+
+# Define a function for getting the peak resident memory of this process in MB (only available on Unix)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # The maximum resident set size is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+# A step that is being timed: the output DF is given with out() when it is ready (the rows can also be set
+# directly if the step does not keep its DFs, like a step that streams a file)
+class Step(object):
+
+    def __init__(self, df_in):
+        self.rows_in = frame_rows(df_in)
+        self.rows_out = None
+        self.df_out = None
+
+    # Define a function for setting the output DF of the step
+    def out(self, df):
+        self.df_out = df
+        self.rows_out = frame_rows(df)
+        return df
+
+
+# Log of the steps of a script (read, filter, merge, melt, groupby, write) with their wall time, rows in and out and
+# the memory of the output DF, which replaces the debug prints of the scripts
+# The settings come from environment variables: WQ_QUIET=1 turns off the debug prints, WQ_PROFILE_DIR is the
+# directory of the reports (<script>_profile.json or .csv with WQ_PROFILE_FORMAT=csv) and WQ_PROFILE_DEEP=0 counts
+# only the memory of the arrays and not of the strings in them
+class StepLog(object):
+
+    def __init__(self, script, quiet=None, report_dir=None, report_format=None, deep=None):
+        self.script = script
+        self.quiet = os.environ.get('WQ_QUIET', '0') == '1' if quiet is None else quiet
+        self.report_dir = os.environ.get('WQ_PROFILE_DIR') if report_dir is None else report_dir
+        self.report_format = os.environ.get('WQ_PROFILE_FORMAT', 'json') if report_format is None else report_format
+        self.deep = os.environ.get('WQ_PROFILE_DEEP', '1') == '1' if deep is None else deep
+        # The memory of the DFs is only measured if it is printed out or written into a report
+        self.measure_memory = not self.quiet or self.report_dir is not None
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.records = []
+
+    # Define a function for printing out debug information unless the log is quiet
+    def show(self, *values):
+        if not self.quiet:
+            print(*values)
+
+    # Define a function for timing a step and recording the rows and memory of its input and output
+    @contextmanager
+    def step(self, name, kind, df_in=None):
+        step = Step(df_in)
+        start = time.perf_counter()
+        yield step
+        seconds = time.perf_counter() - start
+        self.records.append({
+            'script': self.script,
+            'step': name,
+            'kind': kind,
+            'seconds': round(seconds, 4),
+            'rows_in': step.rows_in,
+            'rows_out': step.rows_out,
+            'frame_mb': frame_mb(step.df_out, self.deep) if self.measure_memory else None,
+            'peak_rss_mb': peak_rss_mb()
+        })
+        if not self.quiet:
+            # A step without output (like writing a file) is printed out with the rows of its input
+            record = self.records[-1]
+            rows = record['rows_in'] if record['rows_out'] is None else record['rows_out']
+            print('[{}] {} took {:.2f} s, {} rows, {} MB'.format(
+                kind, name, seconds, '-' if rows is None else rows, '-' if record['frame_mb'] is None else
+                '{:.1f}'.format(record['frame_mb'])))
+
+    # Define a function for writing the report (JSON or CSV) into the report directory if it is set
+    def write(self):
+        if self.report_dir is None:
+            return None
+        os.makedirs(self.report_dir, exist_ok=True)
+        fname = os.path.join(self.report_dir, '{}_profile.{}'.format(self.script, self.report_format))
+        if self.report_format == 'csv':
+            with open(fname, 'w', newline='') as f:
+                writer = csv.DictWriter(f, REPORT_COLS + ['started'], delimiter=';')
+                writer.writeheader()
+                for record in self.records:
+                    writer.writerow(dict(record, started=self.started))
+        else:
+            with open(fname, 'w') as f:
+                json.dump({'script': self.script, 'started': self.started, 'steps': self.records}, f, indent=1)
+        return fname
@@ -0,0 +1,127 @@
+# Import the libraries
+import pandas as pd
+
+# Schemas of the raw source files: the columns used from each file ('usecols'), their numeric types ('dtype') and
+# the string columns repeated in many rows (station IDs, parameter codes, units etc.) that are stored as
+# categoricals ('categorical'), all other columns are read as strings
+
+# Waterbase
+WATERBASE_STATIONS = {
+    'usecols': ['monitoringSiteIdentifier', 'lon', 'lat', 'waterBodyIdentifierScheme'],
+    'dtype': {'lon': 'float64', 'lat': 'float64'},
+    'categorical': ['waterBodyIdentifierScheme']
+}
+WATERBASE_PARAMETERS = {
+    'usecols': ['Label', 'Notation'],
+    'dtype': {},
+    'categorical': []
+}
+WATERBASE_OBS = {
+    'usecols': ['monitoringSiteIdentifier',
+                'parameterWaterBodyCategory',
+                'observedPropertyDeterminandCode',
+                'phenomenonTimeSamplingDate',
+                'resultObservedValue',
+                'resultUom'],
+    'dtype': {'resultObservedValue': 'float64'},
+    'categorical': ['monitoringSiteIdentifier',
+                    'parameterWaterBodyCategory',
+                    'observedPropertyDeterminandCode',
+                    'resultUom']
+}
+
+# GLORICH (the value and remark columns of hydrochemistry.csv are added by glorich_obs_schema())
+GLORICH_PARAMETERS = {
+    'usecols': ['Parameter name', 'Description', 'Unit'],
+    'dtype': {},
+    'categorical': []
+}
+GLORICH_OBS = {
+    'usecols': ['STAT_ID', 'RESULT_DATETIME'],
+    'dtype': {'STAT_ID': 'int64'},
+    'categorical': []
+}
+
+# GEMStat
+GEMSTAT_STATIONS = {
+    'usecols': ['GEMS Station Number', 'Water Type', 'Latitude', 'Longitude'],
+    'dtype': {'Latitude': 'float64', 'Longitude': 'float64'},
+    'categorical': ['Water Type']
+}
+GEMSTAT_PARAMETERS = {
+    'usecols': ['Parameter Code', 'Parameter Long Name'],
+    'dtype': {},
+    'categorical': []
+}
+GEMSTAT_OBS = {
+    'usecols': ['GEMS Station Number',
+                'Sample Date',
+                'Sample Time',
+                'Depth',
+                'Parameter Code',
+                'Analysis Method Code',
+                'Value Flags',
+                'Value',
+                'Unit',
+                'Data Quality'],
+    'dtype': {'Depth': 'float64', 'Value': 'float64'},
+    'categorical': ['GEMS Station Number',
+                    'Parameter Code',
+                    'Analysis Method Code',
+                    'Value Flags',
+                    'Unit',
+                    'Data Quality']
+}
+
+
+# Define a function for getting the types of the columns of a schema for read_csv()
+def csv_dtypes(schema, usecols=None):
+    dtype = {}
+    for col in usecols if usecols is not None else schema['usecols']:
+        if col in schema['dtype']:
+            dtype[col] = schema['dtype'][col]
+        elif col in schema['categorical']:
+            dtype[col] = 'category'
+        else:
+            dtype[col] = str
+    return dtype
+
+
+# Define a function for reading only the columns of a schema from a CSV with explicit types
+def read_csv(fname, schema, **kwargs):
+    return pd.read_csv(fname, usecols=schema['usecols'], dtype=csv_dtypes(schema), **kwargs)
+
+
+# Define a function for keeping only the columns of a schema in a DF (e.g. from an Excel sheet) and converting
+# them into the types of the schema
+def apply_schema(df, schema):
+    df = df[schema['usecols']].copy()
+    for col, dtype in schema['dtype'].items():
+        df[col] = df[col].astype(dtype)
+    for col in schema['categorical']:
+        df[col] = df[col].astype('category')
+    return df
+
+
+# Define a function for extending a schema to all columns of a file (the columns that are not in the schema are read
+# as categoricals), for finding duplicates on full rows before the columns are pruned
+def full_row_schema(schema, columns):
+    extra_cols = [col for col in columns if col not in schema['usecols']]
+    return {
+        'usecols': list(columns),
+        'dtype': schema['dtype'],
+        'categorical': schema['categorical'] + extra_cols
+    }
+
+
+# Define a function for creating the schema of hydrochemistry.csv from its header
+# The value columns (the ones with a remark column) are read as strings (their decimal commas are replaced when they
+# are converted into numbers) and the remark columns as categoricals
+def glorich_obs_schema(columns):
+    vrc_cols = [col for col in columns if 'vrc' in col]
+    value_cols = [col[:-4] for col in vrc_cols]
+    return {
+        'usecols': GLORICH_OBS['usecols'] + value_cols + vrc_cols,
+        'dtype': GLORICH_OBS['dtype'],
+        'categorical': GLORICH_OBS['categorical'] + vrc_cols
+    }
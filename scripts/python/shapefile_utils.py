@@ -0,0 +1,100 @@
+# Import the libraries
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+# Shape types of the shapefiles with one point per record (Point, PointZ and PointM), their x and y come first
+POINT_TYPES = [1, 11, 21]
+
+
+# Define a function for reading the shape type in the header of a shapefile
+def shape_type(fname):
+    with open(fname, 'rb') as f:
+        header = f.read(100)
+    if len(header) < 100 or struct.unpack('>i', header[:4])[0] != 9994:
+        raise ValueError('{} is not a shapefile'.format(fname))
+    return struct.unpack('<i', header[32:36])[0]
+
+
+# Define a function for reading the x and y coordinates of a point shapefile into NumPy arrays
+# The positions of the records come from the index file (.shx) and the coordinates are gathered from the memory-mapped
+# .shp file at once (records with a null shape get missing coordinates)
+def read_points(fname):
+    base = os.path.splitext(fname)[0]
+    offsets = np.fromfile(base + '.shx', dtype=[('offset', '>i4'), ('length', '>i4')], offset=100)['offset']
+    # The offsets are in 16-bit words and point to the record header (8 bytes) in front of the shape
+    start = offsets.astype(np.int64) * 2 + 8
+    data = np.memmap(fname, dtype=np.uint8, mode='r')
+    types = data[start[:, None] + np.arange(4)].copy().view('<i4').ravel()
+    x = np.full(len(start), np.nan)
+    y = np.full(len(start), np.nan)
+    point = np.isin(types, POINT_TYPES)
+    x[point] = data[start[point, None] + 4 + np.arange(8)].copy().view('<f8').ravel()
+    y[point] = data[start[point, None] + 12 + np.arange(8)].copy().view('<f8').ravel()
+    return x, y
+
+
+# Define a function for reading the attribute table (.dbf) of a shapefile into a DF (only the given columns, all by
+# default) with the fixed-width records read into a NumPy array at once
+# Numeric fields without decimals become integers (floats if some are empty), the others floats, strings are decoded
+# with the code page of the .cpg file (Latin-1 if there is none) and deleted records are dropped
+def read_dbf(fname, columns=None):
+    with open(fname, 'rb') as f:
+        raw = f.read()
+    n_records, header_length, record_length = struct.unpack('<IHH', raw[4:12])
+    fields = []
+    pos = 32
+    while raw[pos:pos + 1] != b'\r':
+        name = raw[pos:pos + 11].split(b'\0')[0].decode('latin-1')
+        fields.append((name, raw[pos + 11:pos + 12].decode('latin-1'), raw[pos + 16], raw[pos + 17]))
+        pos += 32
+    # Read the records as fixed-width byte strings (the first byte is the deletion flag)
+    dtype = np.dtype({'names': ['_deleted'] + [name for name, kind, width, decimals in fields],
+                      'formats': ['S1'] + ['S{}'.format(width) for name, kind, width, decimals in fields]})
+    records = np.frombuffer(raw, dtype=dtype, count=n_records, offset=header_length)
+    encoding = 'latin-1'
+    cpg = os.path.splitext(fname)[0] + '.cpg'
+    if os.path.exists(cpg):
+        with open(cpg) as f:
+            encoding = f.read().strip() or encoding
+    df = pd.DataFrame(index=pd.RangeIndex(n_records))
+    for name, kind, width, decimals in fields:
+        if columns is not None and name not in columns:
+            continue
+        # Parse the numbers from the byte strings directly unless some of them are empty (or not numbers)
+        if kind in 'NF':
+            try:
+                df[name] = records[name].astype('int64' if kind == 'N' and decimals == 0 else 'float64')
+                continue
+            except ValueError:
+                pass
+        values = pd.Series(np.char.strip(records[name])).str.decode(encoding)
+        if kind in 'NF':
+            values = pd.to_numeric(values, errors='coerce')
+        elif kind == 'L':
+            values = values.str.upper().map({'T': True, 'Y': True, 'F': False, 'N': False})
+        elif kind == 'D':
+            values = pd.to_datetime(values, format='%Y%m%d', errors='coerce')
+        df[name] = values
+    return df[records['_deleted'] != b'*'] if (records['_deleted'] == b'*').any() else df
+
+
+# Define a function for reading the points of a shapefile into a DF with the given attribute columns and the
+# coordinates in lat and lon
+# Point shapefiles are read directly and other shapefiles with geopandas (the point in the middle of each shape),
+# which is only imported if it is needed since importing it takes seconds
+def read_point_shapefile(fname, columns=None):
+    if shape_type(fname) in POINT_TYPES:
+        df = read_dbf(os.path.splitext(fname)[0] + '.dbf', columns)
+        x, y = read_points(fname)
+        df['lat'] = y[df.index]
+        df['lon'] = x[df.index]
+        return df.reset_index(drop=True)
+    import geopandas as gpd
+    gdf = gpd.read_file(fname)
+    df = pd.DataFrame(gdf.drop(columns='geometry') if columns is None else gdf[columns])
+    points = gdf['geometry'].representative_point()
+    df['lat'] = points.y.to_numpy()
+    df['lon'] = points.x.to_numpy()
+    return df.reset_index(drop=True)
@@ -0,0 +1,155 @@
+# Import the libraries
+import hashlib
+import json
+import os
+import zipfile
+from collections import OrderedDict
+import pandas as pd
+
+
+# Define a function for hashing the content of a file
+def file_hash(fname, block_size=2 ** 20):
+    sha1 = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+# On-disk cache of parsed Excel sheets stored as Parquet files
+# The files are keyed by the hash of the Excel (or zip) file and the sheet name, so a changed file gets new
+# entries and the old ones are evicted by the size cap (least recently used first)
+# Needs the pyarrow library (pip install pyarrow) for the to_parquet() and read_parquet() functions
+class SheetCache(object):
+
+    def __init__(self, dirname, max_size=2 * 1024 ** 3, quiet=False):
+        self.dirname = dirname
+        self.max_size = max_size
+        # Turns off the prints of the sheets that could not be cached and of the hits and misses
+        self.quiet = quiet
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(dirname, exist_ok=True)
+
+    # Define a function for creating an empty cache with the same location and size cap (used in the worker
+    # processes so that their hits and misses can be added to the cache of the main process)
+    def copy(self):
+        return SheetCache(self.dirname, self.max_size, self.quiet)
+
+    # Define a function for getting the path of a cached sheet
+    def path(self, fhash, sheet_name):
+        sheet_hash = hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.dirname, '{}_{}.parquet'.format(fhash, sheet_hash))
+
+    # Define a function for reading the sheet names of a cached file
+    def read_names(self, fhash):
+        path = os.path.join(self.dirname, fhash + '.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    # Define a function for writing the sheet names of a file into the cache
+    def write_names(self, fhash, sheet_names):
+        with open(os.path.join(self.dirname, fhash + '.json'), 'w') as f:
+            json.dump(sheet_names, f)
+
+    # Define a function for reading a sheet from the cache (returns None if the sheet is not cached)
+    def read(self, fhash, sheet_name):
+        path = self.path(fhash, sheet_name)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Update the modification time to mark the sheet as recently used
+        os.utime(path, None)
+        return pd.read_parquet(path)
+
+    # Define a function for writing a sheet into the cache
+    def write(self, fhash, sheet_name, df):
+        path = self.path(fhash, sheet_name)
+        # Write into a temporary file first so that a crash does not leave a broken sheet in the cache
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            df.to_parquet(tmp_path)
+        # Columns with mixed types cannot be stored in Parquet, so the sheet is parsed again in the next run
+        except (TypeError, ValueError) as e:
+            if not self.quiet:
+                print('Could not cache sheet {}: {}'.format(sheet_name, e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        os.replace(tmp_path, path)
+
+    # Define a function for deleting the least recently used sheets until the cache is smaller than the size cap and
+    # the sheet names of the files that have no cached sheets left
+    def evict(self):
+        entries = []
+        for fname in os.listdir(self.dirname):
+            if fname.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.dirname, fname))
+                entries.append((stat.st_mtime, stat.st_size, fname))
+        total_size = sum(entry[1] for entry in entries)
+        kept = set()
+        for mtime, size, fname in sorted(entries):
+            if total_size > self.max_size:
+                os.remove(os.path.join(self.dirname, fname))
+                total_size -= size
+            else:
+                kept.add(fname.split('_')[0])
+        # Remove the sheet names of the files (<file hash>.json) without cached sheets
+        for fname in os.listdir(self.dirname):
+            if fname.endswith('.json') and fname[:-5] not in kept:
+                os.remove(os.path.join(self.dirname, fname))
+
+    # Define a function for adding the hits and misses of another cache (e.g. from a worker process)
+    def add_counts(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    # Define a function for printing out the hits and misses of the run (unless the cache is quiet)
+    def report(self):
+        if self.quiet:
+            return
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        print('Sheet cache: {} hits, {} misses ({:.1f}% hit rate)'.format(self.hits, self.misses, rate))
+
+
+# Define a function for opening an Excel file (or the first file in a zip archive)
+def open_excel(fname):
+    if fname.endswith('.zip'):
+        zf = zipfile.ZipFile(fname, 'r')
+        return pd.ExcelFile(zf.open(zf.namelist()[0]))
+    return pd.ExcelFile(fname)
+
+
+# Define a function for reading sheets of an Excel file (or the first file in a zip archive) into an ordered
+# dictionary of DFs, all sheets are read if no sheet names are given
+# The Excel file is only opened if one of the sheets is not in the cache
+def read_sheets(fname, sheet_names=None, cache=None):
+    xls = None
+    # Get the sheet names from the cache or from the Excel file
+    if cache is not None:
+        fhash = file_hash(fname)
+        all_names = cache.read_names(fhash)
+    if cache is None or all_names is None:
+        xls = open_excel(fname)
+        all_names = xls.sheet_names
+        if cache is not None:
+            cache.write_names(fhash, all_names)
+    if sheet_names is None:
+        sheet_names = all_names
+    # Read the sheets from the cache and parse the missing ones
+    sheets = OrderedDict()
+    for sheet_name in sheet_names:
+        df = cache.read(fhash, sheet_name) if cache is not None else None
+        if df is None:
+            if xls is None:
+                xls = open_excel(fname)
+            # Need to install the xlrd (pip install xlrd) library for the environment to use the read_excel() function
+            df = pd.read_excel(xls, sheet_name=sheet_name, header=0)
+            if cache is not None:
+                cache.write(fhash, sheet_name, df)
+        sheets[sheet_name] = df
+    return sheets
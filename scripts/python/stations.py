@@ -0,0 +1,116 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from aggregation import sorted_unique
+
+# Columns that identify a station
+STATION_COLS = ['origin', 'station_id', 'lat', 'lon']
+
+# Mean radius of the Earth in km
+EARTH_RADIUS = 6371.0088
+
+
+# Define a function for converting latitudes and longitudes (in degrees) into points on the unit sphere, so that the
+# straight-line (chord) distance between two points grows with their great-circle distance
+def unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+# Define a function for converting a great-circle distance in km into the chord distance on the unit sphere
+def chord_length(distance_km):
+    return 2 * np.sin(np.minimum(distance_km / EARTH_RADIUS, np.pi) / 2)
+
+
+# Define a function for converting chord distances on the unit sphere into great-circle distances in km
+def great_circle_km(chord):
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(np.asarray(chord) / 2, 1))
+
+
+# Define a function for creating a DF of the stations of the observations (one row per origin, station ID and
+# location with its number of observations) and the position of the station of each observation
+def station_table(df):
+    hashes = pd.util.hash_pandas_object(df[STATION_COLS], index=False).to_numpy()
+    unique_hashes, first, counts = sorted_unique(hashes)
+    station_df = df[STATION_COLS].iloc[first].reset_index(drop=True)
+    station_df['count'] = counts
+    return station_df, np.searchsorted(unique_hashes, hashes)
+
+
+# Define a function for finding the pairs of stations that are within radius_km of each other with a KD-tree of
+# their points on the unit sphere (O(n log n) instead of comparing all pairs), only the pairs of stations from
+# different origins are kept if cross_origin is True
+def close_pairs(station_df, radius_km, cross_origin=True):
+    located = np.flatnonzero(station_df['lat'].notnull().to_numpy() & station_df['lon'].notnull().to_numpy())
+    points = unit_vectors(station_df['lat'].to_numpy()[located], station_df['lon'].to_numpy()[located])
+    # The set of pairs is sorted into an array (the output_type argument needs scipy 1.6)
+    pairs = cKDTree(points).query_pairs(chord_length(radius_km))
+    pairs = located[np.array(sorted(pairs), dtype=np.intp).reshape(-1, 2)]
+    if cross_origin:
+        origin = pd.factorize(station_df['origin'])[0]
+        pairs = pairs[origin[pairs[:, 0]] != origin[pairs[:, 1]]]
+    return pairs
+
+
+# Define a function for assigning a canonical station to each station without chaining the close pairs: the stations
+# are taken by their number of observations (descending, then by their position) and a station becomes canonical
+# if none of its close stations is canonical yet, then every other station is assigned to its nearest canonical
+# station, and if cross_origin is True a canonical station takes at most one station of each origin (its own
+# included), so two stations of the same source are never merged through a station of another source
+# Stations that cannot be assigned stay their own canonical station
+def canonical_stations(station_df, pairs, cross_origin=True):
+    n = len(station_df)
+    canonical = np.arange(n)
+    if not len(pairs):
+        return canonical
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), -station_df['count'].to_numpy()))] = np.arange(n)
+    # Both directions of the pairs and the close stations of each station
+    a, b = np.r_[pairs[:, 0], pairs[:, 1]], np.r_[pairs[:, 1], pairs[:, 0]]
+    graph = sparse.csr_matrix((np.ones(len(a), dtype=bool), (a, b)), shape=(n, n))
+    # Choose the canonical stations in the order of their rank
+    is_canonical = np.ones(n, dtype=bool)
+    linked = np.unique(a)
+    is_canonical[linked] = False
+    for station in linked[np.argsort(rank[linked], kind='stable')]:
+        close = graph.indices[graph.indptr[station]:graph.indptr[station + 1]]
+        is_canonical[station] = not is_canonical[close].any()
+    # Assign the other stations to the canonical stations by their distance (the nearest pairs first)
+    keep = ~is_canonical[a] & is_canonical[b]
+    a, b = a[keep], b[keep]
+    points = unit_vectors(station_df['lat'], station_df['lon'])
+    chord = np.sqrt(((points[a] - points[b]) ** 2).sum(axis=1))
+    origin = pd.factorize(station_df['origin'])[0] if cross_origin else np.arange(n)
+    taken = set(zip(np.flatnonzero(is_canonical), origin[is_canonical]))
+    for i in np.lexsort((rank[b], rank[a], chord)):
+        station, target = a[i], b[i]
+        if canonical[station] != station or (target, origin[station]) in taken:
+            continue
+        canonical[station] = target
+        taken.add((target, origin[station]))
+    return canonical
+
+
+# Define a function for co-locating the stations of the different sources: the origin, station ID and location of
+# every observation are replaced with the ones of its canonical station, so that the observations of a station
+# reported by several sources end up in the same monthly groups
+# Returns the DF and a DF of the stations with their canonical station, the distance to it in km and whether it
+# was replaced by another station (co_located)
+def colocate_stations(df, radius_km, cross_origin=True):
+    station_df, station_pos = station_table(df)
+    canonical = canonical_stations(station_df, close_pairs(station_df, radius_km, cross_origin), cross_origin)
+    row_canonical = canonical[station_pos]
+    df = df.copy()
+    for col in STATION_COLS:
+        df[col] = station_df[col].array.take(row_canonical)
+    # Record the canonical station of each station
+    for col in STATION_COLS:
+        station_df['canonical_' + col] = station_df[col].array.take(canonical)
+    points = unit_vectors(station_df['lat'], station_df['lon'])
+    chord = np.sqrt(((points - points[canonical]) ** 2).sum(axis=1))
+    station_df['distance_km'] = np.round(great_circle_km(chord), 3)
+    station_df['co_located'] = canonical != np.arange(len(station_df))
+    return df, station_df
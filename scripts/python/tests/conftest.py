@@ -0,0 +1,6 @@
+# Import the libraries
+import os
+import sys
+
+# Make the modules in scripts/python importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
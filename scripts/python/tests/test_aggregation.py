@@ -0,0 +1,63 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+from aggregation import update_monthly
+
+# Columns used for the grouping in data_cleaning.py
+GROUP_COLS = ['lat', 'lon', 'station_id', 'param_code', 'param_desc', 'unit', 'origin', 'month']
+
+
+# Define a function for creating synthetic cleaned observations where some stations have no location
+def make_rows(rng, n_rows, n_stations):
+    station = rng.randint(0, n_stations, n_rows)
+    param_code = rng.choice(['TP', 'TN', 'NO3', 'pH'], n_rows)
+    return pd.DataFrame({
+        'lat': np.where(station % 10 == 0, np.nan, station * 0.01),
+        'lon': station * 0.02,
+        'station_id': np.char.add('S', station.astype(str)),
+        'param_code': param_code,
+        'param_desc': param_code,
+        'unit': 'ppm',
+        'origin': 'GEMStat',
+        'month': rng.randint(1, 13, n_rows),
+        'value': np.round(rng.lognormal(0, 1, n_rows), 3)
+    })
+
+
+# Define a function for aggregating all rows like data_cleaning.py does without the store
+def full_monthly(wq_df):
+    return wq_df.groupby(GROUP_COLS, observed=True)['value'].agg(['count', 'mean', 'std']).reset_index()
+
+
+# The store gives the same monthly statistics as a full recompute in the first run and after rows were added and
+# removed (rows without a location are dropped in both)
+def test_update_monthly_matches_full_groupby(tmp_path):
+    rng = np.random.RandomState(0)
+    wq_df = make_rows(rng, 20000, 500)
+    monthly_df, changed_params = update_monthly(str(tmp_path), wq_df, GROUP_COLS)
+    pd.testing.assert_frame_equal(full_monthly(wq_df), monthly_df, check_exact=False, rtol=1e-9)
+    assert changed_params == ['NO3', 'TN', 'TP', 'pH']
+    # Remove some rows and add the rows of a new release
+    wq_df = pd.concat([wq_df.iloc[100:], make_rows(rng, 1000, 50)], ignore_index=True)
+    monthly_df, changed_params = update_monthly(str(tmp_path), wq_df, GROUP_COLS)
+    pd.testing.assert_frame_equal(full_monthly(wq_df), monthly_df, check_exact=False, rtol=1e-9)
+
+
+# A run with the same rows changes no groups
+def test_update_monthly_unchanged(tmp_path):
+    wq_df = make_rows(np.random.RandomState(1), 5000, 100)
+    update_monthly(str(tmp_path), wq_df, GROUP_COLS)
+    monthly_df, changed_params = update_monthly(str(tmp_path), wq_df, GROUP_COLS)
+    assert changed_params == []
+    pd.testing.assert_frame_equal(full_monthly(wq_df), monthly_df, check_exact=False, rtol=1e-9)
+
+
+# Station IDs that are numbers in one source and text in another are kept in the store with their types
+def test_update_monthly_mixed_station_ids(tmp_path):
+    wq_df = make_rows(np.random.RandomState(2), 5000, 100)
+    numeric = wq_df['station_id'].str[1:].astype(int) % 2 == 0
+    wq_df['station_id'] = wq_df['station_id'].astype(object)
+    wq_df.loc[numeric, 'station_id'] = wq_df.loc[numeric, 'station_id'].str[1:].astype(int)
+    update_monthly(str(tmp_path), wq_df, GROUP_COLS)
+    monthly_df = update_monthly(str(tmp_path), wq_df.iloc[10:], GROUP_COLS)[0]
+    pd.testing.assert_frame_equal(full_monthly(wq_df.iloc[10:]), monthly_df, check_exact=False, rtol=1e-9)
@@ -0,0 +1,89 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+from cleaning_utils import ParamMap, check_date, date_month
+
+# Mapping with an entry that is left out on purpose (no new code) and one without a new description
+MAP_DF = pd.DataFrame({
+    'origin': ['GEMStat', 'GEMStat', 'Waterbase', 'GLORICH', 'GLORICH'],
+    'param_code': ['NO3N', 'SKIP', 'EEA_3164', 'DOC', 'TP'],
+    'new_code': ['NO3', np.nan, 'NO3', 'DOC', 'TP'],
+    'new_desc': ['Nitrate', np.nan, 'Nitrate', np.nan, 'Total phosphorus'],
+    'new_unit': ['mg/l', 'mg/l', 'mg/l', 'mg/l', 'mg/l'],
+    'divisor': [1.0, 1.0, 1.0, 12.0, 1000.0],
+    'multiplier': [4.43, 1.0, 1.0, 1.0, 1.0]
+})
+
+# Observations of the three sources with a parameter that is not in the mapping
+OBS_DF = pd.DataFrame({
+    'origin': ['GEMStat', 'GEMStat', 'Waterbase', 'GLORICH', 'GLORICH', 'GLORICH', 'Waterbase'],
+    'param_code': ['NO3N', 'SKIP', 'EEA_3164', 'DOC', 'TP', 'DOC', 'UNKNOWN'],
+    'value': [1.0, 2.0, 3.0, 24.0, 500.0, 6.0, 7.0]
+})
+
+# Types of the string columns for comparing the DFs
+STR_DTYPES = {'param_code': object, 'param_desc': object, 'unit': object}
+
+
+# Define a function for mapping the observations like data_cleaning.py did before (merging the mapping of each origin
+# and keeping the rows with a new code)
+def merge_mapping(obs_df, map_df):
+    df = obs_df.merge(map_df, on=['origin', 'param_code'])
+    df = df[df['new_code'].notnull()]
+    df = pd.DataFrame({
+        'param_code': df['new_code'].to_numpy(),
+        'param_desc': df['new_desc'].to_numpy(),
+        'unit': df['new_unit'].to_numpy(),
+        'value': (df['value'] / df['divisor'] * df['multiplier']).to_numpy()
+    })
+    return df.astype(STR_DTYPES)
+
+
+# Define a function for mapping the observations with the compiled index like data_cleaning.py does now
+def index_mapping(obs_df, map_df, categorical):
+    param_map = ParamMap(map_df)
+    pos = param_map.positions(obs_df)
+    keep = pos >= 0
+    keep[keep] = param_map.mapped[pos[keep]]
+    pos = pos[keep]
+    df = pd.DataFrame({
+        'param_code': param_map.take('new_code', pos, categorical),
+        'param_desc': param_map.take('new_desc', pos, categorical),
+        'unit': param_map.take('new_unit', pos, categorical),
+        'value': param_map.convert(obs_df['value'].to_numpy()[keep], pos)
+    })
+    return df.astype(STR_DTYPES)
+
+
+# The compiled index maps the observations like the merges, with and without categoricals (a missing description
+# stays missing instead of taking another category)
+def test_param_map_matches_merge():
+    expected = merge_mapping(OBS_DF, MAP_DF)
+    for categorical in [False, True]:
+        pd.testing.assert_frame_equal(index_mapping(OBS_DF, MAP_DF, categorical), expected)
+
+
+# The keys without a mapping entry are listed with their number of rows
+def test_param_map_unmapped():
+    param_map = ParamMap(MAP_DF)
+    unmapped = param_map.unmapped(OBS_DF, param_map.positions(OBS_DF))
+    assert unmapped.to_dict() == {('Waterbase', 'UNKNOWN'): 1}
+
+
+# Dates in the plain format, malformed and impossible dates and parts that int() accepts in check_date although
+# they are not plain ASCII numbers (underscores between the digits, non-ASCII digits, signs and whitespace)
+DATES = ['2005-04-01', '2001-02-29', '2000-02-29', '1900-02-29', '2005-04-31', '1999-13-01', '0000-01-01',
+         '10000-01-01', '2005-04', '2005', '', '2005/04/01', '2005-4-1x', '2005-04-01-extra', '2005-04-01 00:00:00',
+         ' 2005- 4-01', '+2005-04-01', '-2005-04-01', '2005--4-01', '2_005-04-01', '2005-0_4-01', '2__005-04-01',
+         '_2005-04-01', '\u0968\u0966\u0966\u096b-04-01', '2005-\uff10\uff14-01', '2005-04-\u0661\u0660',
+         '2005\u00a0-04-01', '2005-04-1\u00bd', '2005-04-\u00b9', '2005-04-' + '0' * 20 + '1']
+
+
+# The months of date_month are the ones of the dates that check_date accepts (the month part converted with int())
+def test_date_month_matches_check_date():
+    dates = pd.Series(DATES * 2, dtype=object)
+    ok_date = np.array([check_date({'date': date}) for date in dates])
+    expected = [int(date.split('-')[1]) if ok else np.nan for date, ok in zip(dates, ok_date)]
+    month = date_month(dates)
+    assert (month.notnull().to_numpy() == ok_date).all()
+    pd.testing.assert_series_equal(month, pd.Series(expected, dtype=float))
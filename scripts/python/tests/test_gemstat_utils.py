@@ -0,0 +1,71 @@
+# Import the libraries
+import json
+import os
+import numpy as np
+import pandas as pd
+from benchmarks.bench_gemstat_workers import write_zip
+from gemstat_utils import MANIFEST_FILE, combine_archives, ingest_archives, read_archives
+
+
+# Define a function for writing a few small zipped GEMStat Excel files
+def write_zips(dirname, n_zips=3):
+    rng = np.random.RandomState(0)
+    return [write_zip(rng, str(dirname), i, 2, 200) for i in range(n_zips)]
+
+
+# Define a function for checking that the DFs of two sets of parsed archives are the same
+def assert_same_archives(dfs, expected):
+    for df, expected_df in zip(dfs, expected):
+        pd.testing.assert_frame_equal(df, expected_df)
+
+
+# The archives read from the shards are the same as the parsed ones, in the first run and when a run is resumed
+# after it stopped (only the archives without a shard are parsed again)
+def test_ingest_archives_resume(tmp_path, capsys):
+    zipfiles = write_zips(tmp_path)
+    shard_dir = str(tmp_path / 'shards')
+    expected = combine_archives(read_archives(zipfiles, workers=1))
+    archives, manifest = ingest_archives(zipfiles, shard_dir, workers=1)
+    assert_same_archives(combine_archives(archives), expected)
+    assert sorted(manifest['archives']) == sorted(os.path.basename(fname) for fname in zipfiles)
+    # Remove the entry of the last archive from the manifest like a run that stopped before it was done
+    with open(os.path.join(shard_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    manifest['archives'].pop(os.path.basename(zipfiles[-1]))
+    with open(os.path.join(shard_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    capsys.readouterr()
+    archives, manifest = ingest_archives(zipfiles, shard_dir, workers=1)
+    assert_same_archives(combine_archives(archives), expected)
+    out = capsys.readouterr().out
+    assert '2 of 3 archives are resumed from their shards' in out
+    assert out.count('Loading') == 1
+    # A quiet run prints nothing
+    assert_same_archives(combine_archives(ingest_archives(zipfiles, shard_dir, workers=1, quiet=True)[0]), expected)
+    assert capsys.readouterr().out == ''
+
+
+# A changed archive is parsed again and its old shard is removed
+def test_ingest_archives_changed_file(tmp_path):
+    zipfiles = write_zips(tmp_path)
+    shard_dir = str(tmp_path / 'shards')
+    old_shard = ingest_archives(zipfiles, shard_dir, workers=1)[1]['archives'][os.path.basename(zipfiles[0])]['shard']
+    write_zip(np.random.RandomState(1), str(tmp_path), 0, 2, 200)
+    archives, manifest = ingest_archives(zipfiles, shard_dir, workers=1)
+    assert_same_archives(combine_archives(archives), combine_archives(read_archives(zipfiles, workers=1)))
+    assert not os.path.exists(os.path.join(shard_dir, old_shard))
+
+
+# An archive that cannot be parsed is listed in the failures of the manifest and tried again in the next run, its
+# failure is forgotten when the file is removed
+def test_ingest_archives_failed_file(tmp_path):
+    zipfiles = write_zips(tmp_path, 2)
+    shard_dir = str(tmp_path / 'shards')
+    broken = str(tmp_path / 'broken.xlsx.zip')
+    with open(broken, 'w') as f:
+        f.write('not a zip file')
+    archives, manifest = ingest_archives(zipfiles + [broken], shard_dir, workers=1)
+    assert list(manifest['failed']) == ['broken.xlsx.zip']
+    assert_same_archives(combine_archives(archives), combine_archives(read_archives(zipfiles, workers=1)))
+    assert list(ingest_archives(zipfiles + [broken], shard_dir, workers=1)[1]['failed']) == ['broken.xlsx.zip']
+    assert ingest_archives(zipfiles, shard_dir, workers=1)[1]['failed'] == {}
@@ -0,0 +1,59 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+import pytest
+from join_utils import join_dimensions, join_mask
+
+
+# Define a function for creating synthetic stations, parameters and observations with keys that are not in the
+# tables and missing keys
+def make_tables(rng, n_rows=5000, categorical=False):
+    stations = ['S{}'.format(i) for i in range(50)]
+    stat_df = pd.DataFrame({'GEMS Station Number': stations[:40] + [np.nan],
+                            'Latitude': rng.uniform(-60, 70, 41), 'Longitude': rng.uniform(-180, 180, 41)})
+    stat_df = stat_df.sample(frac=1, random_state=rng).reset_index(drop=True)
+    # The strings are objects like in the DFs that are read from the sources
+    stat_df['GEMS Station Number'] = stat_df['GEMS Station Number'].astype(object)
+    param_df = pd.DataFrame({'Parameter Code': ['TP', 'NO3N', 'pH'],
+                             'Parameter Long Name': ['Total phosphorus', 'Nitrate', 'pH']}, dtype=object)
+    station = pd.Series(rng.choice(stations, n_rows)).where(rng.rand(n_rows) > 0.05)
+    obs_df = pd.DataFrame({'GEMS Station Number': station.astype(object),
+                           'Parameter Code': rng.choice(['TP', 'NO3N', 'pH', 'DOC'], n_rows),
+                           'Value': np.round(rng.rand(n_rows), 3)})
+    if categorical:
+        obs_df['GEMS Station Number'] = obs_df['GEMS Station Number'].astype('category')
+        obs_df['Parameter Code'] = obs_df['Parameter Code'].astype('category')
+    return stat_df, param_df, obs_df
+
+
+# Define a function for storing the strings of a DF as objects (newer pandas versions infer a string type for the
+# columns of merge())
+def plain_strings(df):
+    return df.astype({col: object for col in df.columns if df[col].dtype != object and
+                      pd.api.types.is_string_dtype(df[col].dtype) and not hasattr(df[col], 'cat')})
+
+
+# Define a function for joining the tables like the prep scripts did before (merging the first table with the
+# observations and the result with the other tables)
+def merge_tables(stat_df, param_df, obs_df):
+    return stat_df.merge(obs_df, on='GEMS Station Number').merge(param_df, on='Parameter Code')
+
+
+# The joins by key positions give the same rows, row order and columns as the merges (also with categorical keys and
+# with missing keys, which merge() matches to the missing key of a table)
+@pytest.mark.parametrize('categorical', [False, True])
+def test_join_dimensions_matches_merge(categorical):
+    stat_df, param_df, obs_df = make_tables(np.random.RandomState(0), categorical=categorical)
+    dims = [(stat_df, 'GEMS Station Number', 'GEMS Station Number'), (param_df, 'Parameter Code', 'Parameter Code')]
+    expected = merge_tables(stat_df, param_df, obs_df)
+    pd.testing.assert_frame_equal(plain_strings(join_dimensions(obs_df, dims)), plain_strings(expected))
+    assert join_mask(obs_df, dims).sum() == len(expected)
+
+
+# Tables with duplicated keys are joined with the merges
+def test_join_dimensions_duplicated_keys():
+    stat_df, param_df, obs_df = make_tables(np.random.RandomState(1))
+    stat_df = pd.concat([stat_df, stat_df.iloc[:3]], ignore_index=True)
+    dims = [(stat_df, 'GEMS Station Number', 'GEMS Station Number'), (param_df, 'Parameter Code', 'Parameter Code')]
+    pd.testing.assert_frame_equal(plain_strings(join_dimensions(obs_df, dims)),
+                                  plain_strings(merge_tables(stat_df, param_df, obs_df)))
@@ -0,0 +1,27 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+import pytest
+from gemstat_utils import parameter_units
+
+
+# Define a function for creating synthetic GEMStat observations with the units in the order of the rows
+def make_observations(rng, n_rows=2000):
+    param_code = rng.choice(['TP', 'NO3N', 'pH', 'TEMP'], n_rows)
+    return pd.DataFrame({'param_code': param_code,
+                         'param_name': np.char.add(param_code.astype(str), ' long name'),
+                         'unit': pd.Series(rng.choice(['mg/l', 'umol/l'], n_rows)).where(rng.rand(n_rows) > 0.05),
+                         'value': rng.rand(n_rows)}).astype({'param_code': object, 'param_name': object,
+                                                              'unit': object})
+
+
+# The units CSV is the same as the one of groupby().unique() on columns of strings like the prep scripts wrote it
+# before the schemas, also if the columns are categoricals
+@pytest.mark.parametrize('group_cols', [['param_code'], ['param_code', 'param_name']])
+@pytest.mark.parametrize('categorical', [False, True])
+def test_parameter_units_csv(group_cols, categorical):
+    out_df = make_observations(np.random.RandomState(0))
+    expected = out_df.groupby(group_cols)['unit'].unique().reset_index().to_csv(sep=';', index=False)
+    if categorical:
+        out_df = out_df.astype({col: 'category' for col in ['param_code', 'param_name', 'unit']})
+    assert parameter_units(out_df, group_cols).to_csv(sep=';', index=False) == expected
@@ -0,0 +1,52 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import write_point_shapefile
+from shapefile_utils import read_dbf, read_point_shapefile
+
+
+# Define a function for writing a synthetic point shapefile of the GLORICH sampling locations
+def write_locations(dirname, n_stations=500):
+    rng = np.random.RandomState(0)
+    fname = str(dirname / 'Sampling_Locations_v1')
+    x = np.round(rng.uniform(-150, 170, n_stations), 4)
+    y = np.round(rng.uniform(-50, 70, n_stations), 4)
+    attr_df = pd.DataFrame({'STAT_ID': np.arange(1, n_stations + 1),
+                            'STATION_NA': ['Station {}'.format(i) for i in range(n_stations)]})
+    write_point_shapefile(fname, x, y, attr_df)
+    return fname, x, y, attr_df
+
+
+# The point reader gives the coordinates and attributes that were written
+def test_read_point_shapefile(tmp_path):
+    fname, x, y, attr_df = write_locations(tmp_path)
+    df = read_point_shapefile(fname + '.shp')
+    assert list(df.columns) == ['STAT_ID', 'STATION_NA', 'lat', 'lon']
+    assert (df['lat'].to_numpy() == y).all() and (df['lon'].to_numpy() == x).all()
+    assert (df['STAT_ID'].to_numpy() == attr_df['STAT_ID'].to_numpy()).all()
+    assert (df['STATION_NA'].to_numpy() == attr_df['STATION_NA'].to_numpy()).all()
+    assert list(read_point_shapefile(fname + '.shp', ['STAT_ID']).columns) == ['STAT_ID', 'lat', 'lon']
+
+
+# Deleted records of the attribute table are dropped together with their points
+def test_read_point_shapefile_deleted_records(tmp_path):
+    fname, x, y, attr_df = write_locations(tmp_path, 10)
+    with open(fname + '.dbf', 'r+b') as f:
+        header = f.read(12)
+        header_length, record_length = np.frombuffer(header[8:12], dtype='<u2')
+        f.seek(int(header_length) + 3 * int(record_length))
+        f.write(b'*')
+    assert len(read_dbf(fname + '.dbf')) == 9
+    df = read_point_shapefile(fname + '.shp', ['STAT_ID'])
+    assert 4 not in df['STAT_ID'].to_numpy()
+    assert (df['lat'].to_numpy() == np.delete(y, 3)).all()
+
+
+# The point reader gives the same stations and coordinates as geopandas like glorich_prep.py used it before
+def test_read_point_shapefile_matches_geopandas(tmp_path):
+    gpd = pytest.importorskip('geopandas')
+    fname = write_locations(tmp_path)[0]
+    gdf = gpd.read_file(fname + '.shp')
+    expected = pd.DataFrame({'STAT_ID': gdf['STAT_ID'], 'lat': gdf['geometry'].y, 'lon': gdf['geometry'].x})
+    pd.testing.assert_frame_equal(read_point_shapefile(fname + '.shp', ['STAT_ID']), expected, check_dtype=False)
@@ -0,0 +1,48 @@
+# Import the libraries
+import os
+import pandas as pd
+from sheet_cache import SheetCache, file_hash, read_sheets
+
+
+# Define a function for writing a small Excel file with two sheets
+def write_excel(fname, value):
+    with pd.ExcelWriter(fname) as writer:
+        pd.DataFrame({'a': [value, value + 1]}).to_excel(writer, sheet_name='first', index=False)
+        pd.DataFrame({'b': ['x', 'y']}).to_excel(writer, sheet_name='second', index=False)
+    return fname
+
+
+# Define a function for listing the files of the cache by their extension
+def cache_files(cache, ext):
+    return sorted(fname for fname in os.listdir(cache.dirname) if fname.endswith(ext))
+
+
+# The cached sheets are the same as the parsed ones and a second read only hits the cache
+def test_read_sheets_from_cache(tmp_path):
+    fname = write_excel(str(tmp_path / 'one.xlsx'), 1)
+    cache = SheetCache(str(tmp_path / 'cache'))
+    parsed = read_sheets(fname)
+    read_sheets(fname, cache=cache)
+    cached = read_sheets(fname, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 2)
+    for sheet_name in parsed:
+        pd.testing.assert_frame_equal(parsed[sheet_name], cached[sheet_name])
+
+
+# The eviction removes the sheet names of the files whose sheets were all removed
+def test_evict_removes_sheet_names(tmp_path):
+    cache = SheetCache(str(tmp_path / 'cache'))
+    fnames = [write_excel(str(tmp_path / '{}.xlsx'.format(i)), i) for i in range(2)]
+    for fname in fnames:
+        read_sheets(fname, cache=cache)
+    # Mark the sheets of the second file as more recently used
+    for sheet_name in ['first', 'second']:
+        cache.read(file_hash(fnames[1]), sheet_name)
+    assert len(cache_files(cache, '.json')) == 2
+    cache.max_size = sum(os.path.getsize(os.path.join(cache.dirname, fname))
+                         for fname in cache_files(cache, '.parquet') if fname.startswith(file_hash(fnames[1])))
+    cache.evict()
+    assert cache_files(cache, '.json') == [file_hash(fnames[1]) + '.json']
+    cache.max_size = 0
+    cache.evict()
+    assert cache_files(cache, '.json') == [] and cache_files(cache, '.parquet') == []
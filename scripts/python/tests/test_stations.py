@@ -0,0 +1,43 @@
+# Import the libraries
+import numpy as np
+import pandas as pd
+from stations import EARTH_RADIUS, close_pairs, colocate_stations, station_table
+
+# Longitude difference of 1 km on the equator
+KM = np.degrees(1 / EARTH_RADIUS)
+
+
+# Define a function for creating observations of stations on the equator at the given distances in km (one row per
+# observation)
+def make_observations(stations):
+    rows = []
+    for origin, station_id, km, count in stations:
+        for i in range(count):
+            rows.append({'origin': origin, 'station_id': station_id, 'lat': 0.0, 'lon': km * KM, 'value': i + 1.0})
+    return pd.DataFrame(rows)
+
+
+# A station of another source within the radius is merged into the station with more observations, stations of the
+# same source and stations further away are kept apart
+def test_colocate_pair():
+    df = make_observations([('GEMStat', 'G1', 0.0, 3), ('Waterbase', 'W1', 0.5, 5), ('GEMStat', 'G2', 1.2, 2),
+                            ('GLORICH', 'R1', 5.0, 1)])
+    df, station_df = colocate_stations(df, 1.0)
+    canonical = dict(zip(station_df['station_id'], station_df['canonical_station_id']))
+    assert canonical == {'G1': 'W1', 'W1': 'W1', 'G2': 'G2', 'R1': 'R1'}
+    assert (df['station_id'].value_counts().sort_index() == pd.Series({'G2': 2, 'R1': 1, 'W1': 8})).all()
+
+
+# Two stations of the same source that are both close to a station of another source are not merged through it
+# (G1 and G2 are 1.65 km apart, 0.8 and 0.85 km from W1), the nearest one is merged and the other one is kept apart
+def test_colocate_chain():
+    df = make_observations([('GEMStat', 'G1', 0.0, 2), ('Waterbase', 'W1', 0.8, 5), ('GEMStat', 'G2', 1.65, 2)])
+    assert len(close_pairs(station_table(df)[0], 1.0)) == 2
+    station_df = colocate_stations(df, 1.0)[1]
+    canonical = dict(zip(station_df['station_id'], station_df['canonical_station_id']))
+    assert canonical == {'G1': 'W1', 'W1': 'W1', 'G2': 'G2'}
+    # A station of the same source with more observations is canonical and takes the station of the other source
+    df = make_observations([('GEMStat', 'G1', 0.0, 6), ('Waterbase', 'W1', 0.8, 1), ('GEMStat', 'G2', 1.65, 2)])
+    station_df = colocate_stations(df, 1.0)[1]
+    canonical = dict(zip(station_df['station_id'], station_df['canonical_station_id']))
+    assert canonical == {'G1': 'G1', 'W1': 'G1', 'G2': 'G2'}
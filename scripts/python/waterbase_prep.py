@@ -1,86 +1,83 @@
 # Import the libraries
+import numpy as np
 import pandas as pd
 import os
+from schemas import WATERBASE_PARAMETERS, WATERBASE_STATIONS, read_csv
+from profiling import StepLog
+from waterbase_utils import stream_observations
 
-# Location of the files
-dirname = 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data/waterbase'
+# Location of the files (the data directory can be changed with the WQ_DATA_DIR environment variable)
+data_dir = os.environ.get('WQ_DATA_DIR', 'C:/Users/Holger/PycharmProjects/water-quality-modeling/data')
+dirname = os.path.join(data_dir, 'waterbase')
+
+# Format of the output file of the observations ('csv', 'parquet' or 'arrow', the last two need the pyarrow library,
+# can be changed with the WQ_FORMAT environment variable)
+out_format = os.environ.get('WQ_FORMAT', 'csv')
+
+# Number of rows of the observation data read at a time
+chunk_size = 10 ** 6
+
+# Log of the steps with their time, rows and memory (WQ_QUIET=1 turns off the debug prints and WQ_PROFILE_DIR writes
+# a report of the steps)
+log = StepLog('waterbase_prep')
 
 # Create a DF with the water quality stations
-stat_df = pd.read_csv(os.path.join(dirname, 'Waterbase_v2016_1_WISE4_MonitoringSite_DerivedData.csv'))
-stat_df.drop_duplicates(inplace=True)
-stat_df.reset_index(drop=True, inplace=True)
-print(stat_df.head())
-print(stat_df.columns)
-print(str(len(stat_df)) + ' stations are in the dataset.')
+with log.step('read stations', 'read') as step:
+    stat_df = read_csv(os.path.join(dirname, 'Waterbase_v2016_1_WISE4_MonitoringSite_DerivedData.csv'),
+                       WATERBASE_STATIONS)
+    stat_df.drop_duplicates(inplace=True)
+    stat_df.reset_index(drop=True, inplace=True)
+    step.out(stat_df)
+log.show(stat_df.head())
+log.show(stat_df.columns)
+log.show(str(len(stat_df)) + ' stations are in the dataset.')
 
 # Extract the stations with location information
-loc_filter = (stat_df['lon'].isnull()) & (stat_df['lat'].isnull())
-stat_df = stat_df[~loc_filter]
-print(str(len(stat_df)) + ' stations are in the dataset.')
+with log.step('keep stations with locations', 'filter', stat_df) as step:
+    loc_filter = (stat_df['lon'].isnull()) & (stat_df['lat'].isnull())
+    stat_df = step.out(stat_df[~loc_filter])
+log.show(str(len(stat_df)) + ' stations are in the dataset.')
 
 # Print out the different station types
-print(stat_df['waterBodyIdentifierScheme'].unique())
+log.show(stat_df['waterBodyIdentifierScheme'].unique())
 
 # Extract the water quality stations on surface water bodies and the columns necessary for merging with the DF of
 # observations
-stat_df = stat_df[stat_df['waterBodyIdentifierScheme'].str.contains('Surface', na=False)]
-stat_df = stat_df[['monitoringSiteIdentifier', 'lon', 'lat']]
-print(str(len(stat_df)) + ' stations are in the dataset.')
+with log.step('keep surface water stations', 'filter', stat_df) as step:
+    stat_df = stat_df[stat_df['waterBodyIdentifierScheme'].str.contains('Surface', na=False)]
+    stat_df = step.out(stat_df[['monitoringSiteIdentifier', 'lon', 'lat']])
+log.show(str(len(stat_df)) + ' stations are in the dataset.')
 
 # Create a DF with the parameters of the water quality observations
-param_df = pd.read_csv(os.path.join(dirname, 'ObservedProperty.csv'))
-print(param_df.head())
-print(param_df.columns)
+with log.step('read parameters', 'read') as step:
+    param_df = step.out(read_csv(os.path.join(dirname, 'ObservedProperty.csv'), WATERBASE_PARAMETERS))
+log.show(param_df.head())
+log.show(param_df.columns)
 
 # Extract only the necessary columns
 param_df = param_df[['Label', 'Notation']]
 
-# Create a DF of observation data
-obs_df = pd.read_csv(os.path.join(dirname, 'Waterbase_v2016_1_T_WISE4_DisaggregatedData.csv'))
-obs_df.drop_duplicates(inplace=True)
-obs_df.reset_index(drop=True, inplace=True)
-print(obs_df.head())
-print(obs_df.columns)
-print(obs_df.dtypes)
-
-# Extract only observations made in river stations
-obs_df = obs_df[obs_df['parameterWaterBodyCategory'] == 'RW']
-
-# Convert the sampling date into DateTime
-obs_df['date'] = pd.to_datetime(obs_df['phenomenonTimeSamplingDate'], format='%Y-%m-%d')
-
-# Merge the other DFs with stat_df
-stat_df = stat_df.merge(obs_df, on='monitoringSiteIdentifier')
-stat_df = stat_df.merge(param_df, left_on='observedPropertyDeterminandCode', right_on='Notation')
+# Filter, merge and write the observation data into a file chunk by chunk (the rows are not loaded at once, so the
+# steps are timed together)
+with log.step('stream observations', 'read') as step:
+    summary = stream_observations(os.path.join(dirname, 'Waterbase_v2016_1_T_WISE4_DisaggregatedData.csv'),
+                                  stat_df, param_df, os.path.join(dirname, 'waterbase'), chunk_size=chunk_size,
+                                  out_format=out_format, log=log)
+    step.rows_in = summary['rows_read']
+    step.rows_out = summary['rows']
 
 # Print out the final number of stations
-print(str(len(stat_df['monitoringSiteIdentifier'].unique())) + ' stations remain in the dataset.')
-
-# Check if there are missing observation values
-print(str(stat_df['resultObservedValue'].isnull().sum()) + ' missing observation values are in the dataset.')
+log.show(str(len(summary['stations'])) + ' stations remain in the dataset.')
 
-# Extract only rows that have observation values
-stat_df = stat_df[pd.notnull(stat_df['resultObservedValue'])]
-print(str(stat_df['resultObservedValue'].isnull().sum()) + ' missing observation values remain in the dataset.')
-
-# Create a new DF with proper column names and write into a CSV
-out_df = pd.DataFrame(
-    {
-        'lat': stat_df['lat'],
-        'lon': stat_df['lon'],
-        'date': stat_df['date'],
-        'station_id': stat_df['monitoringSiteIdentifier'],
-        'param_code': stat_df['observedPropertyDeterminandCode'],
-        'param_desc': stat_df['Label'],
-        'value': stat_df['resultObservedValue'],
-        'unit': stat_df['resultUom'],
-        'origin': 'Waterbase'
-    }
-)
-out_df.to_csv(os.path.join(dirname, 'waterbase.csv'), sep=';', index=False)
+# Print out the number of rows without observation values that were excluded
+log.show(str(summary['missing']) + ' missing observation values were in the dataset.')
 
 # Extract the units of parameters and write into a CSV
-unit_df = out_df.groupby('param_code')['unit'].unique().reset_index()
+unit_df = pd.DataFrame({'param_code': sorted(summary['units'])})
+unit_df['unit'] = [np.array(summary['units'][param_code], dtype=object) for param_code in unit_df['param_code']]
 unit_df = unit_df.merge(param_df, left_on='param_code', right_on='Notation')
 unit_df.drop(['Notation'], axis=1, inplace=True)
 unit_df.to_csv(os.path.join(dirname, 'waterbase_units.csv'), sep=';', index=False)
+
+# Write the report of the steps
+log.write()
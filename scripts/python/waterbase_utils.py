@@ -0,0 +1,100 @@
+# Import the libraries
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from join_utils import join_dimensions
+from output_utils import TableWriter
+from schemas import WATERBASE_OBS, csv_dtypes
+
+# Compact index of 64-bit row hashes kept as a sorted NumPy array (8 bytes per unique row)
+class HashIndex(object):
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    # Define a function for marking the hashes that have not been seen before and adding them to the index
+    def add(self, hashes):
+        # Mark the first occurrence of each hash within the array
+        new = ~pd.Series(hashes).duplicated().to_numpy()
+        # Mark the hashes that are already in the index
+        if len(self.hashes):
+            pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            new &= self.hashes[pos] != hashes
+        # Add the new hashes (merging two sorted runs is linear with the stable sort)
+        self.hashes = np.sort(np.concatenate([self.hashes, hashes[new]]), kind='mergesort')
+        return new
+
+
+# Define a function for creating the output DF from the merged observations
+def out_frame(stat_df):
+    return pd.DataFrame(
+        {
+            'lat': stat_df['lat'],
+            'lon': stat_df['lon'],
+            'date': stat_df['date'],
+            'station_id': stat_df['monitoringSiteIdentifier'],
+            'param_code': stat_df['observedPropertyDeterminandCode'],
+            'param_desc': stat_df['Label'],
+            'value': stat_df['resultObservedValue'],
+            'unit': stat_df['resultUom'],
+            'origin': 'Waterbase'
+        }
+    )
+
+
+# Define a function for filtering, merging and writing the observation data chunk by chunk
+# Duplicates are dropped across chunks with a HashIndex of the rows (by default over all columns of the file
+# like drop_duplicates() on the full DF, or over dedup_cols), so peak memory depends on the chunk size and
+# not on the size of the file (out_fname is the name of the output file without the extension of out_format)
+# The progress of the chunks is printed out with the StepLog of the script if it is given (and not quiet)
+def stream_observations(fname, stat_df, param_df, out_fname, chunk_size=10 ** 6, dedup_cols=None, out_format='csv',
+                        log=None):
+    # Read only the columns used in the prep and for finding duplicates with the types of the schema
+    columns = pd.read_csv(fname, nrows=0).columns
+    if dedup_cols is None:
+        dedup_cols = list(columns)
+    usecols = [col for col in columns if col in WATERBASE_OBS['usecols'] or col in dedup_cols]
+    dtype = csv_dtypes(WATERBASE_OBS, usecols)
+    # Keys of the stations and the parameters for filtering the chunks before merging
+    stat_ids = stat_df['monitoringSiteIdentifier'].unique()
+    param_codes = param_df['Notation'].unique()
+    index = HashIndex()
+    writer = TableWriter(out_fname, out_format)
+    summary = {'rows_read': 0, 'rows': 0, 'missing': 0, 'stations': set(), 'units': OrderedDict()}
+    for i, chunk in enumerate(pd.read_csv(fname, usecols=usecols, dtype=dtype, chunksize=chunk_size)):
+        summary['rows_read'] += len(chunk)
+        # Extract only observations made in river stations that are in the DFs of stations and parameters
+        chunk = chunk[(chunk['parameterWaterBodyCategory'] == 'RW') &
+                      (chunk['monitoringSiteIdentifier'].isin(stat_ids)) &
+                      (chunk['observedPropertyDeterminandCode'].isin(param_codes))]
+        # Drop the rows that have already been seen in this or earlier chunks
+        chunk = chunk[index.add(pd.util.hash_pandas_object(chunk[dedup_cols], index=False).to_numpy())]
+        # Extract only rows that have observation values
+        summary['missing'] += int(chunk['resultObservedValue'].isnull().sum())
+        chunk = chunk[chunk['resultObservedValue'].notnull()]
+        # Keep only the columns used in the prep and convert the sampling date into DateTime
+        chunk = chunk[WATERBASE_OBS['usecols']].copy()
+        chunk['date'] = pd.to_datetime(chunk['phenomenonTimeSamplingDate'], format='%Y-%m-%d')
+        # Join the stations and the parameters to the chunk (attached by the positions of their keys)
+        merged = join_dimensions(chunk, [(stat_df, 'monitoringSiteIdentifier', 'monitoringSiteIdentifier'),
+                                         (param_df, 'observedPropertyDeterminandCode', 'Notation')])
+        # Append the chunk to the output file
+        out_df = out_frame(merged)
+        writer.write(out_df)
+        # Collect the number of rows, the stations and the units of the parameters
+        summary['rows'] += len(out_df)
+        summary['stations'].update(out_df['station_id'].unique())
+        for param_code, units in out_df.groupby('param_code', observed=True)['unit'].unique().items():
+            known = summary['units'].get(param_code, [])
+            summary['units'][param_code] = list(pd.unique(np.array(known + list(units), dtype=object)))
+        message = 'Processed chunk {}, {} rows written, {} unique rows indexed'.format(i + 1, summary['rows'],
+                                                                                     len(index))
+        if log is not None:
+            log.show(message)
+        else:
+            print(message)
+    writer.close()
+    return summary